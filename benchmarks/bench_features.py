@@ -0,0 +1,40 @@
+''' Benchmarks for feature calculation and LP solving. '''
+
+from lp_generators.features import coeff_features, solution_features
+from lp_generators.lp_ext import LPCy, construct_canonical
+
+from .common import SIZES, DENSITIES, encoded_instance, unsolved_instance
+
+
+class CoeffFeatures:
+    params = (SIZES, DENSITIES)
+    param_names = ['size', 'density']
+
+    def setup(self, size, density):
+        self.instance = unsolved_instance(size, density)
+
+    def time_coeff_features(self, size, density):
+        coeff_features(self.instance)
+
+
+class SolveLP:
+    # Solve times grow quickly; 5000 x 5000 dense solves are excluded.
+    params = ([50, 500, 1000], DENSITIES)
+    param_names = ['size', 'density']
+    timeout = 1200
+
+    def setup(self, size, density):
+        self.instance = encoded_instance(size, density)
+        self.model = LPCy()
+
+    def time_solution_features(self, size, density):
+        solution_features(self.instance)
+
+    def time_lpcy_solve(self, size, density):
+        model = LPCy()
+        construct_canonical(model, self.instance)
+        model.solve()
+
+    def time_lpcy_solve_reused(self, size, density):
+        construct_canonical(self.model, self.instance)
+        self.model.solve()
@@ -0,0 +1,57 @@
+''' Benchmarks for lhs and solution generation. '''
+
+import numpy as np
+
+from lp_generators.lhs_generators import generate_lhs
+from lp_generators.solution_generators import (
+    generate_alpha, generate_beta, generate_alpha_batch, generate_beta_batch)
+
+from .common import SEED, SIZES
+
+
+class GenerateLHS:
+    # degree_dist is a python loop over edges, so sizes are kept smaller.
+    params = ([50, 200, 1000], [0.01, 0.1])
+    param_names = ['size', 'density']
+    timeout = 1200
+
+    def time_generate_lhs(self, size, density):
+        generate_lhs(
+            variables=size, constraints=size, density=density, pv=0.5, pc=0.5,
+            coeff_loc=0, coeff_scale=1, random_state=np.random.RandomState(SEED))
+
+
+ALPHA_PARAMS = dict(
+    frac_violations=0.5, beta_param=1.0,
+    mean_primal=0, std_primal=1, mean_dual=0, std_dual=1)
+
+
+class GenerateSolution:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.random_state = np.random.RandomState(SEED)
+
+    def time_generate_alpha(self, size):
+        generate_alpha(size, size, random_state=self.random_state, **ALPHA_PARAMS)
+
+    def time_generate_beta(self, size):
+        generate_beta(size, size, 0.5, self.random_state)
+
+
+class GenerateSolutionBatch:
+    params = ([50, 500], [100, 10000])
+    param_names = ['size', 'instances']
+
+    def setup(self, size, instances):
+        self.random_state = np.random.RandomState(SEED)
+        self.basis_split = self.random_state.uniform(size=instances)
+
+    def time_generate_alpha_batch(self, size, instances):
+        generate_alpha_batch(
+            size, size, random_state=self.random_state,
+            **dict(ALPHA_PARAMS, frac_violations=self.basis_split))
+
+    def time_generate_beta_batch(self, size, instances):
+        generate_beta_batch(size, size, self.basis_split, self.random_state)
@@ -0,0 +1,49 @@
+''' Benchmarks for instance construction, encoding and decoding. '''
+
+import numpy as np
+
+from lp_generators.instance import EncodedInstance, SolvedInstance, construct_batch
+
+from .common import SIZES, DENSITIES, encoded_instance
+
+
+class EncodeDecode:
+    params = (SIZES, DENSITIES)
+    param_names = ['size', 'density']
+
+    def setup(self, size, density):
+        self.encoded = encoded_instance(size, density)
+        self.solved = SolvedInstance(
+            lhs=self.encoded.lhs(), solution=self.encoded.solution())
+
+    def time_rhs(self, size, density):
+        self.encoded.rhs()
+
+    def time_objective(self, size, density):
+        self.encoded.objective()
+
+    def time_decode_solution(self, size, density):
+        self.encoded.solution()
+
+    def time_encode_alpha_beta(self, size, density):
+        self.solved.alpha()
+        self.solved.beta()
+
+
+class ConstructBatch:
+    params = ([50, 500], [100, 1000])
+    param_names = ['size', 'encodings']
+
+    def setup(self, size, encodings):
+        self.instances = [
+            encoded_instance(size, 0.5, seed) for seed in range(encodings)]
+        self.lhs = self.instances[0].lhs()
+        self.alpha = np.stack([instance.alpha() for instance in self.instances])
+        self.beta = np.stack([instance.beta() for instance in self.instances])
+
+    def time_construct_batch(self, size, encodings):
+        construct_batch(self.lhs, self.alpha, self.beta)
+
+    def time_construct_loop(self, size, encodings):
+        for alpha, beta in zip(self.alpha, self.beta):
+            EncodedInstance(lhs=self.lhs, alpha=alpha, beta=beta).rhs()
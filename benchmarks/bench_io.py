@@ -0,0 +1,50 @@
+''' Benchmarks for reading and writing instance files. '''
+
+import os
+import shutil
+import tempfile
+
+from lp_generators.writers import (
+    write_tar_encoded, read_tar_encoded, write_tar_lp, read_tar_lp,
+    write_mps, write_mps_stream, read_mps)
+
+from .common import SIZES, DENSITIES, encoded_instance, unsolved_instance
+
+
+class WriteRead:
+    params = (SIZES, DENSITIES)
+    param_names = ['size', 'density']
+    timeout = 1200
+
+    def setup(self, size, density):
+        self.directory = tempfile.mkdtemp()
+        self.encoded = encoded_instance(size, density)
+        self.unsolved = unsolved_instance(size, density)
+        self.path = lambda name: os.path.join(self.directory, name)
+        write_tar_encoded(self.encoded, self.path('read_encoded.tar'))
+        write_tar_lp(self.unsolved, self.path('read_lp.tar'))
+        write_mps_stream(self.unsolved, self.path('read.mps.gz'))
+
+    def teardown(self, size, density):
+        shutil.rmtree(self.directory)
+
+    def time_write_tar_encoded(self, size, density):
+        write_tar_encoded(self.encoded, self.path('encoded.tar'))
+
+    def time_read_tar_encoded(self, size, density):
+        read_tar_encoded(self.path('read_encoded.tar'))
+
+    def time_write_tar_lp(self, size, density):
+        write_tar_lp(self.unsolved, self.path('lp.tar'))
+
+    def time_read_tar_lp(self, size, density):
+        read_tar_lp(self.path('read_lp.tar'))
+
+    def time_write_mps(self, size, density):
+        write_mps(self.unsolved, self.path('clp.mps.gz'))
+
+    def time_write_mps_stream(self, size, density):
+        write_mps_stream(self.unsolved, self.path('stream.mps.gz'))
+
+    def time_read_mps(self, size, density):
+        read_mps(self.path('read.mps.gz'))
@@ -0,0 +1,63 @@
+''' Benchmarks for each neighbour operator. '''
+
+import numpy as np
+
+import lp_generators.neighbours_encoded as neighbours_encoded
+import lp_generators.neighbours_unsolved as neighbours_unsolved
+
+from .common import SEED, SIZES, encoded_instance, unsolved_instance
+
+
+class EncodedNeighbours:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.instance = encoded_instance(size, 0.5)
+        self.random_state = np.random.RandomState(SEED)
+
+    def time_exchange_basis(self, size):
+        neighbours_encoded.exchange_basis(self.instance, self.random_state, count=5)
+
+    def time_scale_optvalue(self, size):
+        neighbours_encoded.scale_optvalue(
+            self.instance, self.random_state, count=5, mean=0, sigma=1)
+
+    def time_remove_lhs_entry(self, size):
+        neighbours_encoded.remove_lhs_entry(self.instance, self.random_state, count=10)
+
+    def time_add_lhs_entry(self, size):
+        neighbours_encoded.add_lhs_entry(
+            self.instance, self.random_state, count=10, mean=0, sigma=1)
+
+    def time_scale_lhs_entry(self, size):
+        neighbours_encoded.scale_lhs_entry(
+            self.instance, self.random_state, count=10, mean=0, sigma=1)
+
+
+class UnsolvedNeighbours:
+    params = SIZES
+    param_names = ['size']
+
+    def setup(self, size):
+        self.instance = unsolved_instance(size, 0.5)
+        self.random_state = np.random.RandomState(SEED)
+
+    def time_scale_obj_entry(self, size):
+        neighbours_unsolved.scale_obj_entry(
+            self.instance, self.random_state, count=5, mean=0, sigma=1)
+
+    def time_scale_rhs_entry(self, size):
+        neighbours_unsolved.scale_rhs_entry(
+            self.instance, self.random_state, count=5, mean=0, sigma=1)
+
+    def time_remove_lhs_entry(self, size):
+        neighbours_unsolved.remove_lhs_entry(self.instance, self.random_state, count=10)
+
+    def time_add_lhs_entry(self, size):
+        neighbours_unsolved.add_lhs_entry(
+            self.instance, self.random_state, count=10, mean=0, sigma=1)
+
+    def time_scale_lhs_entry(self, size):
+        neighbours_unsolved.scale_lhs_entry(
+            self.instance, self.random_state, count=10, mean=0, sigma=1)
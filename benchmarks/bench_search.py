@@ -0,0 +1,53 @@
+''' Benchmark for a fixed-seed local search run. '''
+
+import functools
+
+import numpy as np
+
+import lp_generators.neighbours_encoded as neighbours_encoded
+from lp_generators.features import coeff_features
+from lp_generators.search import local_search
+
+from .common import SEED, encoded_instance
+
+
+NEIGHBOURS = [
+    functools.partial(neighbours_encoded.exchange_basis, count=5),
+    functools.partial(neighbours_encoded.scale_optvalue, mean=0, sigma=1, count=5),
+    functools.partial(neighbours_encoded.remove_lhs_entry, count=10),
+    functools.partial(neighbours_encoded.add_lhs_entry, mean=0, sigma=1, count=10),
+    functools.partial(neighbours_encoded.scale_lhs_entry, mean=0, sigma=1, count=10),
+    ]
+
+
+def neighbour(instance, random_state):
+    return NEIGHBOURS[random_state.choice(len(NEIGHBOURS))](instance, random_state)
+
+
+def objective(instance):
+    features = coeff_features(instance)
+    return (features['rhs_mean'] + 100) ** 2 + (features['obj_mean'] - 100) ** 2
+
+
+class LocalSearch:
+    params = [50]
+    param_names = ['size']
+    timeout = 1200
+
+    def setup(self, size):
+        self.start = encoded_instance(size, 0.5)
+
+    def time_local_search(self, size):
+        for _ in local_search(
+                objective=objective, sense='min', neighbour=neighbour,
+                start_instance=self.start, steps=1000,
+                random_state=np.random.RandomState(SEED)):
+            pass
+
+    def track_local_search_objective(self, size):
+        for step_info, _ in local_search(
+                objective=objective, sense='min', neighbour=neighbour,
+                start_instance=self.start, steps=1000,
+                random_state=np.random.RandomState(SEED)):
+            pass
+        return step_info['search_objective']
@@ -0,0 +1,36 @@
+''' Fixed-seed instance construction shared by the benchmarks. Instances
+are built directly from random arrays (not generate_lhs) so that large
+sizes are cheap to set up. '''
+
+import numpy as np
+
+from lp_generators.instance import EncodedInstance, UnsolvedInstance
+
+
+SEED = 1640241240
+
+# (variables, constraints) sizes for array-bound benchmarks.
+SIZES = [50, 500, 5000]
+DENSITIES = [0.05, 0.5]
+
+
+def random_lhs(size, density, random_state):
+    lhs = random_state.normal(size=(size, size))
+    lhs[random_state.uniform(size=(size, size)) > density] = 0
+    return lhs
+
+
+def encoded_instance(size, density, seed=SEED):
+    random_state = np.random.RandomState(seed)
+    beta = np.zeros(2 * size)
+    beta[random_state.choice(2 * size, size=size, replace=False)] = 1
+    return EncodedInstance(
+        lhs=random_lhs(size, density, random_state),
+        alpha=random_state.lognormal(size=2 * size),
+        beta=beta)
+
+
+def unsolved_instance(size, density, seed=SEED):
+    encoded = encoded_instance(size, density, seed)
+    return UnsolvedInstance(
+        lhs=encoded.lhs(), rhs=encoded.rhs(), objective=encoded.objective())
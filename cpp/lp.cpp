@@ -9,34 +9,69 @@ LP::LP() {
     numVariables = -1;
     numConstraints = -1;
     numLHSElements = -1;
+    solved = false;
     lhsMatrixDense = NULL;
     rhsVector = NULL;
     objVector = NULL;
+    minObjVector = NULL;
     simplexModel = NULL;
 }
 
 
 LP::~LP() {
+    reset();
+}
+
+
+void LP::reset() {
+    // Free all stored data and the solver model.
     delete [] lhsMatrixDense;
     delete [] rhsVector;
     delete [] objVector;
+    delete [] minObjVector;
     delete simplexModel;
+    lhsMatrixDense = NULL;
+    rhsVector = NULL;
+    objVector = NULL;
+    minObjVector = NULL;
+    simplexModel = NULL;
+    numVariables = -1;
+    numConstraints = -1;
+    numLHSElements = -1;
+    solved = false;
+}
+
+
+void LP::allocate(int nv, int nc) {
+    // Size data arrays for nv variables and nc constraints. Existing
+    // arrays are kept if the dimensions match, otherwise replaced.
+    if (nv == numVariables && nc == numConstraints && lhsMatrixDense != NULL) {
+        return;
+    }
+    delete [] lhsMatrixDense;
+    delete [] rhsVector;
+    delete [] objVector;
+    delete [] minObjVector;
+    lhsMatrixDense = new double[nv * nc];
+    rhsVector = new double[nc];
+    objVector = new double[nv];
+    minObjVector = new double[nv];
 }
 
 
 void LP::constructDenseCanonical(int nv, int nc, double* A, double* b, double* c) {
-    // Construction method by copying dense arrays.
+    // Construction method by copying dense arrays. Any previous solution
+    // is invalidated.
 
+    allocate(nv, nc);
     numVariables = nv;
     numConstraints = nc;
     numLHSElements = 0;
-
-    lhsMatrixDense = new double[nv * nc];
-    rhsVector = new double[nc];
-    objVector = new double[nv];
+    solved = false;
 
     for (int col = 0; col < nv; col++) {
         objVector[col] = c[col];
+        minObjVector[col] = c[col] * -1;
     }
 
     int index = 0;
@@ -228,14 +263,57 @@ void LP::getObjVector(double* buffer) {
 
 
 void LP::solve() {
-    // Build and solve model, store it for retrieving solution values.
-    delete simplexModel;
-    ClpModel* model;
-    model = getClpModel();
-    simplexModel = new ClpSimplex(*model);
-    simplexModel->setLogLevel(0);
-    simplexModel->dual();
-    delete model;
+    solve(ALGORITHM_DUAL, false, -1, -1, -1, -1, -1);
+}
+
+
+void LP::solve(int algorithm, bool presolve, int scaling,
+               double primalTolerance, double dualTolerance,
+               int maxIterations, double maxSeconds) {
+    // Load the problem directly into the stored simplex model (created on
+    // first use) and solve it, keeping it for retrieving solution values.
+    // Bounds are left NULL: columns default to [0, inf) and rows to
+    // (-inf, rhs], with the objective negated to minimise.
+    if (simplexModel == NULL) {
+        simplexModel = new ClpSimplex();
+        simplexModel->setLogLevel(0);
+    }
+    CoinPackedMatrix* matrix = getCoinPackedMatrix();
+    simplexModel->loadProblem(
+        *matrix, NULL, NULL, minObjVector, NULL, rhsVector);
+    delete matrix;
+    // Start from a slack basis, as a newly constructed model would.
+    simplexModel->allSlackBasis(true);
+
+    // The model is reused, so every setting is applied on each solve.
+    simplexModel->scaling(scaling < 0 ? 3 : scaling);
+    simplexModel->setPrimalTolerance(primalTolerance > 0 ? primalTolerance : 1e-7);
+    simplexModel->setDualTolerance(dualTolerance > 0 ? dualTolerance : 1e-7);
+    simplexModel->setMaximumIterations(maxIterations < 0 ? COIN_INT_MAX : maxIterations);
+    simplexModel->setMaximumSeconds(maxSeconds < 0 ? -1.0 : maxSeconds);
+
+    if (!presolve && algorithm == ALGORITHM_DUAL) {
+        simplexModel->dual();
+    } else if (!presolve && algorithm == ALGORITHM_PRIMAL) {
+        simplexModel->primal();
+    } else {
+        ClpSolve options;
+        switch (algorithm) {
+            case ALGORITHM_DUAL:
+                options.setSolveType(ClpSolve::useDual); break;
+            case ALGORITHM_PRIMAL:
+                options.setSolveType(ClpSolve::usePrimal); break;
+            case ALGORITHM_BARRIER:
+                options.setSolveType(ClpSolve::useBarrier); break;
+            case ALGORITHM_BARRIER_NOCROSS:
+                options.setSolveType(ClpSolve::useBarrierNoCross); break;
+            default:
+                options.setSolveType(ClpSolve::automatic); break;
+        }
+        options.setPresolveType(presolve ? ClpSolve::presolveOn : ClpSolve::presolveOff);
+        simplexModel->initialSolve(options);
+    }
+    solved = true;
 }
 
 
@@ -10,18 +10,33 @@ using std::string;
 
 #include "ClpModel.hpp"
 #include "ClpSimplex.hpp"
+#include "ClpSolve.hpp"
 #include "OsiClpSolverInterface.hpp"
 
 
+// Solve algorithms for LP::solve
+enum LPAlgorithm {
+    ALGORITHM_DUAL = 0,
+    ALGORITHM_PRIMAL = 1,
+    ALGORITHM_BARRIER = 2,          // barrier followed by crossover
+    ALGORITHM_BARRIER_NOCROSS = 3,  // barrier only (no basis)
+    ALGORITHM_AUTOMATIC = 4,        // chosen by CLP
+};
+
+
 class LP {
 
  public:
     LP();
     ~LP();
 
-    // Construction methods (overwrite existing data)
+    // Construction methods (overwrite existing data, reusing storage if
+    // the dimensions are unchanged)
     void constructDenseCanonical(int nv, int nc, double* A, double* b, double* c);
 
+    // Release all data and solver state (the object can be reused)
+    void reset();
+
     // Conversion to COIN models (return pointers requiring cleanup)
     ClpModel* getClpModel();
     OsiClpSolverInterface* getOsiClpModel();
@@ -41,8 +56,13 @@ class LP {
     void getRhsVector(double* buffer);
     void getObjVector(double* buffer);
 
-    // Solution
+    // Solution (dual simplex without presolve, or with the given options;
+    // negative scaling/tolerances/limits use the CLP defaults)
     void solve();
+    void solve(int algorithm, bool presolve, int scaling,
+               double primalTolerance, double dualTolerance,
+               int maxIterations, double maxSeconds);
+    bool isSolved() { return solved; }
     int getSolutionStatus();
     void getSolutionPrimals(double* buffer);
     void getSolutionSlacks(double* buffer);
@@ -54,11 +74,16 @@ class LP {
     int numVariables;
     int numConstraints;
     int numLHSElements;
+    bool solved;
+
+    // Allocate data arrays for the given dimensions
+    void allocate(int nv, int nc);
 
     // Requiring cleanup
     double* lhsMatrixDense;
     double* rhsVector;
     double* objVector;
+    double* minObjVector;
     ClpSimplex* simplexModel;
 
 };
@@ -1,6 +1,7 @@
 # Cython interface to C++ class connecting the COIN-CLP callable library.
 
 from libcpp.string cimport string
+from libcpp cimport bool
 from cython.operator cimport dereference as deref
 
 import numpy as np
@@ -11,6 +12,7 @@ cdef extern from "lp.hpp":
     cdef cppclass LP:
         LP()
         void constructDenseCanonical(int, int, double*, double*, double*)
+        void reset()
         void writeMps(string)
         void writeMpsIP(string)
         int getNumVariables()
@@ -19,7 +21,8 @@ cdef extern from "lp.hpp":
         void getLhsMatrixDense(double*)
         void getRhsVector(double*)
         void getObjVector(double*)
-        void solve()
+        void solve(int, bool, int, double, double, int, double)
+        bool isSolved()
         int getSolutionStatus();
         void getSolutionPrimals(double*)
         void getSolutionSlacks(double*)
@@ -28,7 +31,17 @@ cdef extern from "lp.hpp":
         void getSolutionBasis(double*)
 
 
+# Options for LPCy.solve, matching LPAlgorithm in lp.hpp and CLP scaling modes.
+ALGORITHMS = dict(dual=0, primal=1, barrier=2, barrier_nocross=3, automatic=4)
+SCALING = dict(off=0, equilibrium=1, geometric=2, auto=3, dynamic=4)
+
+
 cdef class LPCy(object):
+    ''' A model can be reused for any number of instances: constructing
+    overwrites the previous data (reusing storage if dimensions match) and
+    solving reuses the underlying simplex model. reset() releases all
+    storage; using the model as a context manager resets it on exit. '''
+
     cdef LP *wrapped
 
     def __cinit__(self):
@@ -37,6 +50,24 @@ cdef class LPCy(object):
     def __dealloc__(self):
         del self.wrapped
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reset()
+        return False
+
+    def reset(self):
+        deref(self.wrapped).reset()
+
+    def _check_constructed(self):
+        if deref(self.wrapped).getNumVariables() < 0:
+            raise ValueError('Model has no instance data (not constructed, or reset).')
+
+    def _check_solved(self):
+        if not deref(self.wrapped).isSolved():
+            raise ValueError('Model has not been solved since it was constructed.')
+
     def construct_dense_canonical(self, variables, constraints, A, b, c):
         deref(self.wrapped).constructDenseCanonical(
             variables, constraints,
@@ -45,14 +76,17 @@ cdef class LPCy(object):
             contiguous_1d_handle(c))
 
     def write_mps(self, file_name):
+        self._check_constructed()
         cdef string strfilename = file_name.encode('UTF-8')
         deref(self.wrapped).writeMps(strfilename)
 
     def write_mps_ip(self, file_name):
+        self._check_constructed()
         cdef string strfilename = file_name.encode('UTF-8')
         deref(self.wrapped).writeMpsIP(strfilename)
 
     def get_dense_lhs(self):
+        self._check_constructed()
         variables = deref(self.wrapped).getNumVariables()
         constraints = deref(self.wrapped).getNumConstraints()
         result = np.zeros(shape=(constraints, variables))
@@ -60,48 +94,74 @@ cdef class LPCy(object):
         return result
 
     def get_rhs(self):
+        self._check_constructed()
         constraints = deref(self.wrapped).getNumConstraints()
         result = np.zeros(shape=(constraints))
         deref(self.wrapped).getRhsVector(contiguous_1d_handle(result))
         return result
 
     def get_obj(self):
+        self._check_constructed()
         variables = deref(self.wrapped).getNumVariables()
         result = np.zeros(shape=(variables))
         deref(self.wrapped).getObjVector(contiguous_1d_handle(result))
         return result
 
-    def solve(self):
-        deref(self.wrapped).solve()
+    def solve(self, algorithm='dual', presolve=False, scaling=None,
+              primal_tolerance=None, dual_tolerance=None,
+              max_iterations=None, max_seconds=None):
+        ''' Solve the constructed model. :algorithm is one of ALGORITHMS
+        ('barrier' runs crossover to obtain a basis, 'barrier_nocross'
+        leaves the solution without a basis), :scaling one of
+        SCALING. Options left as None use the CLP defaults. If an iteration
+        or time limit is reached the solution status is 3. '''
+        self._check_constructed()
+        if algorithm not in ALGORITHMS:
+            raise ValueError('Unknown algorithm {!r}'.format(algorithm))
+        if scaling is not None and scaling not in SCALING:
+            raise ValueError('Unknown scaling {!r}'.format(scaling))
+        deref(self.wrapped).solve(
+            ALGORITHMS[algorithm], presolve,
+            -1 if scaling is None else SCALING[scaling],
+            -1 if primal_tolerance is None else primal_tolerance,
+            -1 if dual_tolerance is None else dual_tolerance,
+            -1 if max_iterations is None else max_iterations,
+            -1 if max_seconds is None else max_seconds)
 
     def get_solution_status(self):
+        self._check_solved()
         return deref(self.wrapped).getSolutionStatus()
 
     def get_solution_primals(self):
+        self._check_solved()
         variables = deref(self.wrapped).getNumVariables()
         result = np.zeros(shape=(variables))
         deref(self.wrapped).getSolutionPrimals(contiguous_1d_handle(result))
         return result
 
     def get_solution_slacks(self):
+        self._check_solved()
         constraints = deref(self.wrapped).getNumConstraints()
         result = np.zeros(shape=(constraints))
         deref(self.wrapped).getSolutionSlacks(contiguous_1d_handle(result))
         return result
 
     def get_solution_duals(self):
+        self._check_solved()
         constraints = deref(self.wrapped).getNumConstraints()
         result = np.zeros(shape=(constraints))
         deref(self.wrapped).getSolutionDuals(contiguous_1d_handle(result))
         return result
 
     def get_solution_reduced_costs(self):
+        self._check_solved()
         variables = deref(self.wrapped).getNumVariables()
         result = np.zeros(shape=(variables))
         deref(self.wrapped).getSolutionReducedCosts(contiguous_1d_handle(result))
         return result
 
     def get_solution_basis(self):
+        self._check_solved()
         elements = deref(self.wrapped).getNumVariables() + deref(self.wrapped).getNumConstraints()
         result = np.zeros(shape=(elements))
         deref(self.wrapped).getSolutionBasis(contiguous_1d_handle(result))
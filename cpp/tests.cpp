@@ -145,6 +145,85 @@ TEST(LPTest, Solve) {
 }
 
 
+TEST(LPTest, Reuse) {
+
+    double A1[] = {1, 3, 3, 1};
+    double b1[] = {4, 4};
+    double c1[] = {1, 1};
+
+    double A2[] = {
+        1,0,2,0,1,
+        0,1,0,1,0,
+        1,-1,0,1,0,
+        0,0,-1,1,0,
+        };
+    double b2[] = {1, 2, 3, 4};
+    double c2[] = {1, 2, 3, 4, 5};
+
+    // Solve, reconstruct with different dimensions, then the original data
+    LP lp;
+    lp.constructDenseCanonical(2, 2, A1, b1, c1);
+    lp.solve();
+    ASSERT_TRUE(lp.isSolved());
+
+    lp.constructDenseCanonical(5, 4, A2, b2, c2);
+    ASSERT_FALSE(lp.isSolved());
+    ASSERT_EQ(10, lp.getNumLHSElements());
+    lp.solve();
+    ASSERT_EQ(0, lp.getSolutionStatus());
+
+    lp.constructDenseCanonical(2, 2, A1, b1, c1);
+    lp.solve();
+
+    double* primals = new double[2];
+    double* basis = new double[4];
+    lp.getSolutionPrimals(primals);
+    lp.getSolutionBasis(basis);
+    ASSERT_EQ(1, primals[0]);   ASSERT_EQ(1, primals[1]);
+    ASSERT_EQ(1, basis[0]);     ASSERT_EQ(1, basis[1]);
+    ASSERT_EQ(0, basis[2]);     ASSERT_EQ(0, basis[3]);
+    delete[] primals;
+    delete[] basis;
+
+    // Reset releases everything; the object can be constructed again
+    lp.reset();
+    ASSERT_EQ(-1, lp.getNumVariables());
+    ASSERT_FALSE(lp.isSolved());
+    lp.constructDenseCanonical(2, 2, A1, b1, c1);
+    lp.solve();
+    ASSERT_EQ(0, lp.getSolutionStatus());
+
+}
+
+
+TEST(LPTest, SolveOptions) {
+
+    double A[] = {1, 3, 3, 1};
+    double b[] = {4, 4};
+    double c[] = {1, 1};
+
+    LP lp;
+    lp.constructDenseCanonical(2, 2, A, b, c);
+
+    double* primals = new double[2];
+    int algorithms[] = {
+        ALGORITHM_DUAL, ALGORITHM_PRIMAL, ALGORITHM_BARRIER, ALGORITHM_AUTOMATIC};
+    for (int i = 0; i < 4; i++) {
+        lp.solve(algorithms[i], true, 2, 1e-9, 1e-9, -1, -1);
+        ASSERT_EQ(0, lp.getSolutionStatus());
+        lp.getSolutionPrimals(primals);
+        ASSERT_NEAR(1, primals[0], 1e-7);
+        ASSERT_NEAR(1, primals[1], 1e-7);
+    }
+    delete[] primals;
+
+    // Iteration limit stops the solve
+    lp.solve(ALGORITHM_DUAL, false, -1, -1, -1, 0, -1);
+    ASSERT_EQ(3, lp.getSolutionStatus());
+
+}
+
+
 int main(int argc, char **argv) {
     testing::InitGoogleTest(&argc, argv);
     return RUN_ALL_TESTS();
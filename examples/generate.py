@@ -1,6 +1,5 @@
 ''' Example script generating instances with varying properties. '''
 
-import numpy as np
 from tqdm import tqdm
 import pandas as pd
 
@@ -9,7 +8,7 @@ from lp_generators.solution_generators import generate_alpha, generate_beta
 from lp_generators.instance import EncodedInstance
 from lp_generators.features import coeff_features, solution_features
 from lp_generators.performance import clp_simplex_performance
-from lp_generators.utils import calculate_data, write_instance
+from lp_generators.utils import calculate_data, write_instance, random_generator
 from lp_generators.writers import write_tar_encoded, write_mps
 
 
@@ -24,12 +23,12 @@ def generate(seed):
     later to start a search, and write each instance to .mps format. '''
 
     # Seeded random number generator used in all processes.
-    random_state = np.random.RandomState(seed)
+    random_state = random_generator(seed)
 
     # Generation parameters to be passed to generating functions.
     size_params = dict(
-        variables=random_state.randint(50, 100),
-        constraints=random_state.randint(50, 100))
+        variables=random_state.integers(50, 100),
+        constraints=random_state.integers(50, 100))
     beta_params = dict(
         basis_split=random_state.uniform(low=0.0, high=1.0))
     alpha_params = dict(
@@ -49,7 +48,7 @@ def generate(seed):
     # Run the generating functions to produce encoding components and
     # return the constructed instance.
     instance = EncodedInstance(
-        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).todense(),
+        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).toarray(),
         alpha=generate_alpha(random_state=random_state, **size_params, **alpha_params),
         beta=generate_beta(random_state=random_state, **size_params, **beta_params))
     instance.data = dict(seed=seed)
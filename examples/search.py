@@ -3,15 +3,15 @@ primal simplex. '''
 
 import functools
 
-import numpy as np
 from tqdm import tqdm
 import pandas as pd
 
 import lp_generators.neighbours_encoded as neighbours_encoded
 from lp_generators.performance import clp_simplex_performance
 from lp_generators.writers import read_tar_encoded, write_mps
-from lp_generators.utils import calculate_data
-from lp_generators.search import local_search, write_steps
+from lp_generators.journal import journal_steps, replay_journal
+from lp_generators.utils import calculate_data, random_generator
+from lp_generators.search import local_search
 
 
 # Decorator/wrapper to calculate performance data on any instance
@@ -37,22 +37,29 @@ def neighbour(instance, random_state):
 load_start = calc_wrapper(read_tar_encoded)
 
 
-@write_steps(write_mps, 'search/step_{step:04d}.mps.gz', new_only=True)
+random_state = random_generator(1640241240)
+
+
+@journal_steps('search/journal.bin', random_state=random_state)
 def search():
     ''' Search process as a generator/iterator. Returns step_info, instance
     at each step. This search maximises the number of iterations required for
-    primal simplex to solve the instance. Writes any improved instance found
-    to mps format.'''
+    primal simplex to solve the instance. Records each improved instance in a
+    compact journal (use write_steps instead to write full instance files).'''
     return local_search(
         objective=lambda instance: instance.data['clp_primal_iterations'],
         sense='max',
         neighbour=neighbour,
         start_instance=load_start('generated/inst_3072533601.tar'),
         steps=100,
-        random_state=np.random.RandomState(1640241240))
+        random_state=random_state)
 
 # Run search, display improvement steps
 data = pd.DataFrame([
     dict(**step_info, **instance.data) for step_info, instance
     in tqdm(search()) if step_info['search_update'] == 'improved'])
 print(data[['search_step', 'clp_primal_iterations', 'clp_dual_iterations']])
+
+# Reconstruct the final instance from the journal and write it to mps format.
+step, _, instance, _ = replay_journal('search/journal.bin')
+write_mps(instance, 'search/step_{:04d}.mps.gz'.format(step))
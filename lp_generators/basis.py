@@ -0,0 +1,238 @@
+''' Optimal basis reuse for neighbours which change only rhs or objective.
+
+For max c'x, Ax + s = b, x, s >= 0 with optimal basis B (columns of [A | I]
+selected by the basis vector), the same basis remains optimal for new b, c
+if it is primal feasible (B^-1 b >= 0) and dual feasible (reduced costs
+y[A | I] - [c, 0] >= 0 for y = c_B B^-1). Changing only b keeps dual
+feasibility, and changing only c keeps primal feasibility, so a neighbour
+produced by scale_rhs_entry or scale_obj_entry can often be classified
+using the parent's factorised basis, without solving the LP:
+
+    optimal:    the parent basis is optimal; the solution follows directly
+    infeasible: a row of B^-1 proves primal infeasibility (the dual simplex
+                ratio test has no entering variable)
+    unbounded:  a column of B^-1 N proves unboundedness (the primal simplex
+                ratio test has no leaving variable)
+    unknown:    a different basis is needed, so the LP must be solved
+
+Each check costs triangular solves with the LU factors plus products with
+the violating rows/columns, instead of a full simplex solve.
+
+In a search over unsolved instances, ParentBasis keeps the factorised basis
+of the current instance, refactoring it when a step is accepted (wrap the
+search with reuse_basis_steps), and uses it for candidates with unchanged lhs.
+'''
+
+import functools
+
+import numpy as np
+import scipy.linalg
+import scipy.sparse as sparsemat
+
+from .instance import Solution
+from .features import solve_relaxation, relaxation_features
+
+
+class BasisFactor(object):
+    ''' LU factorisation of the basis matrix of :lhs selected by :basis (a
+    0/1 or bool vector over the n variables then m slacks). '''
+
+    def __init__(self, lhs, basis, tolerance=1e-9):
+        self.tolerance = tolerance
+        if sparsemat.issparse(lhs):
+            full = sparsemat.hstack([lhs, sparsemat.identity(lhs.shape[0])]).tocsc()
+        else:
+            lhs = np.asarray(lhs)
+            full = np.hstack([lhs, np.eye(lhs.shape[0])])
+        self.constraints, self.variables = lhs.shape
+        self.basis = np.asarray(basis) > 0.5
+        self.basic = np.flatnonzero(self.basis)
+        self.nonbasic = np.flatnonzero(~self.basis)
+        assert len(self.basic) == self.constraints
+        basis_matrix = full[:, self.basic]
+        nonbasic_matrix = full[:, self.nonbasic]
+        if sparsemat.issparse(full):
+            basis_matrix = basis_matrix.toarray()
+        self._nonbasic_matrix = nonbasic_matrix
+        self._lu = scipy.linalg.lu_factor(basis_matrix, check_finite=False)
+
+    @classmethod
+    def from_instance(cls, instance, solution=None, tolerance=1e-9):
+        ''' Factor the optimal basis of :instance, solving it unless its
+        :solution is given. Returns None if the instance is unsolvable. '''
+        if solution is None:
+            solution = solve_relaxation(instance)
+            if solution is None:
+                return None
+        return cls(instance.lhs(), solution.basis, tolerance)
+
+    def primal_values(self, rhs):
+        ''' Values of the basic variables, B^-1 b. '''
+        return scipy.linalg.lu_solve(self._lu, np.asarray(rhs, dtype=np.float64))
+
+    def duals(self, objective):
+        ''' Dual values y = c_B B^-1 and reduced costs of the nonbasic
+        columns, y N - c_N. '''
+        cost = np.concatenate([np.asarray(objective, dtype=np.float64), np.zeros(self.constraints)])
+        y = scipy.linalg.lu_solve(self._lu, cost[self.basic], trans=1)
+        reduced = np.asarray(self._nonbasic_matrix.T @ y).ravel() - cost[self.nonbasic]
+        return y, reduced
+
+    def _rows(self, rows):
+        # rows of B^-1 N for basic positions :rows
+        unit = np.zeros((self.constraints, len(rows)))
+        unit[rows, np.arange(len(rows))] = 1
+        inverse_rows = scipy.linalg.lu_solve(self._lu, unit, trans=1)
+        return np.asarray(self._nonbasic_matrix.T @ inverse_rows).T
+
+    def _columns(self, columns):
+        # columns of B^-1 N for nonbasic positions :columns
+        matrix = self._nonbasic_matrix[:, columns]
+        if sparsemat.issparse(matrix):
+            matrix = matrix.toarray()
+        return scipy.linalg.lu_solve(self._lu, matrix)
+
+    def check(self, rhs, objective):
+        ''' Classify the LP with this lhs and new :rhs and :objective as
+        'optimal', 'infeasible', 'unbounded' or 'unknown' (see module
+        docstring). Returns (status, solution), where solution is the
+        optimal Solution if status is 'optimal', otherwise None. '''
+        tolerance = self.tolerance
+        values = self.primal_values(rhs)
+        y, reduced = self.duals(objective)
+        primal_violated = np.flatnonzero(values < -tolerance)
+        dual_violated = np.flatnonzero(reduced < -tolerance)
+        if len(primal_violated) == 0 and len(dual_violated) == 0:
+            return 'optimal', self._solution(values, reduced)
+        if len(dual_violated) == 0:
+            # dual feasible: infeasible if a violated row has no negative
+            # entry to pivot on, i.e. the dual is unbounded along it
+            rows = self._rows(primal_violated)
+            if np.any(np.all(rows >= -tolerance, axis=1)):
+                return 'infeasible', None
+        elif len(primal_violated) == 0:
+            # primal feasible: unbounded if an improving column has no
+            # positive entry to limit the step
+            columns = self._columns(dual_violated)
+            if np.any(np.all(columns <= tolerance, axis=0)):
+                return 'unbounded', None
+        return 'unknown', None
+
+    def check_instance(self, instance):
+        ''' check using the rhs and objective of :instance, which must have
+        the same lhs as the instance this basis was factored for. '''
+        return self.check(instance.rhs(), instance.objective())
+
+    def _solution(self, values, reduced):
+        n = self.variables
+        primal = np.zeros(n + self.constraints)
+        primal[self.basic] = np.maximum(values, 0)
+        dual = np.zeros(n + self.constraints)
+        dual[self.nonbasic] = np.maximum(reduced, 0)
+        return Solution(
+            x=primal[:n], s=primal[n:], r=dual[:n], y=dual[n:],
+            basis=self.basis.astype(np.float64))
+
+
+def reuse_solution_features(instance, factor, **options):
+    ''' solution_features for :instance, a neighbour sharing the lhs of the
+    instance :factor was built from. The LP is only solved (with solve
+    :options) if the parent basis check is inconclusive. Also returns the
+    check status as basis_check. '''
+    status, solution = factor.check_instance(instance)
+    if status in ('infeasible', 'unbounded'):
+        return dict(solvable=False, basis_check=status)
+    if solution is None:
+        solution = solve_relaxation(instance, **options)
+    if solution is None:
+        return dict(solvable=False, basis_check=status)
+    return dict(relaxation_features(solution), basis_check=status)
+
+
+def _same_lhs(lhs, other):
+    if lhs is other:
+        return True
+    if other is None or lhs.shape != other.shape:
+        return False
+    if sparsemat.issparse(lhs) or sparsemat.issparse(other):
+        return (sparsemat.csr_matrix(lhs) != sparsemat.csr_matrix(other)).nnz == 0
+    return np.array_equal(lhs, other)
+
+
+class ParentBasis(object):
+    ''' solution_features for the candidates of a search, reusing the
+    factorised optimal basis of the current (parent) instance. Candidates
+    sharing its lhs (e.g. from neighbours_unsolved.scale_rhs_entry or
+    scale_obj_entry) are checked as in reuse_solution_features, others are
+    solved with solve :options. Features include basis_check ('unchecked'
+    for solved candidates). Call accept() with each accepted instance. '''
+
+    def __init__(self, tolerance=1e-9, **options):
+        self.tolerance = tolerance
+        self.options = options
+        self.factor = None
+        self._lhs = None
+        self._solved = {}
+        self.checks = 0
+        self.reused = 0
+
+    def features(self, instance):
+        lhs = instance.lhs()
+        status, solution = 'unchecked', None
+        if self.factor is not None and _same_lhs(lhs, self._lhs):
+            self.checks += 1
+            status, solution = self.factor.check_instance(instance)
+            if status in ('infeasible', 'unbounded'):
+                return dict(solvable=False, basis_check=status)
+            if solution is not None:
+                self.reused += 1
+        if solution is None:
+            solution = solve_relaxation(instance, **self.options)
+        if solution is None:
+            return dict(solvable=False, basis_check=status)
+        # kept so that accepting this candidate does not solve it again
+        self._solved[id(instance)] = (instance, solution)
+        return dict(relaxation_features(solution), basis_check=status)
+
+    __call__ = features
+
+    def accept(self, instance):
+        ''' Factor the basis of :instance, the new current instance, using
+        its solution if it was evaluated since the last accept or clear. '''
+        evaluated = self._solved.get(id(instance))
+        self.clear()
+        if evaluated is not None and evaluated[0] is instance:
+            solution = evaluated[1]
+        else:
+            solution = solve_relaxation(instance, **self.options)
+        if solution is None:
+            self.factor, self._lhs = None, None
+            return
+        lhs = instance.lhs()
+        if (self.factor is not None and _same_lhs(lhs, self._lhs) and
+                np.array_equal(np.asarray(solution.basis) > 0.5, self.factor.basis)):
+            return  # same lhs and basis, the current factors are still valid
+        self.factor = BasisFactor(lhs, solution.basis, self.tolerance)
+        self._lhs = lhs
+
+    def clear(self):
+        ''' Drop the solutions kept for rejected candidates. '''
+        self._solved = {}
+
+
+def reuse_basis_steps(parent_basis):
+    ''' Wrap a search function (see search.write_steps), calling
+    :parent_basis.accept with each improved instance and clearing it after
+    other steps, so an objective using :parent_basis checks candidates
+    against the basis of the current instance. '''
+    def reuse_basis_steps_decorator(func):
+        @functools.wraps(func)
+        def reuse_basis_steps_fn(*args, **kwargs):
+            for step_info, instance in func(*args, **kwargs):
+                if step_info['search_update'] == 'improved':
+                    parent_basis.accept(instance)
+                else:
+                    parent_basis.clear()
+                yield step_info, instance
+        return reuse_basis_steps_fn
+    return reuse_basis_steps_decorator
@@ -0,0 +1,201 @@
+''' Columnar storage for populations of same-sized encoded instances.
+
+InstanceBatch holds N instances with m constraints and n variables as
+stacked contiguous arrays:
+    lhs: N x m x n
+    alpha, beta: N x (n + m)
+The Constructor and SolutionEncoder methods broadcast over the batch axis,
+so rhs(), objective() and solution() return stacked arrays computed with
+vectorised numpy operations. Indexing a batch gives lightweight
+EncodedView objects (or sub-batches for slices) which share the batch
+arrays rather than copying them.
+
+Arrays keep compact dtypes (float32 lhs and alpha, bool beta; see
+InstanceBatch.astype). Batches are saved as a single file with a JSON
+header followed by aligned raw arrays, which load_batch can memory map.
+Boolean beta arrays are bit-packed on disk.
+'''
+
+import json
+import struct
+
+import numpy as np
+
+from .instance import LPInstance, Constructor, decode_solution, storage_dtype
+
+
+class EncodedView(Constructor, LPInstance):
+    ''' Read-only instance view of one element of an InstanceBatch. Arrays
+    returned are views into the batch; neighbour operators copy them into
+    new EncodedInstance objects as usual. '''
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def variables(self):
+        return self._batch.variables
+
+    @property
+    def constraints(self):
+        return self._batch.constraints
+
+    def lhs(self):
+        return self._batch._lhs[self._index]
+
+    def alpha(self):
+        return self._batch._alpha[self._index]
+
+    def beta(self):
+        return self._batch._beta[self._index]
+
+    def solution(self):
+        return decode_solution(self.alpha(), self.beta(), self.variables)
+
+
+class InstanceBatch(Constructor):
+    ''' N encoded instances of the same size stored as stacked arrays. '''
+
+    def __init__(self, lhs, alpha, beta):
+        lhs = np.ascontiguousarray(lhs, dtype=storage_dtype(lhs))
+        alpha = np.ascontiguousarray(alpha, dtype=storage_dtype(alpha))
+        beta = np.ascontiguousarray(beta, dtype=storage_dtype(beta, kinds='fb'))
+        assert lhs.ndim == 3
+        size, m, n = lhs.shape
+        assert alpha.shape == (size, n + m)
+        assert beta.shape == (size, n + m)
+        self._lhs = lhs
+        self._alpha = alpha
+        self._beta = beta
+
+    @classmethod
+    def from_instances(cls, instances):
+        ''' Stack the lhs, alpha and beta of same-sized instances. '''
+        instances = list(instances)
+        return cls(
+            lhs=np.stack([np.asarray(instance.lhs()) for instance in instances]),
+            alpha=np.stack([instance.alpha() for instance in instances]),
+            beta=np.stack([instance.beta() for instance in instances]))
+
+    @property
+    def size(self):
+        return self._lhs.shape[0]
+
+    @property
+    def variables(self):
+        return self._lhs.shape[2]
+
+    @property
+    def constraints(self):
+        return self._lhs.shape[1]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return InstanceBatch(
+                lhs=self._lhs[index], alpha=self._alpha[index], beta=self._beta[index])
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('Batch index out of range')
+        return EncodedView(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield EncodedView(self, index)
+
+    def lhs(self):
+        return self._lhs
+
+    def alpha(self):
+        return self._alpha
+
+    def beta(self):
+        return self._beta
+
+    def solution(self):
+        return decode_solution(self._alpha, self._beta, self.variables)
+
+    def astype(self, dtype=np.float32, beta_dtype=bool):
+        ''' Copy of the batch with lhs and alpha stored as :dtype and beta
+        as :beta_dtype. The defaults give the compact representation. '''
+        return InstanceBatch(
+            lhs=self._lhs.astype(dtype), alpha=self._alpha.astype(dtype),
+            beta=self._beta.astype(beta_dtype))
+
+    @property
+    def nbytes(self):
+        return self._lhs.nbytes + self._alpha.nbytes + self._beta.nbytes
+
+    def save(self, file_name):
+        save_batch(self, file_name)
+
+
+BATCH_MAGIC = b'LPGBATCH'
+BATCH_HEADER = struct.Struct('<8sQ')  # magic, JSON header length
+BATCH_ALIGN = 64
+BATCH_ARRAYS = ['lhs', 'alpha', 'beta']
+
+
+def _aligned(offset):
+    return -(-offset // BATCH_ALIGN) * BATCH_ALIGN
+
+
+def save_batch(batch, file_name):
+    ''' Write a batch as one file: fixed header, JSON array descriptions,
+    then each array's raw C-order data at an aligned offset. Offsets in the
+    description are relative to the aligned start of the data section.
+    Boolean arrays are bit-packed along the last axis. '''
+    arrays = dict(lhs=batch.lhs(), alpha=batch.alpha(), beta=batch.beta())
+    descriptions = dict()
+    offset = 0
+    for name in BATCH_ARRAYS:
+        array = arrays[name]
+        descriptions[name] = dict(dtype=array.dtype.str, shape=list(array.shape))
+        if array.dtype == np.bool_:
+            array = arrays[name] = np.packbits(array, axis=-1)
+            descriptions[name]['packed'] = True
+        descriptions[name]['offset'] = offset
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(descriptions).encode('utf-8')
+    data_start = _aligned(BATCH_HEADER.size + len(header))
+    with open(file_name, 'wb') as outfile:
+        outfile.write(BATCH_HEADER.pack(BATCH_MAGIC, len(header)))
+        outfile.write(header)
+        for name in BATCH_ARRAYS:
+            outfile.write(b'\0' * (data_start + descriptions[name]['offset'] - outfile.tell()))
+            outfile.write(np.ascontiguousarray(arrays[name]).tobytes())
+
+
+def load_batch(file_name, mmap=True):
+    ''' Read a batch written by save_batch. With :mmap the arrays are
+    read-only memory maps of the file, so only accessed instances are
+    read from disk. Bit-packed arrays are unpacked into memory. '''
+    with open(file_name, 'rb') as infile:
+        magic, header_length = BATCH_HEADER.unpack(infile.read(BATCH_HEADER.size))
+        if magic != BATCH_MAGIC:
+            raise ValueError('{} is not an instance batch file'.format(file_name))
+        descriptions = json.loads(infile.read(header_length).decode('utf-8'))
+        data_start = _aligned(BATCH_HEADER.size + header_length)
+        arrays = dict()
+        for name in BATCH_ARRAYS:
+            dtype = np.dtype(descriptions[name]['dtype'])
+            shape = tuple(descriptions[name]['shape'])
+            offset = data_start + descriptions[name]['offset']
+            packed = descriptions[name].get('packed', False)
+            if packed:
+                length = shape[-1]
+                dtype, shape = np.dtype(np.uint8), shape[:-1] + (-(-length // 8), )
+            if mmap:
+                array = np.memmap(file_name, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                infile.seek(offset)
+                array = np.fromfile(
+                    infile, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            if packed:
+                array = np.unpackbits(array, axis=-1, count=length).astype(bool)
+            arrays[name] = array
+    return InstanceBatch(**arrays)
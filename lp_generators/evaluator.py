@@ -0,0 +1,204 @@
+''' Asynchronous solver-based performance labelling.
+
+Solver runs are subprocess-bound, so rather than running them inside CPU
+pool workers, an evaluator streams instances through an asyncio event
+loop: each instance is written to a temporary file and solver processes
+are launched with asyncio.create_subprocess_exec. A semaphore limits the
+number of concurrent solver processes (default: one per core) and the
+number of instances in progress is bounded, so instances are only pulled
+from the input as capacity frees up. Labelled instances are yielded as
+they complete, so generation (e.g. a pipeline.run_pipeline iterator) and
+labelling can be sized independently.
+
+Evaluators are coroutine functions taking (instance, semaphore) and
+returning a dictionary of data, as the synchronous functions in
+performance.py do.
+'''
+
+import os
+import queue
+import asyncio
+import threading
+from contextlib import suppress
+
+from .writers import write_mps_stream, write_mps_ip_stream
+from .utils import temp_file_path
+from .timing import Timings, timing_enabled, timing_name, add_timings
+from .performance import (
+    CLP_METHODS, clp_command, parse_clp_output, clp_performance_data,
+    clp_cutoff_limits, clp_cutoff_result,
+    scip_strongbranch_command, parse_scip_strongbranch_output, strbr_performance_data)
+
+
+async def run_solver(args, semaphore):
+    ''' Run a solver process once a :semaphore slot is free, returning its
+    decoded stdout. The process is killed if the task is cancelled. '''
+    async with semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, _ = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+    return stdout.decode('utf-8')
+
+
+async def _write_instance(write_func, instance, file):
+    # File writing is synchronous, so keep it off the event loop thread.
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, write_func, instance, file)
+
+
+async def clp_simplex_performance_async(instance, semaphore):
+    ''' Asynchronous clp_simplex_performance; the clp methods run as
+    concurrent processes. '''
+    with temp_file_path('.mps.gz') as file:
+        await _write_instance(write_mps_stream, instance, file)
+        outputs = await asyncio.gather(*(
+            run_solver(clp_command(file, method), semaphore) for method in CLP_METHODS))
+    return clp_performance_data(*map(parse_clp_output, outputs))
+
+
+async def clp_cutoff_objective_async(instance, semaphore, cutoff=None,
+                                     method='primalsimplex', field='iterations'):
+    ''' Asynchronous clp_cutoff_objective. '''
+    limits = clp_cutoff_limits(field, cutoff)
+    with temp_file_path('.mps.gz') as file:
+        await _write_instance(write_mps_stream, instance, file)
+        output = await run_solver(clp_command(
+            file, method, limits.get('max_iterations'), limits.get('max_seconds')), semaphore)
+    return clp_cutoff_result(parse_clp_output(output), field)
+
+
+async def strbr_performance_async(instance, semaphore):
+    ''' Asynchronous strbr_performance. '''
+    with temp_file_path('.mps.gz') as file:
+        await _write_instance(write_mps_ip_stream, instance, file)
+        output = await run_solver(scip_strongbranch_command(file), semaphore)
+    return strbr_performance_data(parse_scip_strongbranch_output(output))
+
+
+async def _timed_evaluator(evaluator, instance, semaphore, timings):
+    # Evaluators run concurrently, so only wall time is attributable.
+    with timings.timed(timing_name(evaluator), cpu=False):
+        return await evaluator(instance, semaphore)
+
+
+async def _evaluate_instance(instance, evaluators, semaphore, timing):
+    if timing:
+        timings = Timings()
+        results = await asyncio.gather(*(
+            _timed_evaluator(evaluator, instance, semaphore, timings)
+            for evaluator in evaluators))
+    else:
+        timings = None
+        results = await asyncio.gather(*(
+            evaluator(instance, semaphore) for evaluator in evaluators))
+    if not hasattr(instance, 'data'):
+        instance.data = dict()
+    for result in results:
+        instance.data.update(result)
+    add_timings(instance.data, timings)
+    return instance
+
+
+_DONE = object()
+
+
+async def evaluate_async(instances, evaluators=(clp_simplex_performance_async, ),
+                         concurrency=None, max_pending=None, timing=None):
+    ''' Async generator labelling each of :instances (any iterable) with the
+    results of :evaluators, yielding instances in completion order. At
+    most :concurrency solver processes run at once (default cpu count) and
+    at most :max_pending instances (default twice :concurrency) are in
+    progress. The input is consumed in a worker thread, so it may be a
+    blocking iterator; completed instances are yielded as soon as they
+    finish, before further input is submitted. With :timing the wall time of each evaluator is
+    added to the instance data. '''
+    timing = timing_enabled(timing)
+    concurrency = concurrency or os.cpu_count() or 1
+    max_pending = max_pending or 2 * concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    iterator = iter(instances)
+    exhausted = False
+    pending = set()
+    fetch = None
+    try:
+        while True:
+            # the next input is fetched alongside running evaluations, so
+            # completed instances are never held back by a slow input
+            if fetch is None and not exhausted and len(pending) < max_pending:
+                fetch = loop.run_in_executor(None, next, iterator, _DONE)
+            waiting = (pending | {fetch}) if fetch is not None else pending
+            if not waiting:
+                return
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not fetch:
+                    pending.discard(task)
+                    yield task.result()
+            if fetch in done:
+                instance = fetch.result()
+                fetch = None
+                if instance is _DONE:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(
+                        _evaluate_instance(instance, evaluators, semaphore, timing)))
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def evaluate(instances, evaluators=(clp_simplex_performance_async, ),
+             concurrency=None, max_pending=None, timing=None):
+    ''' Synchronous generator wrapping evaluate_async, for use outside an
+    event loop. The event loop runs in a background thread and labelled
+    instances are passed back through a bounded queue. '''
+    results = queue.Queue(maxsize=max(max_pending or 0, 1))
+    running = dict()
+
+    async def produce():
+        running.update(loop=asyncio.get_running_loop(), task=asyncio.current_task())
+        loop = running['loop']
+        generator = evaluate_async(
+            instances, evaluators, concurrency, max_pending, timing)
+        try:
+            async for instance in generator:
+                await loop.run_in_executor(None, results.put, (instance, None))
+        finally:
+            await generator.aclose()
+
+    def run():
+        try:
+            asyncio.run(produce())
+            results.put((_DONE, None))
+        except BaseException as e:
+            results.put((_DONE, e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            instance, error = results.get()
+            if error is not None:
+                raise error
+            if instance is _DONE:
+                return
+            yield instance
+    finally:
+        if thread.is_alive() and 'task' in running:
+            # stopped early: cancel outstanding solver runs
+            with suppress(RuntimeError):  # loop already closed
+                running['loop'].call_soon_threadsafe(running['task'].cancel)
+        # unblock the producer if it is waiting on a full queue
+        while thread.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
@@ -1,58 +1,220 @@
-''' Feature calculation functions for a canonical form LP instance. '''
+''' Feature calculation functions for a canonical form LP instance.
+
+Coefficient features are computed by a vectorised engine which reduces
+stacked dense instances (or CSR data of sparse instances) in one pass and
+returns a structured array; coeff_features wraps it for single instances.
+Sums are accumulated in float64, so compact float32 instances can be used. '''
 
 import numpy as np
+import scipy.sparse as sparsemat
+
+from .lp_ext import worker_model, construct_canonical
+from .instance import Solution
+from .batch import InstanceBatch
+
+
+# Coefficient feature names and types, in output order.
+COEFF_FEATURES = [
+    ('variables', np.int64),
+    ('constraints', np.int64),
+    ('nonzeros', np.int64),
+    ('lhs_std', np.float64),
+    ('lhs_mean', np.float64),
+    ('lhs_abs_mean', np.float64),
+    ('rhs_std', np.float64),
+    ('rhs_mean', np.float64),
+    ('obj_std', np.float64),
+    ('obj_mean', np.float64),
+    ('coefficient_density', np.float64),
+    ('cons_degree_min', np.int64),
+    ('cons_degree_max', np.int64),
+    ('var_degree_min', np.int64),
+    ('var_degree_max', np.int64),
+    ('rhs_mean_normed', np.float64),
+    ('obj_mean_normed', np.float64),
+    ]
+COEFF_FEATURES_DTYPE = np.dtype(COEFF_FEATURES)
+
+# Number of dense instances reduced at once, bounding temporary memory.
+FEATURE_CHUNK = 1024
+
 
-from .lp_ext import LPCy
+def _fill_coeff_features(result, variables, constraints, count, lhs_sum,
+                         lhs_sqdev, lhs_abs_sum, var_degree, cons_degree,
+                         rhs, objective):
+    ''' Fill a structured feature array from per-instance reductions
+    (leading axis is the instance axis). :lhs_sqdev is the sum of squared
+    deviations of the nonzeros from their mean (a second pass, since
+    sumsq / count - mean ** 2 cancels badly when |mean| >> std). '''
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lhs_mean = lhs_sum / count
+        lhs_abs_mean = lhs_abs_sum / count
+        result['lhs_std'] = np.sqrt(lhs_sqdev / count)
+        result['rhs_mean_normed'] = rhs.mean(axis=-1, dtype=np.float64) / lhs_abs_mean
+        result['obj_mean_normed'] = objective.mean(axis=-1, dtype=np.float64) / lhs_abs_mean
+    result['variables'] = variables
+    result['constraints'] = constraints
+    result['nonzeros'] = count
+    result['lhs_mean'] = lhs_mean
+    result['lhs_abs_mean'] = lhs_abs_mean
+    result['rhs_std'] = rhs.std(axis=-1, dtype=np.float64)
+    result['rhs_mean'] = rhs.mean(axis=-1, dtype=np.float64)
+    result['obj_std'] = objective.std(axis=-1, dtype=np.float64)
+    result['obj_mean'] = objective.mean(axis=-1, dtype=np.float64)
+    result['coefficient_density'] = count / (variables * constraints)
+    result['cons_degree_min'] = cons_degree.min(axis=-1)
+    result['cons_degree_max'] = cons_degree.max(axis=-1)
+    result['var_degree_min'] = var_degree.min(axis=-1)
+    result['var_degree_max'] = var_degree.max(axis=-1)
+
+
+def dense_coeff_features(lhs, rhs, objective):
+    ''' Coefficient features for stacked dense arrays: lhs N x m x n, rhs
+    N x m, objective N x n. All features come from one nonzero mask (for
+    counts and degrees) and sums over the values, since zero entries do not
+    contribute to sums; lhs_std takes a second pass over the nonzeros for
+    squared deviations from the mean. Returns a structured array of length N. '''
+    lhs = np.asarray(lhs)
+    rhs, objective = np.asarray(rhs), np.asarray(objective)
+    size, constraints, variables = lhs.shape
+    result = np.zeros(size, dtype=COEFF_FEATURES_DTYPE)
+    for start in range(0, size, FEATURE_CHUNK):
+        chunk = lhs[start:start + FEATURE_CHUNK]
+        nonzeros = chunk != 0
+        var_degree = nonzeros.sum(axis=1)
+        cons_degree = nonzeros.sum(axis=2)
+        count = cons_degree.sum(axis=1)
+        lhs_sum = chunk.sum(axis=(1, 2), dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = lhs_sum / count
+            deviations = np.where(nonzeros, chunk - mean[:, np.newaxis, np.newaxis], 0)
+        _fill_coeff_features(
+            result[start:start + FEATURE_CHUNK], variables, constraints,
+            count=count, lhs_sum=lhs_sum,
+            lhs_sqdev=np.einsum('ijk,ijk->i', deviations, deviations, dtype=np.float64),
+            lhs_abs_sum=np.abs(chunk).sum(axis=(1, 2), dtype=np.float64),
+            var_degree=var_degree, cons_degree=cons_degree,
+            rhs=rhs[start:start + FEATURE_CHUNK],
+            objective=objective[start:start + FEATURE_CHUNK])
+    return result
+
+
+def sparse_coeff_features(lhs, rhs, objective):
+    ''' Coefficient features for a single sparse lhs, from one pass over
+    the CSR data. Returns a structured array of length 1. '''
+    lhs = sparsemat.csr_matrix(lhs)
+    constraints, variables = lhs.shape
+    values = lhs.data
+    stored = values != 0
+    if not np.all(stored):
+        # explicitly stored zeros are not structural nonzeros
+        lhs = lhs.copy()
+        lhs.eliminate_zeros()
+        values = lhs.data
+    result = np.zeros(1, dtype=COEFF_FEATURES_DTYPE)
+    lhs_sum = values.sum(dtype=np.float64)
+    deviations = values - lhs_sum / values.size if values.size else values
+    _fill_coeff_features(
+        result, variables, constraints,
+        count=np.array([values.size]),
+        lhs_sum=np.array([lhs_sum]),
+        lhs_sqdev=np.array([np.einsum('i,i->', deviations, deviations, dtype=np.float64)]),
+        lhs_abs_sum=np.array([np.abs(values).sum(dtype=np.float64)]),
+        var_degree=np.bincount(lhs.indices, minlength=variables)[np.newaxis],
+        cons_degree=np.diff(lhs.indptr)[np.newaxis],
+        rhs=np.asarray(rhs)[np.newaxis], objective=np.asarray(objective)[np.newaxis])
+    return result
+
+
+def coeff_feature_array(instances):
+    ''' Coefficient features for a population of instances as a structured
+    array with one record per instance (fields as in COEFF_FEATURES).
+    :instances is an InstanceBatch, or a sequence of instances. Dense
+    instances of equal size are stacked and reduced together in chunks;
+    sparse instances each take a single pass over their CSR data. '''
+    if isinstance(instances, InstanceBatch):
+        return dense_coeff_features(
+            instances.lhs(), instances.rhs(), instances.objective())
+    instances = list(instances)
+    result = np.zeros(len(instances), dtype=COEFF_FEATURES_DTYPE)
+    groups = dict()
+    for index, instance in enumerate(instances):
+        lhs = instance.lhs()
+        if sparsemat.issparse(lhs):
+            result[index] = sparse_coeff_features(
+                lhs, instance.rhs(), instance.objective())[0]
+        else:
+            groups.setdefault(np.shape(lhs), []).append(index)
+    for indices in groups.values():
+        for start in range(0, len(indices), FEATURE_CHUNK):
+            chunk = [instances[index] for index in indices[start:start + FEATURE_CHUNK]]
+            result[indices[start:start + FEATURE_CHUNK]] = dense_coeff_features(
+                np.stack([np.asarray(instance.lhs()) for instance in chunk]),
+                np.stack([np.asarray(instance.rhs()) for instance in chunk]),
+                np.stack([np.asarray(instance.objective()) for instance in chunk]))
+    return result
+
+
+def coeff_feature_frame(instances):
+    ''' coeff_feature_array as a pandas DataFrame (requires pandas). '''
+    import pandas as pd
+    return pd.DataFrame(coeff_feature_array(instances))
+
+
+def _record_dict(record):
+    return {name: record[name].item() for name in COEFF_FEATURES_DTYPE.names}
 
 
 def coeff_features(instance):
     ''' Features based on variable/constraint degree and coefficient
-    value distributions. '''
-    lhs = instance.lhs()
-    nonzeros = lhs != 0
-    rhs = instance.rhs()
-    objective = instance.objective()
-    result = dict(
-        variables=int(instance.variables),
-        constraints=int(instance.constraints),
-        nonzeros=int(np.sum(nonzeros)),
-        lhs_std=float(lhs[np.where(nonzeros)].std()),
-        lhs_mean=float(lhs[np.where(nonzeros)].mean()),
-        lhs_abs_mean=float(np.abs(lhs[np.where(nonzeros)]).mean()),
-        rhs_std=float(rhs.std()),
-        rhs_mean=float(rhs.mean()),
-        obj_std=float(objective.std()),
-        obj_mean=float(objective.mean()))
-    result['coefficient_density'] = float(
-        result['nonzeros'] / (instance.variables * instance.constraints))
-    var_degree, cons_degree = degree_seq(lhs)
-    result.update(
-        cons_degree_min=int(cons_degree.min()),
-        cons_degree_max=int(cons_degree.max()),
-        var_degree_min=int(var_degree.min()),
-        var_degree_max=int(var_degree.max()))
-    result.update(
-        rhs_mean_normed=result['rhs_mean'] / result['lhs_abs_mean'],
-        obj_mean_normed=result['obj_mean'] / result['lhs_abs_mean'])
-    return result
+    value distributions. For an InstanceBatch, returns a list of feature
+    dicts computed with vectorised operations over the batch. '''
+    if isinstance(instance, InstanceBatch):
+        return batch_coeff_features(instance)
+    return _record_dict(coeff_feature_array([instance])[0])
 
 
-def solution_features(instance):
-    ''' Solve the instance (using extension module) and retrieve solution
-    data to calculate features of the LP relaxation solution. '''
-    model = LPCy()
-    model.construct_dense_canonical(
-        instance.variables, instance.constraints,
-        np.asarray(instance.lhs()),
-        np.asarray(instance.rhs()),
-        np.asarray(instance.objective()))
-    model.solve()
+def batch_coeff_features(batch):
+    ''' coeff_features for each instance of an InstanceBatch. '''
+    return [_record_dict(record) for record in coeff_feature_array(batch)]
+
+
+def solve_relaxation(instance, model=None, **options):
+    ''' Solve the instance (using extension module) and return the full
+    Solution (x, y, r, s, basis), or None if it could not be solved. Uses
+    :model if given, otherwise the calling thread's reusable model.
+    :options are passed to LPCy.solve (algorithm, presolve, scaling,
+    tolerances and iteration/time limits); a solve stopped by a limit
+    returns None. '''
+    if model is None:
+        model = worker_model()
+    construct_canonical(model, instance)
+    model.solve(**options)
     if (model.get_solution_status() != 0):
+        return None
+    return Solution(
+        x=model.get_solution_primals(),
+        s=model.get_solution_slacks(),
+        y=model.get_solution_duals(),
+        r=model.get_solution_reduced_costs(),
+        basis=model.get_solution_basis())
+
+
+def solution_features(instance, **options):
+    ''' Solve the instance (using extension module) and retrieve solution
+    data to calculate features of the LP relaxation solution. :options are
+    passed to LPCy.solve (see solve_relaxation). '''
+    solution = solve_relaxation(instance, **options)
+    if solution is None:
         return dict(solvable=False)
-    # features specific to instances with a relaxation solution
-    primals = model.get_solution_primals()
+    return relaxation_features(solution)
+
+
+def relaxation_features(solution):
+    ''' Features specific to instances with a relaxation solution. '''
+    primals = solution.x
     fractional_components = np.abs(primals - np.round(primals))
-    slacks = model.get_solution_slacks()
+    slacks = solution.s
     return dict(
         solvable=True,
         binding_constraints=int(np.sum(np.abs(slacks < 10 ** -10))),
@@ -60,8 +222,96 @@ def solution_features(instance):
         total_fractionality=float(np.sum(fractional_components)))
 
 
+def _distribution(prefix, values, tolerance):
+    return {
+        prefix + '_mean': values.mean(axis=-1),
+        prefix + '_std': values.std(axis=-1),
+        prefix + '_min': values.min(axis=-1),
+        prefix + '_max': values.max(axis=-1),
+        prefix + '_nonzero': np.sum(np.abs(values) > tolerance, axis=-1),
+        }
+
+
+def solution_statistics(lhs, objective, solution, tolerance=10 ** -10):
+    ''' Post-process an optimal solution into relaxation features. All
+    arrays may be stacked along leading axes (e.g. a batch of solutions),
+    in which case each feature is an array over those axes.
+
+    Features cover the objective value, the primal/slack split of the
+    basis, primal degeneracy (basic variables at zero) and dual degeneracy
+    (nonbasic variables with zero reduced cost or dual), the 1-norm
+    condition number of the basis matrix, and distribution statistics of
+    the primal, slack, dual and reduced cost values. A sparse lhs is
+    densified, since the basis condition number needs a dense matrix. '''
+    if sparsemat.issparse(lhs):
+        lhs = lhs.toarray()
+    lhs = np.asarray(lhs)
+    objective = np.asarray(objective)
+    x, s, y, r = solution.x, solution.s, solution.y, solution.r
+    basis = np.asarray(solution.basis) > 0.5
+    constraints, variables = lhs.shape[-2:]
+    fractional_components = np.abs(x - np.round(x))
+    primal_basis, slack_basis = basis[..., :variables], basis[..., variables:]
+
+    # basis matrix: columns of [A | I] selected by the basis vector
+    full = np.concatenate([
+        lhs, np.broadcast_to(np.eye(constraints), lhs.shape[:-1] + (constraints, ))], axis=-1)
+    order = np.argsort(~basis, axis=-1, kind='stable')[..., np.newaxis, :constraints]
+    basis_matrix = np.take_along_axis(
+        full, np.broadcast_to(order, lhs.shape[:-1] + (constraints, )), axis=-1)
+    with np.errstate(all='ignore'):
+        try:
+            condition = np.linalg.cond(basis_matrix, 1)
+        except np.linalg.LinAlgError:
+            condition = np.full(lhs.shape[:-2], np.inf)
+
+    result = dict(
+        binding_constraints=np.sum(np.abs(s) < tolerance, axis=-1),
+        fractional_primal=np.sum(fractional_components > tolerance, axis=-1),
+        total_fractionality=np.sum(fractional_components, axis=-1),
+        objective_value=np.sum(objective * x, axis=-1),
+        basis_primal_count=primal_basis.sum(axis=-1),
+        basis_slack_count=slack_basis.sum(axis=-1),
+        basis_primal_fraction=primal_basis.sum(axis=-1) / constraints,
+        primal_degenerate=(
+            np.sum(primal_basis & (np.abs(x) < tolerance), axis=-1) +
+            np.sum(slack_basis & (np.abs(s) < tolerance), axis=-1)),
+        dual_degenerate=(
+            np.sum(~primal_basis & (np.abs(r) < tolerance), axis=-1) +
+            np.sum(~slack_basis & (np.abs(y) < tolerance), axis=-1)),
+        basis_condition=condition,
+        basis_log_condition=np.log10(condition))
+    result['primal_degeneracy_ratio'] = result['primal_degenerate'] / constraints
+    result['dual_degeneracy_ratio'] = result['dual_degenerate'] / variables
+    result.update(_distribution('primal', x, tolerance))
+    result.update(_distribution('slack', s, tolerance))
+    result.update(_distribution('dual', y, tolerance))
+    result.update(_distribution('reduced_cost', r, tolerance))
+    return result
+
+
+def extended_solution_features(instance, **options):
+    ''' Solve the instance once and compute the extended relaxation
+    feature set of solution_statistics (a superset of solution_features).
+    :options are passed to LPCy.solve (see solve_relaxation). '''
+    solution = solve_relaxation(instance, **options)
+    if solution is None:
+        return dict(solvable=False)
+    statistics = solution_statistics(instance.lhs(), instance.objective(), solution)
+    result = dict(solvable=True)
+    result.update((key, np.asarray(value).item()) for key, value in statistics.items())
+    return result
+
+
 def degree_seq(lhs):
     ''' Return variable and constraint degree coefficients as numpy arrays. '''
-    lhs = np.array(lhs)
-    nonzeros = lhs != 0
+    if sparsemat.issparse(lhs):
+        # count stored nonzeros without modifying the caller's matrix
+        lhs = sparsemat.csr_matrix(lhs)
+        stored = lhs.data != 0
+        rows = np.repeat(np.arange(lhs.shape[0]), np.diff(lhs.indptr))
+        return (
+            np.bincount(lhs.indices[stored], minlength=lhs.shape[1]),
+            np.bincount(rows[stored], minlength=lhs.shape[0]))
+    nonzeros = np.asarray(lhs) != 0
     return nonzeros.sum(axis=0), nonzeros.sum(axis=1)
@@ -0,0 +1,389 @@
+''' Streaming text formats for canonical form instances (max cTx, Ax <= b,
+x >= 0). Writers work directly from the instance arrays, dense or scipy
+sparse, without building a solver model, and write to any binary file
+object in chunks.
+
+MPS files are written in free format as the equivalent minimisation problem
+(min -cTx), matching the models written through the CLP extension. CPLEX LP
+files keep the maximisation sense. Columns are named C<j> and rows R<i>.
+
+The MPS reader parses general LPs (and the relaxations of MIPs) line by
+line into compact coordinate arrays, and canonical_form converts them to
+canonical form using sparse matrix operations only.
+'''
+
+import array
+import collections
+
+import numpy as np
+import scipy.sparse as sparsemat
+
+
+# Number of matrix entries formatted per write call.
+CHUNK_ENTRIES = 2 ** 16
+# Number of terms per line in LP format expressions.
+LP_TERMS_PER_LINE = 8
+
+
+def compressed_columns(lhs):
+    ''' Return (indptr, row indices, values) of the nonzero entries of :lhs
+    in column major order, for a dense or sparse matrix. '''
+    if sparsemat.issparse(lhs):
+        matrix = sparsemat.csc_matrix(lhs)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        return matrix.indptr, matrix.indices, matrix.data
+    dense = np.asarray(lhs)
+    cols, rows = np.nonzero(dense.T)
+    counts = np.bincount(cols, minlength=dense.shape[1])
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, rows, dense[rows, cols]
+
+
+def compressed_rows(lhs):
+    ''' Return (indptr, column indices, values) of the nonzero entries of
+    :lhs in row major order, for a dense or sparse matrix. '''
+    if sparsemat.issparse(lhs):
+        matrix = sparsemat.csr_matrix(lhs)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        return matrix.indptr, matrix.indices, matrix.data
+    dense = np.asarray(lhs)
+    rows, cols = np.nonzero(dense)
+    counts = np.bincount(rows, minlength=dense.shape[0])
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, cols, dense[rows, cols]
+
+
+def _chunks(total, size=CHUNK_ENTRIES):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def dump_mps(instance, outfile, integer=False, name='LPGEN'):
+    ''' Write :instance to the binary file object :outfile in free MPS
+    format. If :integer is set, all variables are marked integer (with
+    explicit [0, inf) bounds, since some readers default integer variables
+    to binary). '''
+    variables, constraints = instance.variables, instance.constraints
+    objective = np.asarray(instance.objective(), dtype=np.float64).ravel()
+    rhs = np.asarray(instance.rhs(), dtype=np.float64).ravel()
+    indptr, rows, values = compressed_columns(instance.lhs())
+    write = lambda text: outfile.write(text.encode('ascii'))
+
+    write('NAME {} FREE\nROWS\n N OBJ\n'.format(name))
+    for start, stop in _chunks(constraints):
+        write(''.join(' L R%d\n' % i for i in range(start, stop)))
+
+    write('COLUMNS\n')
+    if integer:
+        write("    MARKER                 'MARKER'                 'INTORG'\n")
+    # Objective coefficient of each column is written before its entries.
+    # Columns are formatted in chunks of about CHUNK_ENTRIES entries, so
+    # memory does not grow with the number of nonzeros.
+    row_names = [' R%d ' % i for i in range(constraints)]
+    neg_objective = (-objective + 0.0).tolist()
+    start = 0
+    while start < variables:
+        stop = int(np.searchsorted(indptr, indptr[start] + CHUNK_ENTRIES, side='right')) - 1
+        stop = min(max(stop, start + 1), variables)
+        offsets = (indptr[start:stop + 1] - indptr[start]).tolist()
+        chunk_rows = rows[indptr[start]:indptr[stop]].tolist()
+        chunk_values = list(map(repr, values[indptr[start]:indptr[stop]].tolist()))
+        lines = []
+        for k, j in enumerate(range(start, stop)):
+            prefix = ' C%d' % j
+            lines.append('%s OBJ %r\n' % (prefix, neg_objective[j]))
+            lines.extend(
+                prefix + row_names[row] + value + '\n' for row, value in zip(
+                    chunk_rows[offsets[k]:offsets[k + 1]], chunk_values[offsets[k]:offsets[k + 1]]))
+        write(''.join(lines))
+        start = stop
+    if integer:
+        write("    MARKER                 'MARKER'                 'INTEND'\n")
+
+    write('RHS\n')
+    nonzero_rhs = np.flatnonzero(rhs)
+    for start, stop in _chunks(len(nonzero_rhs)):
+        write(''.join(
+            ' RHS R%d %r\n' % (i, float(rhs[i]))
+            for i in nonzero_rhs[start:stop].tolist()))
+
+    if integer:
+        write('BOUNDS\n')
+        for start, stop in _chunks(variables):
+            write(''.join(' PL BND C%d\n' % j for j in range(start, stop)))
+    write('ENDATA\n')
+
+
+def _lp_terms(indices, values):
+    ''' Format a linear expression as LP format lines. '''
+    terms = [
+        '{} {!r} C{}'.format('-' if value < 0 else '+', abs(value), index)
+        for index, value in zip(indices, values)]
+    if len(terms) == 0:
+        terms = ['+ 0.0 C0']
+    return '\n   '.join(
+        ' '.join(terms[start:start + LP_TERMS_PER_LINE])
+        for start in range(0, len(terms), LP_TERMS_PER_LINE))
+
+
+def dump_lp(instance, outfile, integer=False):
+    ''' Write :instance to the binary file object :outfile in CPLEX LP
+    format. If :integer is set, all variables are declared general
+    integers. Default LP format bounds (x >= 0) match the canonical form,
+    so no bounds section is written. '''
+    variables, constraints = instance.variables, instance.constraints
+    objective = np.asarray(instance.objective(), dtype=np.float64).ravel()
+    rhs = np.asarray(instance.rhs(), dtype=np.float64).ravel()
+    indptr, cols, values = compressed_rows(instance.lhs())
+    write = lambda text: outfile.write(text.encode('ascii'))
+
+    obj_indices = np.flatnonzero(objective)
+    write('Maximize\n obj: {}\nSubject To\n'.format(
+        _lp_terms(obj_indices.tolist(), objective[obj_indices].tolist())))
+    indptr, cols, values = indptr.tolist(), cols.tolist(), values.tolist()
+    for start, stop in _chunks(constraints, 256):
+        write(''.join(
+            ' R{}: {} <= {!r}\n'.format(
+                i, _lp_terms(cols[indptr[i]:indptr[i + 1]], values[indptr[i]:indptr[i + 1]]),
+                float(rhs[i]))
+            for i in range(start, stop)))
+    if integer:
+        write('General\n')
+        for start, stop in _chunks(variables, LP_TERMS_PER_LINE * 64):
+            write(''.join(
+                ' ' + ' '.join('C%d' % j for j in range(line, min(line + LP_TERMS_PER_LINE, stop))) + '\n'
+                for line in range(start, stop, LP_TERMS_PER_LINE)))
+    write('End\n')
+
+
+MPSModel = collections.namedtuple('MPSModel', [
+    'name', 'sense', 'row_names', 'row_types', 'col_names',
+    'entry_rows', 'entry_cols', 'entry_values',
+    'objective', 'objective_constant', 'rhs', 'ranges',
+    'lower', 'upper', 'integer'])
+
+
+def parse_mps(lines):
+    ''' Parse an MPS file from an iterable of text lines. Fields are split
+    on whitespace, so both free format and fixed format files are accepted,
+    provided names do not contain spaces. Matrix entries are accumulated in
+    typed arrays rather than per-entry python objects.
+
+    Returns an MPSModel describing
+        sense: 'min' or 'max' of objective . x + objective_constant
+        rows: row_types 'L', 'G' or 'E' (free rows other than the objective
+            are dropped), with rhs and ranges
+        columns: lower and upper bounds, integer markers
+        matrix: coordinate form entries (rows, cols, values) '''
+    name = ''
+    sense = 'min'
+    objective_row = None
+    row_index = dict()
+    row_names, row_types = [], []
+    col_index = dict()
+    col_names = []
+    entry_rows, entry_cols, entry_values = array.array('q'), array.array('q'), array.array('d')
+    objective = array.array('d')
+    objective_constant = 0.0
+    rhs, ranges, bounds = dict(), dict(), []
+    integer = array.array('b')
+    in_integer_block = False
+    section = None
+
+    for line in lines:
+        if len(line) == 0 or line[0] in '*\n\r':
+            continue
+        fields = line.split()
+        if len(fields) == 0:
+            continue
+        if not line[0].isspace():
+            section = fields[0].upper()
+            if section == 'NAME':
+                name = fields[1] if len(fields) > 1 else ''
+            elif section == 'OBJSENSE' and len(fields) > 1:
+                sense = 'max' if fields[1].upper().startswith('MAX') else 'min'
+            elif section == 'ENDATA':
+                break
+            elif section not in ('ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS', 'OBJSENSE'):
+                raise ValueError('Unsupported MPS section {}'.format(section))
+            continue
+
+        if section == 'COLUMNS':
+            if len(fields) >= 3 and fields[1].strip("'").upper() == 'MARKER':
+                marker = fields[2].strip("'").upper()
+                in_integer_block = (marker == 'INTORG')
+                continue
+            col = col_index.get(fields[0])
+            if col is None:
+                col = col_index[fields[0]] = len(col_names)
+                col_names.append(fields[0])
+                objective.append(0.0)
+                integer.append(in_integer_block)
+            for row_name, value in zip(fields[1::2], fields[2::2]):
+                row = row_index[row_name]
+                if row == -1:
+                    if row_name == objective_row:
+                        objective[col] = float(value)
+                    continue
+                entry_rows.append(row)
+                entry_cols.append(col)
+                entry_values.append(float(value))
+        elif section == 'ROWS':
+            row_type, row_name = fields[0].upper(), fields[1]
+            if row_type == 'N':
+                # free rows are not constraints; the first is the objective
+                if objective_row is None:
+                    objective_row = row_name
+                row_index[row_name] = -1
+            else:
+                row_index[row_name] = len(row_names)
+                row_names.append(row_name)
+                row_types.append(row_type)
+        elif section == 'RHS':
+            # the set name field is optional when an odd number of fields remain
+            pairs = fields[1:] if len(fields) % 2 == 1 else fields
+            for row_name, value in zip(pairs[0::2], pairs[1::2]):
+                row = row_index[row_name]
+                if row_name == objective_row:
+                    objective_constant = -float(value)
+                elif row != -1:
+                    rhs[row] = float(value)
+        elif section == 'RANGES':
+            pairs = fields[1:] if len(fields) % 2 == 1 else fields
+            for row_name, value in zip(pairs[0::2], pairs[1::2]):
+                row = row_index[row_name]
+                if row != -1:
+                    ranges[row] = float(value)
+        elif section == 'BOUNDS':
+            bound_type = fields[0].upper()
+            if bound_type in ('FR', 'MI', 'PL', 'BV'):
+                col_name = fields[2] if len(fields) > 2 else fields[1]
+                value = None
+            else:
+                col_name, value = fields[-2], float(fields[-1])
+            bounds.append((bound_type, col_index[col_name], value))
+        elif section == 'OBJSENSE':
+            sense = 'max' if fields[0].upper().startswith('MAX') else 'min'
+
+    variables = len(col_names)
+    lower = np.zeros(variables)
+    upper = np.full(variables, np.inf)
+    for bound_type, col, value in bounds:
+        if bound_type == 'UP' or bound_type == 'UI':
+            upper[col] = value
+            if value < 0 and lower[col] == 0:
+                lower[col] = -np.inf
+        elif bound_type == 'LO' or bound_type == 'LI':
+            lower[col] = value
+        elif bound_type == 'FX':
+            lower[col] = upper[col] = value
+        elif bound_type == 'FR':
+            lower[col], upper[col] = -np.inf, np.inf
+        elif bound_type == 'MI':
+            lower[col] = -np.inf
+        elif bound_type == 'PL':
+            upper[col] = np.inf
+        elif bound_type == 'BV':
+            lower[col], upper[col] = 0.0, 1.0
+        else:
+            raise ValueError('Unsupported MPS bound type {}'.format(bound_type))
+
+    constraints = len(row_names)
+    rhs_vector = np.zeros(constraints)
+    range_vector = np.full(constraints, np.nan)
+    if rhs:
+        rhs_vector[list(rhs.keys())] = list(rhs.values())
+    if ranges:
+        range_vector[list(ranges.keys())] = list(ranges.values())
+
+    return MPSModel(
+        name=name, sense=sense, row_names=row_names,
+        row_types=np.array(row_types, dtype='U1'), col_names=col_names,
+        entry_rows=np.frombuffer(entry_rows, dtype=np.int64),
+        entry_cols=np.frombuffer(entry_cols, dtype=np.int64),
+        entry_values=np.frombuffer(entry_values, dtype=np.float64),
+        objective=np.frombuffer(objective, dtype=np.float64),
+        objective_constant=objective_constant,
+        rhs=rhs_vector, ranges=range_vector,
+        lower=lower, upper=upper,
+        integer=np.frombuffer(integer, dtype=np.int8).astype(bool))
+
+
+def row_bounds(model):
+    ''' Return (row lower, row upper) activity bounds for an MPSModel,
+    applying RANGES as defined by the MPS format. '''
+    types, rhs, ranges = model.row_types, model.rhs, model.ranges
+    lower = np.where((types == 'G') | (types == 'E'), rhs, -np.inf)
+    upper = np.where((types == 'L') | (types == 'E'), rhs, np.inf)
+    has_range = ~np.isnan(ranges)
+    magnitude = np.abs(np.nan_to_num(ranges))
+    is_g, is_l, is_e = has_range & (types == 'G'), has_range & (types == 'L'), has_range & (types == 'E')
+    upper = np.where(is_g, rhs + magnitude, upper)
+    lower = np.where(is_l, rhs - magnitude, lower)
+    upper = np.where(is_e & (ranges > 0), rhs + magnitude, upper)
+    lower = np.where(is_e & (ranges < 0), rhs - magnitude, lower)
+    return lower, upper
+
+
+def canonical_form(model):
+    ''' Convert a parsed MPSModel to canonical form max cTx', A'x' <= b',
+    x' >= 0. Returns (A' as a CSR matrix, b', c', info dict).
+
+    Columns are substituted as x = T x' + d:
+        finite lower bound l: x = l + x' (upper bound u adds x' <= u - l)
+        only an upper bound u: x = u - x'
+        free: x = x'+ - x'-
+    Rows with a finite upper bound give a_i x' <= u_i - a_i d; rows with a
+    finite lower bound give -a_i x' <= -(l_i - a_i d), so equality and
+    ranged rows become two rows. The objective constant (including the
+    shift c . d) is reported in the info dict as it does not appear in the
+    canonical form. '''
+    variables, constraints = len(model.col_names), len(model.row_names)
+    matrix = sparsemat.csr_matrix(
+        (model.entry_values, (model.entry_rows, model.entry_cols)),
+        shape=(constraints, variables))
+    lower, upper = model.lower, model.upper
+    objective = model.objective if model.sense == 'max' else -model.objective
+    constant = model.objective_constant if model.sense == 'max' else -model.objective_constant
+
+    # Column substitution x = T x' + d
+    has_lower, has_upper = np.isfinite(lower), np.isfinite(upper)
+    negated = ~has_lower & has_upper
+    free = ~has_lower & ~has_upper
+    shift = np.where(has_lower, lower, np.where(negated, upper, 0.0))
+    free_cols = np.flatnonzero(free)
+    new_cols = variables + len(free_cols)
+    transform = sparsemat.csc_matrix((
+        np.concatenate([np.where(negated, -1.0, 1.0), -np.ones(len(free_cols))]),
+        (np.concatenate([np.arange(variables), free_cols]), np.arange(new_cols))),
+        shape=(variables, new_cols))
+    lhs = (matrix @ transform).tocsr()
+    activity_shift = matrix @ shift
+    new_objective = transform.T @ objective
+    constant += float(objective @ shift)
+
+    # Rows from finite row activity bounds, then column upper bounds
+    row_lower, row_upper = row_bounds(model)
+    upper_rows = np.flatnonzero(np.isfinite(row_upper))
+    lower_rows = np.flatnonzero(np.isfinite(row_lower))
+    bounded_cols = np.flatnonzero(has_lower & has_upper)
+    bound_rows = sparsemat.csr_matrix(
+        (np.ones(len(bounded_cols)), (np.arange(len(bounded_cols)), bounded_cols)),
+        shape=(len(bounded_cols), new_cols))
+    lhs = sparsemat.vstack([
+        lhs[upper_rows], -lhs[lower_rows], bound_rows], format='csr')
+    rhs = np.concatenate([
+        row_upper[upper_rows] - activity_shift[upper_rows],
+        -(row_lower[lower_rows] - activity_shift[lower_rows]),
+        upper[bounded_cols] - lower[bounded_cols]])
+
+    info = dict(
+        name=model.name,
+        original_variables=variables,
+        original_constraints=constraints,
+        integer_variables=int(np.sum(model.integer)),
+        objective_constant=constant,
+        objective_sense=model.sense)
+    return lhs, rhs, np.asarray(new_objective, dtype=np.float64), info
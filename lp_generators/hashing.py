@@ -0,0 +1,88 @@
+''' Structural hashing of instances, and a bounded memory of visited
+instances for local search.
+
+Neighbour operators often reproduce an instance which has already been
+evaluated (exchanging a basis element back, removing then re-adding an lhs
+entry, ...). instance_hash digests the stored data of an instance: A, alpha
+and beta for encoded instances, A, b and c otherwise. Hashing is a single
+pass over the arrays, so it is far cheaper than evaluating a solver based
+objective. A VisitedSet maps hashes to objective values so that repeated
+candidates need not be evaluated again.
+'''
+
+import hashlib
+import collections
+
+import numpy as np
+import scipy.sparse as sparsemat
+
+from .instance import Constructor
+
+
+def _update(digest, array):
+    array = np.ascontiguousarray(array)
+    digest.update('{}{}'.format(array.dtype.str, array.shape).encode('ascii'))
+    digest.update(array.data)
+
+
+def instance_hash(instance):
+    ''' 128 bit digest (as bytes) of the data defining :instance. Instances
+    constructed from a solution encoding (EncodedInstance etc.) are hashed
+    by lhs, alpha and beta, others by lhs, rhs and objective. Equal digests
+    mean equal data in the same storage format; the same instance stored
+    with a different dtype or dense/sparse lhs hashes differently. '''
+    digest = hashlib.blake2b(digest_size=16)
+    lhs = instance.lhs()
+    if sparsemat.issparse(lhs):
+        lhs = sparsemat.csr_matrix(lhs, copy=True)
+        lhs.sum_duplicates()
+        lhs.eliminate_zeros()
+        for part in (lhs.indptr, lhs.indices, lhs.data):
+            _update(digest, part)
+        digest.update(str(lhs.shape).encode('ascii'))
+    else:
+        _update(digest, lhs)
+    if isinstance(instance, Constructor):
+        _update(digest, instance.alpha())
+        _update(digest, np.asarray(instance.beta()) != 0)
+    else:
+        _update(digest, instance.rhs())
+        _update(digest, instance.objective())
+    return digest.digest()
+
+
+class VisitedSet(object):
+    ''' Objective values of up to :capacity visited instances, keyed by
+    instance_hash. The least recently seen instances are forgotten first,
+    so the set acts as a tabu memory of the recent search trajectory. '''
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self._values = collections.OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key):
+        ''' Stored objective value for :key, or None if not visited. '''
+        self.lookups += 1
+        value = self._values.get(key)
+        if value is not None:
+            self.hits += 1
+            self._values.move_to_end(key)
+        return value
+
+    def add(self, key, value):
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.capacity:
+            self._values.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
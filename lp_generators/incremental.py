@@ -0,0 +1,175 @@
+''' Incremental coefficient features for local search.
+
+A CoeffFeatureTracker keeps the count, mean and sum of squared deviations
+of the lhs nonzeros (updated with Chan et al.'s parallel variance formulas
+as entries are added and removed, so lhs_std is accurate when |mean| >> std,
+matching the two-pass coeff_features), along with absolute sums and degree
+histograms for the lhs of an instance, so that the coeff_features of a
+neighbour which changes a few rows, columns or entries can be computed in
+time proportional to the changed entries instead of a full matrix pass.
+Trackers are cheap to copy (O(m + n)), so a candidate's tracker can be
+derived from the current one and kept only if the candidate is accepted.
+
+Running sums accumulate rounding error over many updates; build a fresh
+tracker from the instance if exact agreement with coeff_features is needed
+after a long search.
+'''
+
+import numpy as np
+
+
+class CoeffFeatureTracker(object):
+    ''' Running coefficient statistics of an instance (A, b, c). '''
+
+    def __init__(self, lhs, rhs, objective):
+        lhs = np.asarray(lhs)
+        self.constraints, self.variables = lhs.shape
+        nonzeros = lhs != 0
+        values = lhs[nonzeros].astype(np.float64)
+        self.count = len(values)
+        self.lhs_mean = float(values.mean()) if self.count else 0.0
+        deviations = values - self.lhs_mean
+        self.lhs_sqdev = float(deviations @ deviations)
+        self.lhs_abs_sum = float(np.abs(lhs).sum(dtype=np.float64))
+        self.var_degree = nonzeros.sum(axis=0)
+        self.cons_degree = nonzeros.sum(axis=1)
+        self.var_histogram = np.bincount(self.var_degree, minlength=self.constraints + 1)
+        self.cons_histogram = np.bincount(self.cons_degree, minlength=self.variables + 1)
+        self.set_rhs(rhs)
+        self.set_objective(objective)
+
+    @classmethod
+    def from_instance(cls, instance):
+        return cls(instance.lhs(), instance.rhs(), instance.objective())
+
+    def copy(self):
+        tracker = CoeffFeatureTracker.__new__(CoeffFeatureTracker)
+        tracker.__dict__.update(self.__dict__)
+        for name in ['var_degree', 'cons_degree', 'var_histogram', 'cons_histogram']:
+            setattr(tracker, name, getattr(self, name).copy())
+        return tracker
+
+    def set_rhs(self, rhs):
+        ''' Replace rhs statistics (O(m)). '''
+        rhs = np.asarray(rhs)
+        self.rhs_mean = float(rhs.mean(dtype=np.float64))
+        self.rhs_std = float(rhs.std(dtype=np.float64))
+
+    def set_objective(self, objective):
+        ''' Replace objective statistics (O(n)). '''
+        objective = np.asarray(objective)
+        self.obj_mean = float(objective.mean(dtype=np.float64))
+        self.obj_std = float(objective.std(dtype=np.float64))
+
+    def update_entries(self, rows, cols, old_values, new_values):
+        ''' Update statistics for lhs entries (rows[k], cols[k]) changing
+        from old_values[k] to new_values[k]. Positions must be unique. '''
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        old_values = np.asarray(old_values, dtype=np.float64)
+        new_values = np.asarray(new_values, dtype=np.float64)
+        self._remove_values(old_values[old_values != 0])
+        self._add_values(new_values[new_values != 0])
+        self.lhs_abs_sum += float(np.abs(new_values).sum() - np.abs(old_values).sum())
+        delta = (new_values != 0).astype(np.int64) - (old_values != 0)
+        changed = delta != 0
+        if not np.any(changed):
+            return
+        rows, cols, delta = rows[changed], cols[changed], delta[changed]
+        _update_degrees(self.cons_degree, self.cons_histogram, rows, delta)
+        _update_degrees(self.var_degree, self.var_histogram, cols, delta)
+
+    def _add_values(self, values):
+        # merge the moments of :values into the running moments
+        if len(values) == 0:
+            return
+        added_mean = float(values.mean())
+        added_deviations = values - added_mean
+        count = self.count + len(values)
+        delta = added_mean - self.lhs_mean
+        self.lhs_mean += delta * len(values) / count
+        self.lhs_sqdev += (
+            float(added_deviations @ added_deviations) +
+            delta * delta * self.count * len(values) / count)
+        self.count = count
+
+    def _remove_values(self, values):
+        # inverse of _add_values for :values present in the matrix
+        if len(values) == 0:
+            return
+        count = self.count - len(values)
+        if count == 0:
+            self.count, self.lhs_mean, self.lhs_sqdev = 0, 0.0, 0.0
+            return
+        removed_mean = float(values.mean())
+        removed_deviations = values - removed_mean
+        delta = removed_mean - self.lhs_mean
+        # delta is relative to the combined mean; rescale to the remainder's
+        self.lhs_mean -= delta * len(values) / count
+        self.lhs_sqdev -= (
+            float(removed_deviations @ removed_deviations) +
+            delta * delta * self.count * len(values) / count)
+        # rounding can leave a tiny negative value if the rest are equal
+        self.lhs_sqdev = max(self.lhs_sqdev, 0.0)
+        self.count = count
+
+    def updated(self, old_instance, new_instance, rows=None, columns=None):
+        ''' Return a new tracker for :new_instance, a neighbour of
+        :old_instance (the instance this tracker describes). If the changed
+        lhs :rows and/or :columns are given, only those are compared;
+        otherwise the full matrices are compared to find changed entries.
+        rhs and objective statistics are recomputed from the new vectors. '''
+        old_lhs, new_lhs = np.asarray(old_instance.lhs()), np.asarray(new_instance.lhs())
+        if rows is None and columns is None:
+            changed_rows, changed_cols = np.nonzero(old_lhs != new_lhs)
+        else:
+            positions = []
+            if rows is not None:
+                positions.append((
+                    np.asarray(rows)[:, np.newaxis] * self.variables +
+                    np.arange(self.variables)).ravel())
+            if columns is not None:
+                positions.append((
+                    np.arange(self.constraints)[:, np.newaxis] * self.variables +
+                    np.asarray(columns)).ravel())
+            changed_rows, changed_cols = np.divmod(
+                np.unique(np.concatenate(positions)), self.variables)
+        tracker = self.copy()
+        tracker.update_entries(
+            changed_rows, changed_cols,
+            old_lhs[changed_rows, changed_cols], new_lhs[changed_rows, changed_cols])
+        tracker.set_rhs(new_instance.rhs())
+        tracker.set_objective(new_instance.objective())
+        return tracker
+
+    def features(self):
+        ''' Coefficient features, with the same keys as coeff_features. '''
+        lhs_abs_mean = self.lhs_abs_sum / self.count
+        cons_present = np.flatnonzero(self.cons_histogram)
+        var_present = np.flatnonzero(self.var_histogram)
+        return dict(
+            variables=int(self.variables),
+            constraints=int(self.constraints),
+            nonzeros=int(self.count),
+            lhs_std=float(np.sqrt(self.lhs_sqdev / self.count)),
+            lhs_mean=float(self.lhs_mean),
+            lhs_abs_mean=float(lhs_abs_mean),
+            rhs_std=self.rhs_std,
+            rhs_mean=self.rhs_mean,
+            obj_std=self.obj_std,
+            obj_mean=self.obj_mean,
+            coefficient_density=float(self.count / (self.variables * self.constraints)),
+            cons_degree_min=int(cons_present[0]),
+            cons_degree_max=int(cons_present[-1]),
+            var_degree_min=int(var_present[0]),
+            var_degree_max=int(var_present[-1]),
+            rhs_mean_normed=self.rhs_mean / lhs_abs_mean,
+            obj_mean_normed=self.obj_mean / lhs_abs_mean)
+
+
+def _update_degrees(degree, histogram, vertices, delta):
+    ''' Apply degree changes, moving affected vertices between histogram
+    bins. Vertices may repeat. '''
+    affected = np.unique(vertices)
+    np.subtract.at(histogram, degree[affected], 1)
+    np.add.at(degree, vertices, delta)
+    np.add.at(histogram, degree[affected], 1)
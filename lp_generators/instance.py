@@ -2,13 +2,15 @@
 
 Incomplete classes providing common methods:
     Constructor: build rhs and objective from solution
-    DenseLHS: store constraint left hand side as dense numpy matrix
+    DenseLHS: store constraint left hand side as dense numpy array
+    SparseLHS: store constraint left hand side as scipy sparse matrix
     SolutionEncoder: build alpha/beta from solution
 
 Complete classes implementing the entire interface:
     EncodedInstance: store as lhs, alpha, beta
     SolvedInstance: store as lhs, solution
     UnsolvedInstance: store as A, b, c
+    SparseUnsolvedInstance: store as sparse A, b, c
 
 Note that UnsolvedInstance may not be decodable (if it does not have a
 solution) so attempting to solve will throw a value error.
@@ -21,8 +23,9 @@ import collections
 from abc import ABC, abstractproperty
 
 import numpy as np
+import scipy.sparse as sparsemat
 
-from .lp_ext import LPCy
+from .lp_ext import worker_model, construct_canonical
 
 
 Solution = collections.namedtuple('Solution', ['x', 'y', 'r', 's', 'basis'])
@@ -68,23 +71,18 @@ class LPInstance(ABC):
 
 class Constructor(object):
     ''' Use the result of lhs() and solution() methods to construct an
-    instance with the required optimal solution. '''
+    instance with the required optimal solution. Arithmetic broadcasts over
+    leading axes, so stacked (batch) lhs and solution arrays are supported. '''
 
     def rhs(self):
         solution = self.solution()
-        A = self.lhs()
-        x = np.matrix(solution.x).transpose()
-        s = np.matrix(solution.s).transpose()
-        _rhs = A * x + s
-        return np.asarray(_rhs.transpose(), dtype=np.float)[0]
+        A = np.asarray(self.lhs())
+        return np.matmul(A, solution.x[..., np.newaxis])[..., 0] + solution.s
 
     def objective(self):
         solution = self.solution()
-        A = self.lhs()
-        y = np.matrix(solution.y).transpose()
-        r = np.matrix(solution.r).transpose()
-        _obj = A.transpose() * y - r
-        return np.asarray(_obj.transpose(), dtype=np.float)[0]
+        A = np.asarray(self.lhs())
+        return np.matmul(solution.y[..., np.newaxis, :], A)[..., 0, :] - solution.r
 
 
 class SolutionEncoder(object):
@@ -92,8 +90,8 @@ class SolutionEncoder(object):
 
     def alpha(self):
         solution = self.solution()
-        primal = np.concatenate([solution.x, solution.s])
-        dual = np.concatenate([solution.r, solution.y])
+        primal = np.concatenate([solution.x, solution.s], axis=-1)
+        dual = np.concatenate([solution.r, solution.y], axis=-1)
         # should verify complementarity somewhere...?
         return primal + dual
 
@@ -101,13 +99,60 @@ class SolutionEncoder(object):
         return self.solution().basis
 
 
+def decode_solution(alpha, beta, variables):
+    ''' Extract primal variables and reduced costs (complete solution)
+    from alpha and beta vectors, or stacks of them along leading axes.
+    :beta may be stored as 0/1 floats or as booleans. '''
+    n = variables
+    x = np.where(beta[..., :n], alpha[..., :n], 0)
+    r = np.where(beta[..., :n], 0, alpha[..., :n])
+    y = np.where(beta[..., n:], 0, alpha[..., n:])
+    s = np.where(beta[..., n:], alpha[..., n:], 0)
+    return Solution(x=x, r=r, y=y, s=s, basis=beta)
+
+
+def storage_dtype(values, dtype=None, kinds='f'):
+    ''' dtype used to store :values: :dtype if given, otherwise the dtype
+    of :values if its kind is one of :kinds (e.g. 'f' floating, 'b' bool),
+    otherwise float64. This lets compact float32/bool arrays pass through
+    copies and file round trips unchanged. '''
+    if dtype is not None:
+        return np.dtype(dtype)
+    values_dtype = getattr(values, 'dtype', None)
+    if values_dtype is not None and values_dtype.kind in kinds:
+        return values_dtype
+    return np.dtype(np.float64)
+
+
+def construct_batch(lhs, alpha, beta):
+    ''' Construct rhs and objective for K encodings sharing the same lhs.
+    :alpha and :beta are K x (n+m) arrays; returns K x m rhs and K x n
+    objective arrays, computed with two matrix-matrix products instead of
+    K separate matrix-vector products. :lhs may be dense or sparse. '''
+    if not sparsemat.issparse(lhs):
+        lhs = np.asarray(lhs)
+    solution = decode_solution(np.asarray(alpha), np.asarray(beta), lhs.shape[1])
+    rhs = np.asarray(lhs @ solution.x.T).T + solution.s
+    objective = np.asarray(solution.y @ lhs) - solution.r
+    return rhs, objective
+
+
 class DenseLHS(object):
-    ''' Store the left hand side of the constraints. The result of lhs() must
-    be able to be transposed and matrix multiplied. '''
+    ''' Store the left hand side of the constraints as a C-contiguous
+    ndarray. :dtype selects the storage precision (float64 or float32); by
+    default floating point input keeps its dtype and anything else is
+    stored as float64. The input is always copied. '''
 
-    def __init__(self, lhs, **kwargs):
+    def __init__(self, lhs, dtype=None, **kwargs):
         super().__init__(**kwargs)
-        self._lhs_matrix = np.matrix(lhs, dtype=np.float)
+        self._lhs_matrix = self._store_lhs(lhs, dtype)
+
+    @staticmethod
+    def _store_lhs(lhs, dtype):
+        if sparsemat.issparse(lhs):
+            lhs = lhs.toarray()
+        lhs = np.asarray(lhs)
+        return np.array(lhs, dtype=storage_dtype(lhs, dtype), order='C')
 
     @property
     def variables(self):
@@ -120,11 +165,38 @@ class DenseLHS(object):
     def lhs(self):
         return self._lhs_matrix
 
+    def lhs_matrix(self):
+        ''' Compatibility shim for callers relying on the np.matrix
+        semantics lhs() had previously (e.g. * as matrix product). Returns
+        a matrix view of the stored array, not a copy. '''
+        return np.asmatrix(self.lhs())
+
+
+class SparseLHS(DenseLHS):
+    ''' Variant of DenseLHS storing the left hand side as a scipy sparse CSR
+    matrix, for large instances which should not be materialised densely.
+    The result of lhs() supports transpose and matrix multiplication.
+    Index arrays are stored as int32 where the matrix is small enough. '''
+
+    @staticmethod
+    def _store_lhs(lhs, dtype):
+        lhs = sparsemat.csr_matrix(lhs)
+        lhs = lhs.astype(storage_dtype(lhs, dtype), copy=True)
+        if lhs.nnz < 2 ** 31 and max(lhs.shape) < 2 ** 31:
+            lhs.indices = lhs.indices.astype(np.int32)
+            lhs.indptr = lhs.indptr.astype(np.int32)
+        return lhs
+
+    def lhs_matrix(self):
+        return self.lhs()
+
 
 class EncodedInstance(Constructor, DenseLHS, LPInstance):
-    ''' Full instance class storing data as (A, alpha, beta). '''
+    ''' Full instance class storing data as (A, alpha, beta). For compact
+    storage, :dtype (lhs) and :alpha_dtype may be float32 and :beta_dtype
+    bool; by default float32 and bool inputs keep their dtypes. '''
 
-    def __init__(self, alpha, beta, **kwargs):
+    def __init__(self, alpha, beta, alpha_dtype=None, beta_dtype=None, **kwargs):
         super().__init__(**kwargs)
         n, m = self.variables, self.constraints
         assert alpha.shape == (n + m, )
@@ -132,8 +204,8 @@ class EncodedInstance(Constructor, DenseLHS, LPInstance):
         assert beta.shape == (n + m, )
         assert np.sum(beta == 1) == m
         assert np.sum(beta == 0) == n
-        self._alpha = np.array(alpha, dtype=np.float)
-        self._beta = np.array(beta, dtype=np.float)
+        self._alpha = np.array(alpha, dtype=storage_dtype(alpha, alpha_dtype))
+        self._beta = np.array(beta, dtype=storage_dtype(beta, beta_dtype, kinds='fb'))
 
     def alpha(self):
         return self._alpha
@@ -142,13 +214,14 @@ class EncodedInstance(Constructor, DenseLHS, LPInstance):
         return self._beta
 
     def solution(self):
-        # Extract primal variables and reduced costs (complete solution)
-        n, m = self.variables, self.constraints
-        x = self._beta[:n] * self._alpha[:n]
-        r = (1 - self._beta[:n]) * self._alpha[:n]
-        y = (1 - self._beta[n:]) * self._alpha[n:]
-        s = self._beta[n:] * self._alpha[n:]
-        return Solution(x=x, r=r, y=y, s=s, basis=self._beta)
+        return decode_solution(self._alpha, self._beta, self.variables)
+
+    def astype(self, dtype=np.float32, beta_dtype=bool):
+        ''' Copy of the instance with lhs and alpha stored as :dtype and
+        beta as :beta_dtype. The defaults give the compact representation. '''
+        return EncodedInstance(
+            lhs=self._lhs_matrix, alpha=self._alpha, beta=self._beta,
+            dtype=dtype, alpha_dtype=dtype, beta_dtype=beta_dtype)
 
 
 class SolvedInstance(Constructor, SolutionEncoder, DenseLHS, LPInstance):
@@ -185,12 +258,11 @@ class UnsolvedInstance(SolutionEncoder, DenseLHS, LPInstance):
     def objective(self):
         return self._objective
 
-    def solution(self):
-        model = LPCy()
-        model.construct_dense_canonical(
-            self.variables, self.constraints,
-            self.lhs(), self.rhs(), self.objective())
-        model.solve()
+    def solution(self, **options):
+        ''' Solve the instance; :options are passed to LPCy.solve. '''
+        model = worker_model()
+        construct_canonical(model, self)
+        model.solve(**options)
 
         if model.get_solution_status() != 0:
             raise ValueError('Instance could not be decoded as it could not be solved.')
@@ -201,3 +273,9 @@ class UnsolvedInstance(SolutionEncoder, DenseLHS, LPInstance):
         r = model.get_solution_reduced_costs()
         basis = model.get_solution_basis()
         return Solution(x=x, s=s, y=y, r=r, basis=basis)
+
+
+class SparseUnsolvedInstance(SparseLHS, UnsolvedInstance):
+    ''' UnsolvedInstance storing A as a sparse matrix. Used for large
+    imported instances; A is only densified when solved. '''
+    pass
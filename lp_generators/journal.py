@@ -0,0 +1,294 @@
+''' Compact, replayable journal of local search steps.
+
+write_steps writes a complete instance file for every improved step, which
+costs O(m n) bytes per improvement. A search journal instead stores the
+start instance once (in the internal tar format, see writers.py) followed
+by binary diff records: for each accepted step only the entries of A and
+alpha, beta (encoded instances) or b, c (lp instances) which differ from
+the previously journalled instance are written, as flat indices and new
+values. Neighbour operators change a handful of entries, so a step costs a
+few tens of bytes. Optionally the state of the search random generator is
+recorded with each step (as json, around 200 bytes for PCG64), so a search
+can be resumed from any step.
+
+Records are encoded and written by a background thread, so the search
+generator only hands instances over to a queue. replay_journal reconstructs
+the instance at any step by applying diffs from the start instance.
+
+File layout (little endian):
+    header:  magic 'LPGJ', version (u1), kind (u1: 0 encoded, 1 lp)
+    record:  type (u1: 0 full, 1 diff), step (u4), objective (f8),
+             payload length (u4), state length (u4), payload, state (json)
+    full payload:  internal tar format bytes
+    diff payload:  array id (u1), dtype (3 ascii), index size (u1),
+                   count (u4), indices, values; repeated per changed array
+'''
+
+import io
+import os
+import json
+import queue
+import struct
+import threading
+import functools
+from contextlib import suppress
+
+import numpy as np
+import scipy.sparse as sparsemat
+
+from .instance import Constructor, EncodedInstance, UnsolvedInstance, SparseUnsolvedInstance
+from .writers import write_tar_encoded, write_tar_lp, read_tar
+from .timing import Timings, timing_enabled, add_timings
+
+
+JOURNAL_MAGIC = b'LPGJ'
+JOURNAL_VERSION = 1
+FILE_HEADER = struct.Struct('<4sBB')
+RECORD_HEADER = struct.Struct('<BIdII')
+ARRAY_HEADER = struct.Struct('<B3sBI')
+
+KIND_ENCODED, KIND_LP = 0, 1
+RECORD_FULL, RECORD_DIFF = 0, 1
+
+# Names of the arrays journalled for each kind, indexed by array id.
+ARRAYS = {
+    KIND_ENCODED: ('lhs', 'alpha', 'beta'),
+    KIND_LP: ('lhs', 'rhs', 'objective'),
+    }
+
+
+def _kind(instance):
+    return KIND_ENCODED if isinstance(instance, Constructor) else KIND_LP
+
+
+def _arrays(instance, kind):
+    return [getattr(instance, name)() for name in ARRAYS[kind]]
+
+
+def _build(kind, arrays):
+    if kind == KIND_ENCODED:
+        lhs, alpha, beta = arrays
+        return EncodedInstance(lhs=lhs, alpha=alpha, beta=beta)
+    lhs, rhs, objective = arrays
+    if sparsemat.issparse(lhs):
+        return SparseUnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    return UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+
+
+def _changes(old, new):
+    ''' Flat indices and new values of the entries of :new which differ
+    from :old (arrays or sparse matrices of the same shape). '''
+    if old.shape != new.shape:
+        raise ValueError('Journal requires instances of constant dimensions')
+    if sparsemat.issparse(new):
+        changed = sparsemat.coo_matrix(sparsemat.csr_matrix(old) != sparsemat.csr_matrix(new))
+        indices = np.ravel_multi_index((changed.row, changed.col), new.shape)
+        indices.sort()
+        rows, cols = np.unravel_index(indices, new.shape)
+        values = np.asarray(sparsemat.csr_matrix(new)[rows, cols]).ravel()
+        return indices, values
+    old, new = np.asarray(old), np.asarray(new)
+    indices = np.flatnonzero(old.ravel() != new.ravel())
+    return indices, new.ravel()[indices]
+
+
+def _apply(array, indices, values):
+    ''' Copy of :array with entries at flat :indices replaced by :values. '''
+    if sparsemat.issparse(array):
+        rows, cols = np.unravel_index(indices, array.shape)
+        array = sparsemat.lil_matrix(array, copy=True)
+        array[rows, cols] = values
+        array = array.tocsr()
+        array.eliminate_zeros()
+        return array
+    array = np.array(array, copy=True)
+    array.ravel()[indices] = values
+    return array
+
+
+def encode_diff(old, new, kind):
+    ''' Diff payload of the changes from instance :old to :new. '''
+    parts = []
+    for array_id, (old_array, new_array) in enumerate(zip(_arrays(old, kind), _arrays(new, kind))):
+        indices, values = _changes(old_array, new_array)
+        if len(indices) == 0:
+            continue
+        index_dtype = np.dtype('<u4') if np.prod(new_array.shape) < 2 ** 32 else np.dtype('<u8')
+        values = np.asarray(values)
+        values = values.astype(values.dtype.newbyteorder('<'))
+        dtype = values.dtype.str.encode('ascii')
+        if len(dtype) != 3:
+            raise ValueError('Unsupported dtype {} for journal'.format(values.dtype))
+        parts.append(ARRAY_HEADER.pack(array_id, dtype, index_dtype.itemsize, len(indices)))
+        parts.append(indices.astype(index_dtype).tobytes())
+        parts.append(values.tobytes())
+    return b''.join(parts)
+
+
+def apply_diff(instance, payload, kind):
+    ''' Instance built by applying a diff :payload to :instance. '''
+    arrays = _arrays(instance, kind)
+    offset = 0
+    while offset < len(payload):
+        array_id, dtype, index_size, count = ARRAY_HEADER.unpack_from(payload, offset)
+        offset += ARRAY_HEADER.size
+        indices = np.frombuffer(payload, dtype='<u{}'.format(index_size), count=count, offset=offset)
+        offset += index_size * count
+        values = np.frombuffer(payload, dtype=dtype.decode('ascii'), count=count, offset=offset)
+        offset += values.nbytes
+        arrays[array_id] = _apply(arrays[array_id], indices, values)
+    return _build(kind, arrays)
+
+
+def _random_state_data(random_state):
+    ''' JSON-compatible state of a Generator or RandomState. '''
+    if hasattr(random_state, 'bit_generator'):
+        state = random_state.bit_generator.state
+    else:
+        state = random_state.get_state(legacy=False)
+    return json.dumps(state, default=lambda obj: obj.tolist()).encode('utf-8')
+
+
+class SearchJournal(object):
+    ''' Journal file written by a background thread. Call write() with
+    each accepted search step (the first call writes the full instance,
+    later calls write diffs against the previous call) and close() when
+    finished; close() re-raises any error from the writer thread. Can be
+    used as a context manager. :queue_size bounds the number of pending
+    steps, blocking the search if the writer falls behind. '''
+
+    def __init__(self, file_name, queue_size=1000):
+        self.file_name = file_name
+        self.bytes_written = 0
+        directory, _ = os.path.split(file_name)
+        if directory:
+            with suppress(FileExistsError):
+                os.makedirs(directory)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, step, objective, instance, random_state=None):
+        ''' Queue a step for writing. The instance must not be modified
+        afterwards (neighbour operators return copies). If :random_state
+        is given, its state is captured now and stored with the step. '''
+        if self._closed:
+            raise ValueError('Journal is closed')
+        state = None if random_state is None else _random_state_data(random_state)
+        self._queue.put((step, objective, instance, state))
+
+    def _run(self):
+        previous = None
+        kind = None
+        with open(self.file_name, 'wb') as outfile:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if self._error is not None:
+                    continue  # drain the queue so writers never block
+                try:
+                    step, objective, instance, state = item
+                    if previous is None:
+                        kind = _kind(instance)
+                        outfile.write(FILE_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, kind))
+                        payload = io.BytesIO()
+                        (write_tar_encoded if kind == KIND_ENCODED else write_tar_lp)(instance, payload)
+                        record_type, payload = RECORD_FULL, payload.getvalue()
+                    else:
+                        record_type, payload = RECORD_DIFF, encode_diff(previous, instance, kind)
+                    state = state or b''
+                    outfile.write(RECORD_HEADER.pack(
+                        record_type, step, objective, len(payload), len(state)))
+                    outfile.write(payload)
+                    outfile.write(state)
+                    outfile.flush()
+                    self.bytes_written = outfile.tell()
+                    previous = instance
+                except Exception as error:
+                    self._error = error
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_journal(file_name):
+    ''' Replay a journal, yielding (step, objective, instance, state) for
+    each journalled step in order, where state is the recorded random
+    state (a dict, as given by bit_generator.state or RandomState.get_state)
+    or None. A trailing partial record (from a journal still being written)
+    ends the replay. '''
+    with open(file_name, 'rb') as infile:
+        header = infile.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            return
+        magic, version, kind = FILE_HEADER.unpack(header)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            raise ValueError('{} is not a search journal'.format(file_name))
+        instance = None
+        while True:
+            header = infile.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            record_type, step, objective, payload_length, state_length = RECORD_HEADER.unpack(header)
+            payload = infile.read(payload_length)
+            state = infile.read(state_length)
+            if len(payload) < payload_length or len(state) < state_length:
+                return
+            if record_type == RECORD_FULL:
+                instance = read_tar(io.BytesIO(payload))
+            else:
+                instance = apply_diff(instance, payload, kind)
+            yield step, objective, instance, (json.loads(state) if state else None)
+
+
+def replay_journal(file_name, step=None):
+    ''' Instance of the search at :step (the last journalled step at or
+    before it), or at the last journalled step if :step is None. Returns
+    (step, objective, instance, state) as for read_journal. '''
+    result = None
+    for record in read_journal(file_name):
+        if step is not None and record[0] > step:
+            break
+        result = record
+    if result is None:
+        raise ValueError('No journalled step at or before {}'.format(step))
+    return result
+
+
+def journal_steps(file_name, random_state=None, timing=None):
+    ''' Wrap a search function (see write_steps), journalling each improved
+    step to :file_name. The journal is closed when the search finishes. If
+    :random_state is the generator used by the search, its state after each
+    journalled step is recorded. With :timing the time taken to queue the
+    step is added to step_info. '''
+    def journal_steps_decorator(func):
+        @functools.wraps(func)
+        def journal_steps_fn(*args, **kwargs):
+            with SearchJournal(file_name) as journal:
+                for step_info, instance in func(*args, **kwargs):
+                    if step_info['search_update'] == 'improved':
+                        record = (step_info['search_step'], step_info['search_objective'],
+                                  instance, random_state)
+                        if not timing_enabled(timing):
+                            journal.write(*record)
+                        else:
+                            timings = Timings()
+                            timings.call('journal_write', journal.write, *record)
+                            add_timings(step_info, timings)
+                    yield step_info, instance
+        return journal_steps_fn
+    return journal_steps_decorator
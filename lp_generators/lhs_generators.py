@@ -1,17 +1,14 @@
 ''' Randomly generate lhs matrices by varying degree and coefficient
 statistics. Main function to be called is generate_lhs.
 
-This process is a bit of a bottleneck in generation, since it is implemented
-in pure python and uses a quadratic algorithm to achieve the required
-expected frequencies of edges. This is fine for small scale experimental
-purposes, but further work needed (equivalent efficient algorithm and/or C++
-implementation) before using this for larger instances.
+Edges are sampled and repaired as index arrays, then collected in a set
+once so coefficients are assigned in the same order as earlier versions
+(legacy RandomState seeds reproduce the same matrices). The degree
+distribution step (degree_dist) is still a pure python loop over edges,
+and edge sampling evaluates every vertex pair, so further work is needed
+before using this for much larger instances.
 '''
 
-import itertools
-import collections
-import operator
-
 import numpy as np
 import scipy.sparse as sparsemat
 
@@ -41,18 +38,28 @@ def degree_dist(vertices, edges, max_degree, param, random_state):
     return degree
 
 
+# Number of (i, j) edge probabilities evaluated at once.
+EDGE_CHUNK = 2 ** 20
+
+
 def expected_bipartite_degree(degree1, degree2, random_state):
-    # Generates edges with probability d1 * d2 / sum(d1), asserting that
-    # sum(d1) = sum(d2).
-    # There is a more efficient way, right?
-    if abs(sum(degree1) - sum(degree2)) > 10 ** -5:
+    ''' Generates edges with probability d1 * d2 / sum(d1), asserting that
+    sum(d1) = sum(d2). Returns arrays of edge endpoints (ind1, ind2), in row
+    major order. Probabilities are evaluated in blocks of rows, with one
+    uniform draw per (i, j) pair in the same order as a scalar loop. '''
+    degree1 = np.asarray(degree1, dtype=np.float64)
+    degree2 = np.asarray(degree2, dtype=np.float64)
+    if abs(degree1.sum() - degree2.sum()) > 10 ** -5:
         raise ValueError('You\'ve unbalanced the force!')
-    rho = 1 / sum(degree1)
-    for i, di in enumerate(degree1):
-        for j, dj in enumerate(degree2):
-            if random_state.uniform(0, 1) < (di * dj * rho):
-                # print('yield', i, j)
-                yield i, j
+    rho = 1 / degree1.sum()
+    rows = max(EDGE_CHUNK // max(len(degree2), 1), 1)
+    ind1, ind2 = [], []
+    for start in range(0, len(degree1), rows):
+        block = degree1[start:start + rows, np.newaxis] * degree2 * rho
+        i, j = np.nonzero(random_state.uniform(0, 1, size=block.shape) < block)
+        ind1.append(i + start)
+        ind2.append(j)
+    return np.concatenate(ind1), np.concatenate(ind2)
 
 
 def generate_by_degree(n1, n2, density, p1, p2, random_state):
@@ -63,45 +70,65 @@ def generate_by_degree(n1, n2, density, p1, p2, random_state):
     return expected_bipartite_degree(degree1, degree2, random_state)
 
 
-def connect_remaining(n1, n2, edges, random_state):
-    ''' Finds any isolated vertices in the bipartite graph and connects them. '''
-    degree1 = collections.Counter(map(operator.itemgetter(0), edges))
-    degree2 = collections.Counter(map(operator.itemgetter(1), edges))
-    missing1 = [i for i in range(n1) if degree1[i] == 0]
-    missing2 = [j for j in range(n2) if degree2[j] == 0]
+def _choose_repairs(count, degree, limit, increment, random_state):
+    # Draw :count endpoints one at a time from the vertices with degree below
+    # :limit, adding :increment to the chosen degree, as earlier versions did
+    # (which counted repair edges twice on the second side). Candidates are
+    # only recomputed when a vertex reaches the limit.
+    chosen = np.empty(count, dtype=np.intp)
+    candidates = np.flatnonzero(degree < limit)
+    for k in range(count):
+        vertex = random_state.choice(candidates)
+        chosen[k] = vertex
+        degree[vertex] += increment
+        if degree[vertex] >= limit:
+            candidates = np.flatnonzero(degree < limit)
+    return chosen
+
+
+def connect_remaining(n1, n2, ind1, ind2, random_state):
+    ''' Finds any isolated vertices in the bipartite graph with edges
+    (ind1, ind2) and returns arrays of new edges connecting them. Isolated
+    vertices on each side are shuffled and paired; if one side has more,
+    the excess is paired with vertices chosen from the other side. New
+    edges always have an isolated endpoint, so they cannot duplicate an
+    existing edge. Random draws match earlier versions, so legacy seeds
+    reproduce the same edges. '''
+    degree1 = np.bincount(ind1, minlength=n1)
+    degree2 = np.bincount(ind2, minlength=n2)
+    missing1 = np.flatnonzero(degree1 == 0)
+    missing2 = np.flatnonzero(degree2 == 0)
     random_state.shuffle(missing1)
     random_state.shuffle(missing2)
-    for v1, v2 in itertools.zip_longest(missing1, missing2):
-        try:
-            if v1 is None:
-                v1 = random_state.choice(
-                    [i for i in range(n1) if degree1[i] < n2])
-            if v2 is None:
-                v2 = random_state.choice(
-                    [j for j in range(n2) if degree2[j] < n1])
-        except ValueError:
-            print(degree1)
-            print(degree2)
-            raise
-        yield v1, v2
-        degree1[v1] += 1
-        degree2[v2] += 2
+    paired = min(len(missing1), len(missing2))
+    degree1[missing1[:paired]] += 1
+    degree2[missing2[:paired]] += 2
+    extra1 = _choose_repairs(len(missing2) - paired, degree1, n2, 1, random_state)
+    extra2 = _choose_repairs(len(missing1) - paired, degree2, n1, 2, random_state)
+    return np.concatenate([missing1, extra1]), np.concatenate([missing2, extra2])
 
 
 def generate_edges(n1, n2, density, p1, p2, random_state):
-    ''' Generate edges using size and weight parameters. '''
-    edges = set(generate_by_degree(n1, n2, density, p1, p2, random_state))
-    edges.update(connect_remaining(n1, n2, edges, random_state))
-    return edges
+    ''' Generate edges using size and weight parameters. Returns unique
+    arrays of edge endpoints (ind1, ind2). Edges are ordered as the set of
+    edge tuples used by earlier versions, so generate_lhs assigns the same
+    coefficients to each edge for legacy seeds. '''
+    ind1, ind2 = generate_by_degree(n1, n2, density, p1, p2, random_state)
+    new1, new2 = connect_remaining(n1, n2, ind1, ind2, random_state)
+    edges = set(zip(ind1.tolist(), ind2.tolist()))
+    edges.update(zip(new1.tolist(), new2.tolist()))
+    edges = np.array(list(edges), dtype=np.intp).reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
 
 
 def generate_lhs(variables, constraints, density, pv, pc,
                         coeff_loc, coeff_scale, random_state):
     ''' Generate lhs constraint matrix using sparsity parameters and
     coefficient value distribution. '''
-    ind_var, ind_cons = zip(*generate_edges(
+    ind_var, ind_cons = generate_edges(
         variables, constraints, density,
-        pv, pc, random_state))
+        pv, pc, random_state)
     data = random_state.normal(
         loc=coeff_loc, scale=coeff_scale, size=len(ind_var))
-    return sparsemat.coo_matrix((data, (ind_cons, ind_var)))
+    return sparsemat.coo_matrix(
+        (data, (ind_cons, ind_var)), shape=(constraints, variables))
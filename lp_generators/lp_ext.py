@@ -1,4 +1,37 @@
 ''' Convenience wrapper importing classes from C++ extension
 into the package namespace. '''
 
+import threading
+
+import numpy as np
+import scipy.sparse as sparsemat
+
 from lp_generators_ext import LPCy
+
+
+def construct_canonical(model, instance):
+    ''' Load the A, b, c data of an instance into an LPCy model. The
+    extension requires contiguous dense double arrays, so any conversion
+    from the instance's storage happens here. '''
+    lhs = instance.lhs()
+    if sparsemat.issparse(lhs):
+        lhs = lhs.toarray()
+    model.construct_dense_canonical(
+        instance.variables, instance.constraints,
+        np.ascontiguousarray(lhs, dtype=np.float64),
+        np.ascontiguousarray(instance.rhs(), dtype=np.float64),
+        np.ascontiguousarray(instance.objective(), dtype=np.float64))
+
+
+_worker = threading.local()
+
+
+def worker_model():
+    ''' LPCy model owned by the calling thread (and so by each worker
+    process), reused for every solve in that thread. Reconstructing a
+    model reuses its storage, so repeated solves of same sized instances
+    run without reallocating model data. '''
+    model = getattr(_worker, 'model', None)
+    if model is None:
+        model = _worker.model = LPCy()
+    return model
@@ -0,0 +1,284 @@
+''' Metrics for long-running generation and search jobs.
+
+A Metrics registry holds counters, gauges and histograms keyed by name and
+labels. Results flowing back to the main process are observed into it:
+observe_instance counts instances, solver runs, failures and runs stopped
+by an iteration or time limit, and records stage latencies from timing
+entries in instance.data (see timing.py); observe_step counts local_search steps by update state. The tracked
+wrapper observes items as they pass through an iterator.
+
+A MetricsExporter thread periodically writes the registry as a Prometheus
+textfile (rewritten atomically, for the node exporter textfile collector)
+and/or appends a snapshot line to a JSONL file. Each export also includes
+per-second rates of all counters since the previous export, so stalls show
+up as drops in e.g. instances_per_second.
+'''
+
+import os
+import json
+import time
+import bisect
+import threading
+import itertools
+
+
+PREFIX = 'lp_generators'
+
+# Latency buckets in seconds, from fast calculators to slow solver runs.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0)
+
+
+class Histogram(object):
+    ''' Counts of observations per bucket upper bound, plus sum and count. '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum, histogram.count = self.sum, self.count
+        return histogram
+
+    def cumulative(self):
+        ''' (upper bound, cumulative count) pairs, ending with +Inf. '''
+        return list(zip(
+            self.buckets + (float('inf'), ), itertools.accumulate(self.counts)))
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_string(labels, extra=()):
+    labels = tuple(labels) + tuple(extra)
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, v) for k, v in labels) + '}'
+
+
+class Metrics(object):
+    ''' Thread-safe registry of counters, gauges and histograms. '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._counters = dict()
+        self._gauges = dict()
+        self._histograms = dict()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.buckets)
+            self._histograms[key].observe(value)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def snapshot(self):
+        ''' Consistent copy of all values as (counters, gauges, histograms)
+        dictionaries keyed by (name, labels). '''
+        with self._lock:
+            return (
+                dict(self._counters), dict(self._gauges),
+                {key: h.copy() for key, h in self._histograms.items()})
+
+
+REGISTRY = Metrics()
+
+
+def observe_timings(data, metrics=None):
+    ''' Record stage latencies from timing entries (time_<name>_wall) in a
+    data or step_info dictionary. '''
+    metrics = metrics or REGISTRY
+    for key, value in data.items():
+        if key.startswith('time_') and key.endswith('_wall'):
+            metrics.observe('stage_seconds', value, stage=key[5:-5])
+
+
+def observe_instance(data, metrics=None):
+    ''' Record a completed instance from its data dictionary: instance
+    count, stage latencies, and clp/scip runs, failures, runs stopped by a
+    limit (solver_stopped, labelled by the limit) and solve times. Solver
+    runs which fail or hit a limit report -1 iterations or time; stopped
+    runs are not counted as failures and their times are not observed. '''
+    metrics = metrics or REGISTRY
+    metrics.inc('instances')
+    observe_timings(data, metrics)
+    for method in ['primal', 'dual', 'barrier']:
+        iterations = data.get('clp_{}_iterations'.format(method))
+        if iterations is None:
+            continue
+        metrics.inc('solver_runs', solver='clp', method=method)
+        stopped = data.get('clp_{}_stopped'.format(method))
+        if stopped is not None:
+            metrics.inc('solver_stopped', solver='clp', method=method, limit=stopped)
+        elif iterations < 0:
+            metrics.inc('solver_failures', solver='clp', method=method)
+        else:
+            metrics.observe(
+                'solver_seconds', data['clp_{}_time'.format(method)],
+                solver='clp', method=method)
+    if 'strbr_time' in data:
+        metrics.inc('solver_runs', solver='scip', method='strbr')
+        if data.get('strbr_stopped') is not None:
+            metrics.inc('solver_stopped', solver='scip', method='strbr', limit=data['strbr_stopped'])
+        elif data['strbr_time'] is None or data['strbr_time'] < 0:
+            metrics.inc('solver_failures', solver='scip', method='strbr')
+        else:
+            metrics.observe('solver_seconds', data['strbr_time'], solver='scip', method='strbr')
+
+
+def observe_step(step_info, metrics=None):
+    ''' Record a local_search step: step count by update state (improved,
+    reject_poor, ...) and stage latencies if timing is enabled. '''
+    metrics = metrics or REGISTRY
+    metrics.inc('search_steps', update=step_info['search_update'])
+    observe_timings(step_info, metrics)
+
+
+def tracked(items, observe, metrics=None):
+    ''' Generator passing on :items, first recording each with
+    observe(item, metrics). '''
+    for item in items:
+        observe(item, metrics)
+        yield item
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_prometheus(counters, gauges, histograms, prefix=PREFIX):
+    ''' Prometheus text exposition format for a Metrics snapshot. '''
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            lines.append('# TYPE {} {}'.format(name, kind))
+
+    for (name, labels), value in sorted(counters.items()):
+        name = '{}_{}_total'.format(prefix, name)
+        declare(name, 'counter')
+        lines.append('{}{} {}'.format(name, _label_string(labels), _format_value(value)))
+    for (name, labels), value in sorted(gauges.items()):
+        name = '{}_{}'.format(prefix, name)
+        declare(name, 'gauge')
+        lines.append('{}{} {}'.format(name, _label_string(labels), _format_value(value)))
+    for (name, labels), histogram in sorted(histograms.items()):
+        name = '{}_{}'.format(prefix, name)
+        declare(name, 'histogram')
+        for bound, count in histogram.cumulative():
+            lines.append('{}_bucket{} {}'.format(
+                name, _label_string(labels, [('le', _format_value(bound))]), count))
+        lines.append('{}_sum{} {}'.format(name, _label_string(labels), repr(histogram.sum)))
+        lines.append('{}_count{} {}'.format(name, _label_string(labels), histogram.count))
+    return '\n'.join(lines) + '\n'
+
+
+def _json_key(name, labels):
+    return name + _label_string(labels)
+
+
+def format_jsonl(counters, gauges, histograms):
+    ''' Single JSON line for a Metrics snapshot. Histograms are written as
+    bucket bounds with (non-cumulative) counts. '''
+    record = dict(
+        time=time.time(),
+        counters={_json_key(*key): value for key, value in counters.items()},
+        gauges={_json_key(*key): value for key, value in gauges.items()},
+        histograms={
+            _json_key(*key): dict(
+                buckets=list(h.buckets), counts=h.counts, sum=h.sum, count=h.count)
+            for key, h in histograms.items()})
+    return json.dumps(record, sort_keys=True) + '\n'
+
+
+def write_prometheus(path, counters, gauges, histograms):
+    ''' Atomically replace the textfile at :path, so a collector never
+    reads a partial file. '''
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'w') as outfile:
+        outfile.write(format_prometheus(counters, gauges, histograms))
+    os.replace(temp_path, path)
+
+
+class MetricsExporter(object):
+    ''' Background thread exporting :metrics (default the global registry)
+    every :interval seconds to a Prometheus textfile at :prometheus_path
+    and/or a JSONL stream at :jsonl_path, and once more on close. Gauges
+    <counter>_per_second give each counter's rate over the last interval,
+    and uptime_seconds the time since the registry was created. '''
+
+    def __init__(self, metrics=None, prometheus_path=None, jsonl_path=None, interval=15.0):
+        self.metrics = metrics or REGISTRY
+        self.prometheus_path = prometheus_path
+        self.jsonl_path = jsonl_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = (time.time(), dict())
+
+    def export(self):
+        now = time.time()
+        last_time, last_counters = self._last
+        counters, _, _ = self.metrics.snapshot()
+        elapsed = max(now - last_time, 1e-9)
+        for (name, labels), value in counters.items():
+            rate = (value - last_counters.get((name, labels), 0)) / elapsed
+            self.metrics.set(name + '_per_second', rate, **dict(labels))
+        self.metrics.set('uptime_seconds', now - self.metrics.start_time)
+        self._last = (now, counters)
+        counters, gauges, histograms = self.metrics.snapshot()
+        if self.prometheus_path is not None:
+            write_prometheus(self.prometheus_path, counters, gauges, histograms)
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, 'a') as outfile:
+                outfile.write(format_jsonl(counters, gauges, histograms))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -2,6 +2,8 @@
 Input instances must be able to return alpha() and beta() results to be
 copied in this scheme. '''
 
+import functools
+
 import numpy as np
 
 from .instance import EncodedInstance
@@ -15,6 +17,7 @@ def copied_neighbour(func):
     The wrapper calls :func on the instance, then returns the copy.
     Wrapped function can be sure the :instance argument in an EncodedInstance,
     with data stored as _lhs_matrix, _alpha, _beta. '''
+    @functools.wraps(func)
     def copied_neighbour_fn(instance, random_state, *args, **kwargs):
         instance = EncodedInstance(
             lhs=np.copy(instance.lhs()),
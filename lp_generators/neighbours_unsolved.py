@@ -2,6 +2,8 @@
 Input instances must be able to return objective() and rhs() results to be
 copied in this scheme. '''
 
+import functools
+
 import numpy as np
 
 from .instance import UnsolvedInstance
@@ -14,6 +16,7 @@ def copied_neighbour(func):
     The wrapper calls :func on the instance, then returns the copy.
     Wrapped function can be sure the :instance argument in an UnsolvedInstance,
     with data stored as _lhs_matrix, _rhs, _objective. '''
+    @functools.wraps(func)
     def copied_neighbour_fn(instance, random_state, *args, **kwargs):
         new_instance = UnsolvedInstance(
             lhs=np.copy(instance.lhs()),
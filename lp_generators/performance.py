@@ -2,70 +2,105 @@
 subprocesses, so both must be available on the system path. '''
 
 import subprocess
+import math
 import re
 
-from .writers import write_mps, write_mps_ip
+from .writers import write_mps_stream, write_mps_ip_stream
 from .utils import temp_file_path
 
 
-def clp_solve_file(file, method):
-    ''' Solve with a clp method and return statistics. '''
-    result = subprocess.run(
-        ['clp', file, '-{}'.format(method)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE)
-    stdout = result.stdout.decode('utf-8')
-    regex = 'Optimal objective +([0-9e\-\.\+]+) +- +([0-9]+) +iterations +time +([0-9\.]+)'
+CLP_METHODS = ['primalsimplex', 'dualsimplex', 'barrier']
+
+
+def clp_command(file, method, max_iterations=None, max_seconds=None):
+    ''' clp command line, optionally limiting iterations and solve time. '''
+    args = ['clp', file]
+    if max_iterations is not None:
+        args += ['-maxIterations', str(int(max_iterations))]
+    if max_seconds is not None:
+        args += ['-seconds', repr(float(max_seconds))]
+    return args + ['-{}'.format(method)]
+
+
+def parse_clp_output(stdout):
+    ''' Extract statistics from the output of a clp solve. If the solve hit
+    an iteration or time limit, stopped gives the limit reached. '''
+    regex = r'Optimal objective +([0-9e\-\.\+]+) +- +([0-9]+) +iterations +time +([0-9\.]+)'
     match = re.search(regex, stdout)
     if match is None:
         # There are iteration counts to check here.
         # This occurs in infeasible/unbounded cases.
-        return dict(objective=None, iterations=-1, time=-1)
+        result = dict(objective=None, iterations=-1, time=-1)
+        match = re.search(r'Stopped on (iterations|time)', stdout)
+        if match is not None:
+            result['stopped'] = match.group(1)
+        return result
     result = dict(
         objective=float(match.group(1)),
         iterations=int(match.group(2)),
         time=float(match.group(3)))
-    regex = 'flop count +([0-9]+)'
+    regex = r'flop count +([0-9]+)'
     match = re.search(regex, stdout)
     if match is not None:
         result['flops'] = int(match.group(1))
     return result
 
 
-def scip_strongbranch_file(file):
-    ''' Run SCIP and force all full strong branching.
-    Terminate at the root node, return strong branching stats.
-    Gives a measure of reoptimisation effort. '''
+def clp_solve_file(file, method, max_iterations=None, max_seconds=None):
+    ''' Solve with a clp method and return statistics. '''
     result = subprocess.run(
-            [
-            'scip', '-c', 'read {}'.format(file),
-            '-c', 'set limits nodes 1',
-            '-c', 'set branching allfullstrong priority 1000000',
-            '-c', 'opt',
-            '-c', 'display statistics',
-            '-c', 'quit'],
+        clp_command(file, method, max_iterations, max_seconds),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE)
-    stdout = result.stdout.decode('utf-8')
-    regex = 'strong branching +: +([0-9\.]+) +([0-9]+) +([0-9]+) +([0-9\.]+)'
+    return parse_clp_output(result.stdout.decode('utf-8'))
+
+
+def scip_strongbranch_command(file, time_limit=None):
+    ''' SCIP command line for strong branching statistics, optionally
+    limiting the total solve time. '''
+    limits = [] if time_limit is None else ['-c', 'set limits time {}'.format(float(time_limit))]
+    return [
+        'scip', '-c', 'read {}'.format(file),
+        '-c', 'set limits nodes 1',
+        *limits,
+        '-c', 'set branching allfullstrong priority 1000000',
+        '-c', 'opt',
+        '-c', 'display statistics',
+        '-c', 'quit']
+
+
+def parse_scip_strongbranch_output(stdout):
+    ''' Extract strong branching statistics from SCIP output. If the
+    solve hit the time limit, stopped is 'time'. '''
+    regex = r'strong branching +: +([0-9\.]+) +([0-9]+) +([0-9]+) +([0-9\.]+)'
     match = re.search(regex, stdout)
-    return dict(
+    result = dict(
         time=float(match.group(1)),
         calls=int(match.group(2)),
         iterations=int(match.group(3)),
         percall=float(match.group(4)))
+    if 'time limit reached' in stdout:
+        result['stopped'] = 'time'
+    return result
 
 
-def clp_simplex_performance(instance):
-    ''' Write an instance as LP, report primal simplex results. '''
-    with temp_file_path('.mps.gz') as file:
-        write_mps(instance, file)
-        primal_result = clp_solve_file(file, 'primalsimplex')
-        dual_result = clp_solve_file(file, 'dualsimplex')
-        barrier_result = clp_solve_file(file, 'barrier')
-        if 'flops' not in barrier_result:
-            barrier_result['flops'] = -1
-    return dict(
+def scip_strongbranch_file(file, time_limit=None):
+    ''' Run SCIP and force all full strong branching.
+    Terminate at the root node, return strong branching stats.
+    Gives a measure of reoptimisation effort. '''
+    result = subprocess.run(
+        scip_strongbranch_command(file, time_limit),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE)
+    return parse_scip_strongbranch_output(result.stdout.decode('utf-8'))
+
+
+def clp_performance_data(primal_result, dual_result, barrier_result):
+    ''' Combine per-method clp statistics into instance data fields. A
+    method stopped by a limit also gives clp_<method>_stopped. '''
+    if 'flops' not in barrier_result:
+        barrier_result['flops'] = -1
+    data = dict(
         clp_primal_objective=primal_result['objective'],
         clp_primal_iterations=primal_result['iterations'],
         clp_primal_time=primal_result['time'],
@@ -76,16 +111,71 @@ def clp_simplex_performance(instance):
         clp_barrier_iterations=barrier_result['iterations'],
         clp_barrier_time=barrier_result['time'],
         clp_barrier_flops=barrier_result['flops'])
+    results = dict(primal=primal_result, dual=dual_result, barrier=barrier_result)
+    for method, result in results.items():
+        if 'stopped' in result:
+            data['clp_{}_stopped'.format(method)] = result['stopped']
+    return data
 
 
-def strbr_performance(instance):
-    ''' Write an instance as pure IP, report strong branching results. '''
-    with temp_file_path('.mps.gz') as file:
-        # integrality conversion
-        write_mps_ip(instance, file)
-        result = scip_strongbranch_file(file)
-    return dict(
+def strbr_performance_data(result):
+    ''' Convert strong branching statistics into instance data fields,
+    with strbr_stopped if the solve hit the time limit. '''
+    data = dict(
         strbr_time=result['time'],
         strbr_calls=result['calls'],
         strbr_iterations=result['iterations'],
         strbr_percall=result['percall'])
+    if 'stopped' in result:
+        data['strbr_stopped'] = result['stopped']
+    return data
+
+
+def clp_simplex_performance(instance):
+    ''' Write an instance as LP, report primal simplex results. '''
+    with temp_file_path('.mps.gz') as file:
+        write_mps_stream(instance, file)
+        return clp_performance_data(*(
+            clp_solve_file(file, method) for method in CLP_METHODS))
+
+
+def strbr_performance(instance):
+    ''' Write an instance as pure IP, report strong branching results. '''
+    with temp_file_path('.mps.gz') as file:
+        # integrality conversion
+        write_mps_ip_stream(instance, file)
+        return strbr_performance_data(scip_strongbranch_file(file))
+
+
+# Limit passed to clp for each objective field used as a cutoff.
+CLP_CUTOFF_LIMITS = dict(iterations='max_iterations', time='max_seconds')
+
+
+def clp_cutoff_limits(field, cutoff):
+    ''' clp_solve_file limits which stop a solve once its :field
+    (iterations or time) reaches the incumbent value :cutoff. '''
+    if cutoff is None:
+        return dict()
+    if field == 'iterations':
+        cutoff = max(math.ceil(cutoff), 0)
+    return {CLP_CUTOFF_LIMITS[field]: cutoff}
+
+
+def clp_cutoff_result(result, field):
+    ''' Objective value from a clp result: None if the solve was stopped
+    by the cutoff, otherwise the value of :field (-1 if not solved). '''
+    if 'stopped' in result:
+        return None
+    return result[field]
+
+
+def clp_cutoff_objective(instance, cutoff=None, method='primalsimplex', field='iterations'):
+    ''' Objective for minimisation searches (see local_search :cutoff)
+    giving the clp :method :field, either iterations or time. Given the
+    incumbent value as :cutoff, the solve is stopped once it reaches that
+    many iterations or seconds, since the instance then cannot improve on
+    the incumbent, and None is returned. '''
+    with temp_file_path('.mps.gz') as file:
+        write_mps_stream(instance, file)
+        result = clp_solve_file(file, method, **clp_cutoff_limits(field, cutoff))
+    return clp_cutoff_result(result, field)
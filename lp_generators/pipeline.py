@@ -0,0 +1,183 @@
+''' Parallel generation pipelines.
+
+A pipeline passes items (e.g. seeds) through a sequence of stages, such as
+generate -> features -> performance -> write. Each stage has its own
+worker pool, so cheap generation and expensive solver labelling can be
+sized independently and run concurrently: while one stage works on a
+chunk, the stages before it are already producing the next ones.
+
+Items are dispatched in chunks, the number of chunks in flight per stage
+is bounded and a stage does not run ahead of a backed-up downstream stage,
+so memory use stays bounded for arbitrarily long inputs. Results are
+yielded in completion order, or in input order with :ordered. Ordered
+results buffered behind a slow item count against the last stage's
+max_pending, and the oldest outstanding item is always dispatched first,
+so a straggler holds back the pipeline instead of filling the buffer.
+
+Stage functions are sent to worker processes, so they must be picklable
+(module level functions, or functools.partial objects of them, as built by
+attach_data and store_instances below).
+'''
+
+import os
+import operator
+import functools
+import collections
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from .utils import update_data
+from .timing import Timings, timing_enabled, add_timings
+
+
+Stage = collections.namedtuple('Stage', ['func', 'workers', 'chunksize', 'max_pending'])
+
+
+def stage(func, workers=None, chunksize=1, max_pending=None):
+    ''' Pipeline stage applying :func to each item. :workers is the size of
+    the stage's process pool (default cpu count); 0 runs the stage inline
+    in the calling process, which suits cheap stages or ones which must
+    hold resources such as open files. :chunksize items are sent to a
+    worker at once. At most :max_pending chunks (default twice the worker
+    count) are in flight at any time. '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = max(2 * workers, 1)
+    return Stage(func=func, workers=workers, chunksize=chunksize, max_pending=max_pending)
+
+
+class _InlineExecutor(object):
+    ''' Executor interface running tasks immediately in this process. '''
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _apply_chunk(func, chunk):
+    return [(index, func(item)) for index, item in chunk]
+
+
+def run_pipeline(items, stages, ordered=False):
+    ''' Generator passing each of :items through :stages in turn, yielding
+    the results of the last stage. Exceptions raised by a stage function
+    are re-raised here, after which the worker pools are shut down. '''
+    executors = [
+        ProcessPoolExecutor(max_workers=s.workers) if s.workers > 0 else _InlineExecutor()
+        for s in stages]
+    inputs = iter(enumerate(items))
+    exhausted = False
+    # items waiting to be dispatched to each stage (stage 0 pulls from inputs)
+    waiting = [collections.deque() for _ in stages]
+    in_flight = [set() for _ in stages]
+    stage_of = dict()
+    reorder = dict()
+    next_index = 0
+
+    def oldest_waiting(k):
+        # Waiting queues are kept in index order when ordered, so the item
+        # holding back ordered output is at the front wherever it waits.
+        return ordered and waiting[k] and waiting[k][0][0] == next_index
+
+    def can_submit(k):
+        # A stage only runs when its output will not overfill the next one
+        # (or the reorder buffer, for the last stage). The oldest item may
+        # always go ahead, so a full buffer cannot block its own release.
+        if oldest_waiting(k):
+            return True
+        if len(in_flight[k]) >= stages[k].max_pending:
+            return False
+        if k + 1 < len(stages):
+            limit = stages[k + 1].max_pending * stages[k + 1].chunksize
+            if len(waiting[k + 1]) >= limit:
+                return False
+        elif len(reorder) >= stages[k].max_pending * stages[k].chunksize:
+            return False
+        return True
+
+    def upstream_done(k):
+        return exhausted and all(
+            len(waiting[j]) == 0 and len(in_flight[j]) == 0 for j in range(k))
+
+    def dispatch():
+        nonlocal exhausted
+        for k, s in enumerate(stages):
+            while can_submit(k):
+                if k == 0 and not exhausted and len(waiting[0]) < s.chunksize:
+                    for pair in inputs:
+                        waiting[0].append(pair)
+                        if len(waiting[0]) >= s.chunksize:
+                            break
+                    else:
+                        exhausted = True
+                full = len(waiting[k]) >= s.chunksize
+                if not (full or oldest_waiting(k) or (waiting[k] and upstream_done(k))):
+                    break
+                chunk = [waiting[k].popleft() for _ in range(min(s.chunksize, len(waiting[k])))]
+                future = executors[k].submit(_apply_chunk, s.func, chunk)
+                in_flight[k].add(future)
+                stage_of[future] = k
+
+    try:
+        while True:
+            dispatch()
+            pending = set().union(*in_flight)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                k = stage_of.pop(future)
+                in_flight[k].discard(future)
+                results = future.result()
+                if k + 1 < len(stages):
+                    waiting[k + 1].extend(results)
+                    if ordered:
+                        waiting[k + 1] = collections.deque(
+                            sorted(waiting[k + 1], key=operator.itemgetter(0)))
+                elif ordered:
+                    reorder.update(results)
+                else:
+                    for _, result in results:
+                        yield result
+            while next_index in reorder:
+                yield reorder.pop(next_index)
+                next_index += 1
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _attach_data(calculators, timing, instance):
+    timings = Timings() if timing_enabled(timing) else None
+    return update_data(instance, calculators, timings)
+
+
+def attach_data(*calculators, timing=None):
+    ''' Stage function adding the results of :calculators to each instance's
+    data dictionary (the pipeline equivalent of utils.calculate_data). '''
+    return functools.partial(_attach_data, calculators, timing)
+
+
+def _store_instance(store, key_format, timing, instance):
+    key = key_format.format(**instance.data)
+    if not timing_enabled(timing):
+        store.append(key, instance)
+        return instance
+    timings = Timings()
+    with timings.timed('store_append') as extra:
+        extra['nbytes'] = store.append(key, instance)
+    add_timings(instance.data, timings)
+    return instance
+
+
+def store_instances(store, key_format, timing=None):
+    ''' Stage function appending each instance to a ShardedStore (the
+    pipeline equivalent of store.store_instance). '''
+    return functools.partial(_store_instance, store, key_format, timing)
@@ -3,11 +3,16 @@ generate new instances to check for improvement against the given objective.
 The search function returns a generator which iterates over step results. '''
 
 import os
+import math
 from contextlib import suppress
 import functools
 
+from .timing import Timings, timing_enabled, timing_name, add_timings
+from .hashing import instance_hash
 
-def local_search(objective, sense, neighbour, start_instance, steps, random_state):
+
+def local_search(objective, sense, neighbour, start_instance, steps, random_state,
+                 timing=None, candidates=1, screen=None, visited=None, cutoff=False):
     ''' Start from a given instance, generating a random neighbour at each step
     and accepting it if it improves the objective function for the given sense.
     Result is a generator, where each step yields a tuple step_info, instance.
@@ -15,7 +20,24 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
         search_step: step count
         search_objective: current objective function value
         search_update: 'improved' if the current step is new, 'reject_poor' otherwise
-    instance is the current instance object at this step '''
+            ('reject_cutoff' if the best candidate was stopped at the cutoff)
+    instance is the current instance object at this step
+    With :timing (default from the environment, see timing.timing_enabled)
+    step info also holds the time spent in the objective and in the
+    neighbour calls which produced the step's candidates.
+    If :candidates > 1, that many neighbours are generated at each step and
+    the best is taken. A :screen (see surrogate.SurrogateScreen) chooses
+    which candidates the objective is evaluated on, and is updated with the
+    evaluated values. A :visited set (see hashing.VisitedSet) stores the
+    objective values of evaluated instances, which are reused for repeated
+    candidates. With either, step info also holds search_evaluated, the
+    number of objective evaluations in the step; with :visited it holds
+    search_visited_hits (repeated candidates in the step) and
+    search_visited_hit_rate (over the search so far).
+    With :cutoff (min sense only), the objective is called as
+    objective(instance, cutoff=value) with the incumbent value (None at the
+    first step), and may return None if it stopped early because the
+    instance cannot beat the incumbent (e.g. clp_cutoff_objective). '''
 
     if sense == 'min':
         def accept_next(c_new, c_old):
@@ -25,18 +47,64 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
             return c_new > c_old
     else:
         raise ValueError('Sense must be max or min')
+    if cutoff and sense != 'min':
+        raise ValueError('Cutoff requires min sense')
+
+    def call(func, *args, **kwargs):
+        if timings is None:
+            return func(*args, **kwargs)
+        return timings.call(timing_name(func), func, *args, **kwargs)
 
     # initial state
     instance = start_instance
-    next_instance = start_instance
+    next_instances = [start_instance]
     c_old = 1e+20 if sense == 'min' else -1e+20
     is_new = True
     step_info = dict(step='start')
+    timings = Timings() if timing_enabled(timing) else None
 
     for step in range(steps):
 
-        # data and objective calculation
-        c_new = objective(next_instance)
+        # reuse objective values of visited candidates
+        evaluated = []
+        if visited is None:
+            unknown = [(candidate, None) for candidate in next_instances]
+        else:
+            unknown = []
+            for candidate in next_instances:
+                key = call(instance_hash, candidate)
+                c_new = visited.get(key)
+                if c_new is None:
+                    unknown.append((candidate, key))
+                else:
+                    evaluated.append((candidate, c_new))
+        hits = len(evaluated)
+
+        # data and objective calculation on the (screened) candidates
+        if screen is not None:
+            selected = screen.select([candidate for candidate, _ in unknown], sense)
+            unknown = [unknown[i] for i in selected]
+        stopped = set()
+        for candidate, key in unknown:
+            if cutoff:
+                # the best value so far in this step is a tighter bound
+                bound = min([c_old] + [value for _, value in evaluated])
+                c_new = call(objective, candidate, cutoff=None if bound >= 1e+20 else bound)
+                if c_new is None:
+                    # worse than any future incumbent, since it only decreases
+                    c_new = math.inf
+                    stopped.add(id(candidate))
+            else:
+                c_new = call(objective, candidate)
+            if screen is not None and c_new != math.inf:
+                screen.update(candidate, c_new)
+            if visited is not None:
+                visited.add(key, c_new)
+            evaluated.append((candidate, c_new))
+        next_instance, c_new = evaluated[0]
+        for candidate, value in evaluated[1:]:
+            if accept_next(value, c_new):
+                next_instance, c_new = candidate, value
 
         # step update rule
         if accept_next(c_new, c_old):
@@ -44,6 +112,8 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
             c_old = c_new
             is_new = True
             state = 'improved'
+        elif id(next_instance) in stopped:
+            state = 'reject_cutoff'
         else:
             state = 'reject_poor'
 
@@ -51,17 +121,27 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
             search_step=step,
             search_objective=c_old,
             search_update=state)
+        if screen is not None or visited is not None:
+            step_info['search_evaluated'] = len(unknown)
+        if visited is not None:
+            step_info['search_visited_hits'] = hits
+            step_info['search_visited_hit_rate'] = visited.hit_rate
+        if timings is not None:
+            step_info.update(timings.data())
+            timings = Timings()
         yield step_info, instance
 
-        # next candidate
-        next_instance = neighbour(instance, random_state)
+        # next candidates
+        next_instances = [
+            call(neighbour, instance, random_state) for _ in range(candidates)]
         is_new = False
 
 
-def write_steps(write_func, name_format, new_only):
+def write_steps(write_func, name_format, new_only, timing=None):
     ''' Write the results of a search function, passing the current step
     count to name_format. Reads from step_info whether the instance is new
-    or not, so the function can optionally write new instances only. '''
+    or not, so the function can optionally write new instances only. With
+    :timing the write time and file size are added to step_info. '''
     def write_steps_decorator(func):
         @functools.wraps(func)
         def write_steps_fn(*args, **kwargs):
@@ -72,7 +152,15 @@ def write_steps(write_func, name_format, new_only):
             # write each instance as it is yielded, pass on
             for step_info, instance in func(*args, **kwargs):
                 if new_only is False or step_info['search_update'] == 'improved':
-                    write_func(instance, name_format.format(step=step_info['search_step']))
+                    file_name = name_format.format(step=step_info['search_step'])
+                    if not timing_enabled(timing):
+                        write_func(instance, file_name)
+                    else:
+                        timings = Timings()
+                        with timings.timed(timing_name(write_func)) as extra:
+                            write_func(instance, file_name)
+                            extra['nbytes'] = os.path.getsize(file_name)
+                        add_timings(step_info, timings)
                 yield step_info, instance
         return write_steps_fn
     return write_steps_decorator
@@ -32,11 +32,70 @@ def generate_alpha(variables, constraints, frac_violations, beta_param,
         a=beta_param, b=beta_param, size=num_violations)
     # subtract fractional components from a base vector of integers
     primal_alpha_vector = np.ceil(random_state.lognormal(
-        mean=mean_primal, sigma=std_primal, size=variables)).astype(np.float)
+        mean=mean_primal, sigma=std_primal, size=variables))
     primal_alpha_vector[ind_frac] = primal_alpha_vector[ind_frac] - frac_values
     # slack values
     dual_alpha_vector = random_state.lognormal(
         mean=mean_dual, sigma=std_dual,
-        size=constraints).astype(np.float)
+        size=constraints)
     alpha_vector = np.concatenate([primal_alpha_vector, dual_alpha_vector])
     return alpha_vector
+
+
+def _broadcast_params(**params):
+    ''' Broadcast scalar or per-instance parameters to 1-d arrays of the
+    same length N. '''
+    arrays = np.broadcast_arrays(*(np.atleast_1d(value) for value in params.values()))
+    return {key: array.ravel() for key, array in zip(params, arrays)}
+
+
+def random_subset_mask(counts, size, random_state):
+    ''' N x :size boolean mask with counts[i] elements of row i set, chosen
+    uniformly without replacement. Each row is sampled by ranking random
+    keys: the counts[i] smallest keys are selected. '''
+    counts = np.asarray(counts)
+    keys = random_state.uniform(size=(counts.shape[0], size))
+    # pad with a key below every draw, so a count of zero selects nothing
+    ordered = np.concatenate([np.full((counts.shape[0], 1), -1.0), np.sort(keys, axis=1)], axis=1)
+    thresholds = ordered[np.arange(counts.shape[0]), counts]
+    return keys <= thresholds[:, np.newaxis]
+
+
+def generate_beta_batch(variables, constraints, basis_split, random_state):
+    ''' Generate an N x (n+m) matrix of random basis vectors, one row per
+    element of :basis_split (an array of per-instance parameters). '''
+    basis_split = np.atleast_1d(basis_split)
+    primal_count = np.round(basis_split * min(variables, constraints)).astype(int)
+    slack_count = constraints - primal_count
+    primals_in_basis = random_subset_mask(primal_count, variables, random_state)
+    slacks_in_basis = random_subset_mask(slack_count, constraints, random_state)
+    return np.concatenate([primals_in_basis, slacks_in_basis], axis=1).astype(np.float64)
+
+
+def generate_alpha_batch(variables, constraints, frac_violations, beta_param,
+                         mean_primal, std_primal, mean_dual, std_dual, random_state):
+    ''' Generate an N x (n+m) matrix of non-negative solution values. Each
+    parameter may be a scalar or an array of per-instance values; N is the
+    broadcast length of the parameters. '''
+    params = _broadcast_params(
+        frac_violations=frac_violations, beta_param=beta_param,
+        mean_primal=mean_primal, std_primal=std_primal,
+        mean_dual=mean_dual, std_dual=std_dual)
+    column = {key: value[:, np.newaxis] for key, value in params.items()}
+    size = params['frac_violations'].shape[0]
+    # choosing which solution values will be non-integral
+    num_violations = np.round(params['frac_violations'] * variables).astype(int)
+    ind_frac = random_subset_mask(num_violations, variables, random_state)
+    # fractional components, drawn for all entries and applied to the chosen ones
+    frac_values = random_state.beta(
+        a=column['beta_param'], b=column['beta_param'], size=(size, variables))
+    # subtract fractional components from a base matrix of integers
+    primal_alpha = np.ceil(random_state.lognormal(
+        mean=column['mean_primal'], sigma=column['std_primal'],
+        size=(size, variables)))
+    primal_alpha -= np.where(ind_frac, frac_values, 0)
+    # slack values
+    dual_alpha = random_state.lognormal(
+        mean=column['mean_dual'], sigma=column['std_dual'],
+        size=(size, constraints))
+    return np.concatenate([primal_alpha, dual_alpha], axis=1)
@@ -0,0 +1,221 @@
+''' Append-only sharded storage for large generated instance populations.
+
+Instances are stored as records in shard files, many instances per file,
+instead of one tarball per instance. Each record holds the instance key
+and the internal tar format bytes (see writers.py), and each shard has a
+line-based index file mapping keys to record offsets.
+
+Every writing process appends to its own shard, so pool workers can write
+to the same store concurrently without locking. Readers merge the index
+files for random access by key, or stream the shard files sequentially.
+If a key is written more than once, the most recently indexed record is
+returned by random access.
+'''
+
+import io
+import os
+import json
+import glob
+import uuid
+import struct
+import functools
+from contextlib import suppress
+
+from .writers import write_tar_encoded, write_tar_lp, read_tar
+from .timing import Timings, timing_enabled, add_timings
+
+
+RECORD_MAGIC = b'LPGI'
+RECORD_HEADER = struct.Struct('<4sHQ')  # magic, key length, payload length
+
+WRITE_FUNCS = {
+    'encoded': write_tar_encoded,
+    'lp': write_tar_lp,
+    }
+
+
+class ShardedStore(object):
+    ''' Directory of append-only shard files. :kind selects the record
+    format used for writing ('encoded' stores A, alpha, beta; 'lp' stores
+    A, b, c). Keys are converted to strings, so integer seeds can be used
+    directly. '''
+
+    def __init__(self, directory, kind='encoded', buffer_size=2 ** 20):
+        if kind not in WRITE_FUNCS:
+            raise ValueError('Store kind must be encoded or lp')
+        self.directory = directory
+        self.kind = kind
+        self.buffer_size = buffer_size
+        self._writer = None
+        self._writer_pid = None
+        self._index = None
+        self._readers = dict()
+
+    def __getstate__(self):
+        # Open file handles stay with the process that opened them.
+        state = self.__dict__.copy()
+        state.update(_writer=None, _writer_pid=None, _readers=dict())
+        return state
+
+    # Writing
+
+    def _open_writer(self):
+        ''' Open a new shard for this process. Forked pool workers inherit
+        the parent's store object, so the owning pid is checked and each
+        worker gets its own shard on its first write. '''
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return self._writer
+        with suppress(FileExistsError):
+            os.makedirs(self.directory)
+        name = 'shard-{}-{}'.format(os.getpid(), uuid.uuid4().hex[:8])
+        path = os.path.join(self.directory, name)
+        self._writer = (open(path + '.dat', 'ab'), open(path + '.idx', 'a'), name)
+        self._writer_pid = os.getpid()
+        return self._writer
+
+    def append(self, key, instance):
+        ''' Append an instance to this process's shard. The record is
+        flushed before its index entry is written, so an interrupted write
+        never leaves an index entry pointing at incomplete data. Returns
+        the number of bytes appended to the shard. '''
+        data_file, index_file, name = self._open_writer()
+        key = str(key)
+        payload = io.BytesIO()
+        WRITE_FUNCS[self.kind](instance, payload)
+        payload = payload.getvalue()
+        encoded_key = key.encode('utf-8')
+        offset = data_file.tell()
+        data_file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(encoded_key), len(payload)))
+        data_file.write(encoded_key)
+        data_file.write(payload)
+        data_file.flush()
+        index_file.write(json.dumps([key, offset, len(payload)]) + '\n')
+        index_file.flush()
+        if self._index is not None:
+            self._index[key] = (name, offset, len(payload))
+        return data_file.tell() - offset
+
+    # Reading
+
+    def shard_names(self):
+        ''' Names of all shards in the store, in a stable order. '''
+        paths = glob.glob(os.path.join(self.directory, 'shard-*.dat'))
+        return sorted(os.path.splitext(os.path.basename(p))[0] for p in paths)
+
+    def refresh(self):
+        ''' Reload the index from disk, picking up records appended by
+        other processes since the index was last loaded. '''
+        index = dict()
+        for name in self.shard_names():
+            with suppress(FileNotFoundError):
+                with open(os.path.join(self.directory, name + '.idx')) as infile:
+                    for line in infile:
+                        if not line.endswith('\n'):
+                            break  # partially written entry
+                        key, offset, size = json.loads(line)
+                        index[key] = (name, offset, size)
+        self._index = index
+        return index
+
+    @property
+    def index(self):
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def keys(self):
+        return self.index.keys()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return str(key) in self.index
+
+    def _reader(self, name):
+        if name not in self._readers:
+            self._readers[name] = open(os.path.join(self.directory, name + '.dat'), 'rb')
+        return self._readers[name]
+
+    def get(self, key):
+        ''' Random access to a single instance by key. '''
+        name, offset, size = self.index[str(key)]
+        reader = self._reader(name)
+        reader.seek(offset)
+        magic, key_length, payload_length = RECORD_HEADER.unpack(
+            reader.read(RECORD_HEADER.size))
+        if magic != RECORD_MAGIC or payload_length != size:
+            raise ValueError('Corrupt record for key {} in shard {}'.format(key, name))
+        reader.seek(key_length, io.SEEK_CUR)
+        return read_tar(io.BytesIO(reader.read(payload_length)))
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def scan(self):
+        ''' Stream (key, instance) pairs from every shard sequentially.
+        Records are read in file order with large buffered reads, without
+        using the index. A trailing partial record (from a writer that is
+        still running or was interrupted) ends the scan of its shard. '''
+        for name in self.shard_names():
+            path = os.path.join(self.directory, name + '.dat')
+            with open(path, 'rb', buffering=self.buffer_size) as infile:
+                for key, payload in _iter_records(infile):
+                    yield key, read_tar(io.BytesIO(payload))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def close(self):
+        if self._writer is not None and self._writer_pid == os.getpid():
+            data_file, index_file, _ = self._writer
+            data_file.close()
+            index_file.close()
+        self._writer = None
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _iter_records(infile):
+    ''' Yield (key, payload bytes) for complete records in a shard file. '''
+    while True:
+        header = infile.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        magic, key_length, payload_length = RECORD_HEADER.unpack(header)
+        if magic != RECORD_MAGIC:
+            raise ValueError('Corrupt shard file {}'.format(infile.name))
+        key = infile.read(key_length)
+        payload = infile.read(payload_length)
+        if len(key) < key_length or len(payload) < payload_length:
+            return
+        yield key.decode('utf-8'), payload
+
+
+def store_instance(store, key_format, timing=None):
+    ''' Wrap a function which generates instances, appending each instance
+    to :store before returning it. :key_format should use members of the
+    :data dictionary of the instance to generate a unique key. This is the
+    sharded equivalent of utils.write_instance. '''
+    def store_instance_decorator(func):
+        @functools.wraps(func)
+        def store_instance_fn(*args, **kwargs):
+            instance = func(*args, **kwargs)
+            key = key_format.format(**instance.data)
+            if not timing_enabled(timing):
+                store.append(key, instance)
+                return instance
+            timings = Timings()
+            with timings.timed('store_append') as extra:
+                extra['nbytes'] = store.append(key, instance)
+            add_timings(instance.data, timings)
+            return instance
+        return store_instance_fn
+    return store_instance_decorator
@@ -0,0 +1,128 @@
+''' Surrogate pre-screening of search candidates.
+
+Labelling a candidate with solver performance (e.g. clp_simplex_performance)
+costs several solver runs, and most candidates in a search are rejected. A
+SurrogateScreen is trained online on the candidates already evaluated in a
+run, mapping cheap features (coeff_features by default) to the objective
+value, and selects only the top predicted fraction of each batch of
+candidates for real evaluation. Until enough samples have been seen to fit
+the model, all candidates are evaluated.
+
+The model is ridge regression on standardised features, kept as running
+sums (X'X and X'y) so updates cost O(p^2) for p features and no samples are
+stored.
+'''
+
+import math
+
+import numpy as np
+
+from .features import coeff_features
+
+
+class RidgeSurrogate(object):
+    ''' Online ridge regression on features standardised by the running
+    mean and standard deviation of the samples seen. :alpha is the penalty
+    on standardised coefficients (the intercept is not penalised). '''
+
+    def __init__(self, size, alpha=1.0):
+        self.size = size
+        self.alpha = alpha
+        self.samples = 0
+        # sums over samples of [x, 1][x, 1]' and [x, 1] y
+        self._xtx = np.zeros((size + 1, size + 1))
+        self._xty = np.zeros(size + 1)
+        self._coef = None
+
+    def update(self, x, y):
+        x = np.append(np.asarray(x, dtype=np.float64), 1.0)
+        self._xtx += np.outer(x, x)
+        self._xty += x * y
+        self.samples += 1
+        self._coef = None
+
+    def coefficients(self):
+        ''' Coefficients (and intercept, last) in the original feature
+        scale, i.e. a prediction is [x, 1] @ coefficients. '''
+        if self._coef is None:
+            n = self.samples
+            mean = self._xtx[:-1, -1] / n
+            std = np.sqrt(np.maximum(np.diag(self._xtx)[:-1] / n - mean ** 2, 0))
+            std[std == 0] = 1
+            # z = M [x, 1] with M mapping to standardised features
+            transform = np.eye(self.size + 1)
+            transform[:-1, :-1] /= std[:, np.newaxis]
+            transform[:-1, -1] = -mean / std
+            penalty = np.full(self.size + 1, self.alpha)
+            penalty[-1] = 0
+            zcoef = np.linalg.lstsq(
+                transform @ self._xtx @ transform.T + np.diag(penalty),
+                transform @ self._xty, rcond=None)[0]
+            self._coef = transform.T @ zcoef
+        return self._coef
+
+    def predict(self, x):
+        ''' Predictions for a vector or (k x size) array of features. '''
+        x = np.asarray(x, dtype=np.float64)
+        coef = self.coefficients()
+        return x @ coef[:-1] + coef[-1]
+
+
+class SurrogateScreen(object):
+    ''' Selects which search candidates to evaluate. :features maps an
+    instance to a dictionary of cheap numeric features. The best predicted
+    :fraction of each batch (at least one) is selected once :min_samples
+    evaluations (default twice the number of features, at least 10) have
+    been recorded with update. '''
+
+    def __init__(self, features=coeff_features, fraction=0.25, min_samples=None, alpha=1.0):
+        self.features = features
+        self.fraction = fraction
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.names = None
+        self.model = None
+        self.predicted = 0
+        self.screened = 0
+        # feature vectors of the last batch, reused by update
+        self._cache = dict()
+
+    def _vector(self, instance):
+        features = self.features(instance)
+        if self.names is None:
+            self.names = sorted(
+                key for key, value in features.items()
+                if isinstance(value, (int, float, bool, np.number)))
+            self.model = RidgeSurrogate(len(self.names), alpha=self.alpha)
+            if self.min_samples is None:
+                self.min_samples = max(2 * len(self.names), 10)
+        return np.array([
+            0.0 if features[name] is None else float(features[name])
+            for name in self.names])
+
+    @property
+    def ready(self):
+        return self.model is not None and self.model.samples >= self.min_samples
+
+    def select(self, instances, sense='min'):
+        ''' Indices of :instances to evaluate, best predicted first. '''
+        self._cache = dict()
+        if not self.ready or len(instances) <= 1:
+            return list(range(len(instances)))
+        vectors = [self._vector(instance) for instance in instances]
+        self._cache = {id(i): x for i, x in zip(instances, vectors)}
+        predictions = self.model.predict(np.stack(vectors))
+        order = np.argsort(predictions if sense == 'min' else -predictions, kind='stable')
+        count = max(1, int(math.ceil(self.fraction * len(instances))))
+        self.predicted += len(instances)
+        self.screened += len(instances) - count
+        return [int(i) for i in order[:count]]
+
+    def update(self, instance, value):
+        ''' Record the evaluated objective :value of :instance. '''
+        if value is None or not np.isfinite(value):
+            return
+        x = self._cache.pop(id(instance), None)
+        if x is None:
+            x = self._vector(instance)
+        self.model.update(x, value)
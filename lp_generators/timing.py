@@ -0,0 +1,171 @@
+''' Opt-in timing instrumentation.
+
+When enabled (by argument, or for all processes by setting the
+LP_GENERATORS_TIMING environment variable), calculate_data, write_instance,
+the pipeline stage functions, local_search and the evaluator record wall
+time, CPU time, call counts and bytes written for each calculator, writer
+and neighbour operator. Results are added to instance.data and step_info
+as flat entries, e.g. time_coeff_features_wall, time_coeff_features_cpu,
+time_coeff_features_calls and bytes_write_tar_encoded, along with the
+timing_pid of the worker process, so they survive being stored to JSON and
+can be aggregated per worker with summarise_timings.
+
+CPU time includes waited-for child processes (e.g. clp runs called by
+clp_simplex_performance), so a gap between wall and CPU time shows time
+spent waiting rather than computing.
+'''
+
+import os
+import time
+import resource
+import functools
+import collections
+from contextlib import contextmanager, nullcontext
+
+
+TIMING_ENV = 'LP_GENERATORS_TIMING'
+
+
+def timing_enabled(timing=None):
+    ''' Resolve a :timing argument, taking the default from the environment
+    so the setting reaches pool workers under any start method. '''
+    if timing is None:
+        return os.environ.get(TIMING_ENV, '') not in ('', '0')
+    return bool(timing)
+
+
+def timing_name(func):
+    ''' Name used to record calls to :func (the wrapped function's name for
+    functools.partial objects). '''
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, '__name__', type(func).__name__)
+
+
+def _cpu_time():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class Timings(object):
+    ''' Accumulated calls, wall and CPU seconds and bytes written by name. '''
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.wall = collections.Counter()
+        self.cpu = collections.Counter()
+        self.bytes = collections.Counter()
+
+    def record(self, name, wall, cpu=None, nbytes=None):
+        self.calls[name] += 1
+        self.wall[name] += wall
+        if cpu is not None:
+            self.cpu[name] += cpu
+        if nbytes is not None:
+            self.bytes[name] += nbytes
+
+    @contextmanager
+    def timed(self, name, cpu=True):
+        ''' Context manager recording the time spent in its body under
+        :name. The yielded dictionary may be given an 'nbytes' entry.
+        Set :cpu False where process CPU time can't be attributed to the
+        body (e.g. concurrent tasks on an event loop). '''
+        extra = dict()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time() if cpu else None
+        try:
+            yield extra
+        finally:
+            self.record(
+                name, time.perf_counter() - wall_start,
+                cpu=_cpu_time() - cpu_start if cpu else None,
+                nbytes=extra.get('nbytes'))
+
+    def call(self, name, func, *args, **kwargs):
+        ''' Call :func, recording it under :name. '''
+        with self.timed(name):
+            return func(*args, **kwargs)
+
+    def update(self, other):
+        for name in ['calls', 'wall', 'cpu', 'bytes']:
+            getattr(self, name).update(getattr(other, name))
+
+    def data(self):
+        ''' Flat dictionary of results for instance.data or step_info. '''
+        result = dict(timing_pid=os.getpid())
+        for name, calls in self.calls.items():
+            result['time_{}_calls'.format(name)] = calls
+            result['time_{}_wall'.format(name)] = self.wall[name]
+            if name in self.cpu:
+                result['time_{}_cpu'.format(name)] = self.cpu[name]
+        for name, nbytes in self.bytes.items():
+            result['bytes_{}'.format(name)] = nbytes
+        return result
+
+    @classmethod
+    def from_data(cls, data):
+        ''' Recover timings from a dictionary containing the output of
+        Timings.data (other entries are ignored). '''
+        timings = cls()
+        for key, value in data.items():
+            if key.startswith('bytes_'):
+                timings.bytes[key[6:]] += value
+            elif key.startswith('time_'):
+                name, _, field = key[5:].rpartition('_')
+                if field in ('calls', 'wall', 'cpu'):
+                    getattr(timings, field)[name] += value
+        return timings
+
+
+def summarise_timings(records):
+    ''' Sum the timings in :records (instance.data or step_info
+    dictionaries) per worker, returning a dictionary mapping timing_pid to
+    Timings. Where later pipeline stages ran elsewhere, their timings count
+    towards the worker which generated the instance. Each record should
+    hold timings for its own work only, not cumulative totals. '''
+    workers = collections.defaultdict(Timings)
+    for record in records:
+        if 'timing_pid' in record:
+            workers[record['timing_pid']].update(Timings.from_data(record))
+    return dict(workers)
+
+
+def format_timings(workers):
+    ''' Table of per-worker and total timings, slowest first, for printing
+    at the end of a run. '''
+    total = Timings()
+    for timings in workers.values():
+        total.update(timings)
+    lines = ['{:<32} {:>8} {:>12} {:>12} {:>14}'.format(
+        'name', 'calls', 'wall (s)', 'cpu (s)', 'bytes')]
+    for label, timings in sorted(workers.items()) + [('total', total)]:
+        lines.append('[{}]'.format(label))
+        for name in sorted(timings.calls, key=timings.wall.get, reverse=True):
+            lines.append('{:<32} {:>8d} {:>12.3f} {:>12} {:>14}'.format(
+                name, timings.calls[name], timings.wall[name],
+                '{:.3f}'.format(timings.cpu[name]) if name in timings.cpu else '-',
+                timings.bytes[name] if name in timings.bytes else '-'))
+    return '\n'.join(lines)
+
+
+def add_timings(data, timings):
+    ''' Merge :timings into any timing entries already in the :data
+    dictionary (e.g. from an earlier pipeline stage). The timing_pid of
+    the first process to add timings is kept. Does nothing if :timings is
+    None, i.e. timing is disabled. '''
+    if timings is None:
+        return
+    merged = Timings.from_data(data)
+    merged.update(timings)
+    pid = data.get('timing_pid')
+    data.update(merged.data())
+    if pid is not None:
+        data['timing_pid'] = pid
+
+
+def timed(timings, name):
+    ''' timings.timed(name), or a context doing nothing if :timings is None,
+    for code paths where timing is optional. '''
+    if timings is None:
+        return nullcontext(dict())
+    return timings.timed(name)
@@ -8,6 +8,14 @@ from contextlib import contextmanager, suppress
 import sys
 import functools
 import random
+import gzip
+import json
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .timing import Timings, timing_enabled, timing_name, add_timings
 
 
 @contextmanager
@@ -21,27 +29,43 @@ def temp_file_path(ext=''):
         os.remove(path)
 
 
-def calculate_data(*calculators):
+def update_data(instance, calculators, timings=None):
+    ''' Add the results of :calculators to the data dictionary of :instance,
+    recording each calculator in :timings if given. '''
+    if not hasattr(instance, 'data'):
+        instance.data = dict()
+    for calculator in calculators:
+        if timings is None:
+            instance.data.update(calculator(instance))
+        else:
+            instance.data.update(timings.call(timing_name(calculator), calculator, instance))
+    add_timings(instance.data, timings)
+    return instance
+
+
+def calculate_data(*calculators, timing=None):
     ''' Wrap a function which generates instances, passing instances to
     calculation functions before returning. Results from the calculation
-    functions are added to the instances data dictionary. '''
+    functions are added to the instances data dictionary. With :timing
+    (default from the environment, see timing.timing_enabled) the time
+    spent generating and in each calculator is also added to the data. '''
     def calculate_data_decorator(func):
         @functools.wraps(func)
         def calculate_data_fn(*args, **kwargs):
-            instance = func(*args, **kwargs)
-            if not hasattr(instance, 'data'):
-                instance.data = dict()
-            for calculator in calculators:
-                instance.data.update(calculator(instance))
-            return instance
+            if not timing_enabled(timing):
+                return update_data(func(*args, **kwargs), calculators)
+            timings = Timings()
+            instance = timings.call(timing_name(func), func, *args, **kwargs)
+            return update_data(instance, calculators, timings)
         return calculate_data_fn
     return calculate_data_decorator
 
 
-def write_instance(write_func, name_format):
+def write_instance(write_func, name_format, timing=None):
     ''' Wrap a function which generates instances, passing the instance to a
     writer function before returning it. :name_format should use members of the
-    :data dictionary of the instance to generate a unique name. '''
+    :data dictionary of the instance to generate a unique name. With :timing
+    the write time and file size are added to the data. '''
     def write_instance_decorator(func):
         @functools.wraps(func)
         def write_instance_fn(*args, **kwargs):
@@ -51,7 +75,15 @@ def write_instance(write_func, name_format):
                 os.makedirs(directory)
             # generate, write, and pass the instance on
             instance = func(*args, **kwargs)
-            write_func(instance, name_format.format(**instance.data))
+            file_name = name_format.format(**instance.data)
+            if not timing_enabled(timing):
+                write_func(instance, file_name)
+                return instance
+            timings = Timings()
+            with timings.timed(timing_name(write_func)) as extra:
+                write_func(instance, file_name)
+                extra['nbytes'] = os.path.getsize(file_name)
+            add_timings(instance.data, timings)
             return instance
         return write_instance_fn
     return write_instance_decorator
@@ -62,3 +94,152 @@ def system_random_seeds(n, bits):
     rand = random.SystemRandom()
     for _ in range(n):
         yield rand.getrandbits(bits)
+
+
+LEGACY_RANDOM_ENV = 'LP_GENERATORS_LEGACY_RANDOM'
+
+
+def legacy_random():
+    ''' True if legacy RandomState mode is selected by the environment.
+    An environment variable is used so the setting reaches pool workers
+    under any multiprocessing start method. '''
+    return os.environ.get(LEGACY_RANDOM_ENV, '') not in ('', '0')
+
+
+def random_generator(seed=None, legacy=None, bit_generator=np.random.PCG64):
+    ''' Create the random state passed through generators and neighbour
+    operators. By default this is a numpy Generator using :bit_generator
+    (PCG64, or Philox etc.) seeded via SeedSequence, so distinct seeds give
+    independent streams. With :legacy (default taken from the environment,
+    see legacy_random) a RandomState is returned, reproducing instances
+    generated from the same seeds before Generator support.
+    :seed may be an int, a SeedSequence, or an existing random state which
+    is returned unchanged. '''
+    if isinstance(seed, (np.random.Generator, np.random.RandomState)):
+        return seed
+    if legacy is None:
+        legacy = legacy_random()
+    if legacy:
+        return np.random.RandomState(seed)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.Generator(bit_generator(seed))
+
+
+def spawn_generators(random_state, n):
+    ''' Create :n independent child random states from :random_state, e.g.
+    for parallel workers or a batch of candidates. Generators spawn child
+    SeedSequences; legacy RandomStates seed children from their own
+    stream, which is reproducible but carries no independence guarantee. '''
+    if isinstance(random_state, np.random.RandomState):
+        return [
+            np.random.RandomState(seed)
+            for seed in random_state.randint(2 ** 32, size=n, dtype=np.uint64)]
+    bit_generator = random_state.bit_generator
+    return [
+        np.random.Generator(type(bit_generator)(child))
+        for child in bit_generator.seed_seq.spawn(n)]
+
+
+def read_seed_file(file_name):
+    ''' Read seeds from a JSON seed file, returning (seeds, legacy) where
+    legacy selects RandomState streams. Files written by write_seed_file
+    record the stream type. A plain list of seeds is an older seed file:
+    if every seed fits in 32 bits it is read as legacy, since such files
+    were generated for RandomState streams. '''
+    with open(file_name) as infile:
+        data = json.load(infile)
+    if isinstance(data, dict):
+        if data.get('random') not in ('legacy', 'generator'):
+            raise ValueError('Seed file {} has unknown random stream type'.format(file_name))
+        return data['seeds'], data['random'] == 'legacy'
+    return data, all(0 <= seed < 2 ** 32 for seed in data)
+
+
+def write_seed_file(file_name, seeds, legacy):
+    ''' Write :seeds to a JSON seed file, recording whether they were used
+    with legacy RandomState or Generator streams. '''
+    with open(file_name, 'w') as outfile:
+        json.dump(dict(random='legacy' if legacy else 'generator', seeds=list(seeds)), outfile)
+
+
+def spawn_seeds(n, entropy=None):
+    ''' List of :n distinct integer seeds for independent worker streams,
+    derived from children of one SeedSequence (seeded from system entropy
+    if :entropy is None). Unlike system_random_seeds, 64 bit values drawn
+    this way make repeated seeds across workers negligibly likely. '''
+    root = np.random.SeedSequence(entropy)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in root.spawn(n)]
+
+
+class ParallelGzipWriter(object):
+    ''' Binary file-like object compressing written data in parallel.
+    Data is split into blocks which are compressed as independent gzip
+    members by a thread pool (zlib releases the GIL) and written in order.
+    Concatenated gzip members form a valid gzip file. '''
+
+    def __init__(self, fileobj, threads=None, block_size=2 ** 20, compresslevel=6):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.threads = threads or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.threads)
+        self._pending = collections.deque()
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.block_size:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        block = b''.join(self._buffer)
+        self._buffer, self._buffered = [], 0
+        self._pending.append(self._executor.submit(
+            gzip.compress, block, self.compresslevel))
+        # bound memory use by waiting on the oldest blocks
+        while len(self._pending) > 2 * self.threads:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._buffered > 0 or len(self._pending) == 0:
+            self._submit()
+        while self._pending:
+            self.fileobj.write(self._pending.popleft().result())
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def open_output(target, compress=None, threads=1):
+    ''' Context manager returning a binary file object for writing to
+    :target, which is either a file name or an open binary file object
+    (which is not closed on exit). Output is gzip compressed if :compress
+    is set, or if it is None and :target is a file name ending with .gz.
+    More than one thread uses a ParallelGzipWriter. '''
+    if compress is None:
+        compress = isinstance(target, str) and target.endswith('.gz')
+    if isinstance(target, str):
+        raw = open(target, 'wb')
+    else:
+        raw = target
+    try:
+        if not compress:
+            yield raw
+        elif threads > 1:
+            with ParallelGzipWriter(raw, threads=threads) as outfile:
+                yield outfile
+        else:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as outfile:
+                yield outfile
+    finally:
+        if raw is not target:
+            raw.close()
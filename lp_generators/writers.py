@@ -1,36 +1,111 @@
 ''' Write instance data in various formats. Supports MPS for external use of
 generated instances and a tar format used internally to read and write
-instance data for generation and search where required. '''
+instance data for generation and search where required. External MPS
+instances can be read and converted to canonical form.
+
+All writers accept an InstanceBatch: the tar format stores the stacked
+arrays in one file, while MPS and LP writers write one file per member
+to a name template with an {index} field. '''
 
 import io
+import gzip
 import tarfile
+import functools
 
 import numpy as np
-
-from .lp_ext import LPCy
-from .instance import EncodedInstance, UnsolvedInstance
-
-
+import scipy.sparse as sparsemat
+
+from .lp_ext import LPCy, construct_canonical
+from .instance import EncodedInstance, UnsolvedInstance, SparseUnsolvedInstance
+from .batch import InstanceBatch
+from .formats import dump_mps, dump_lp, parse_mps, canonical_form
+from .utils import open_output
+
+
+def _per_instance(write_func):
+    ''' Let a single instance writer accept an InstanceBatch, writing one
+    file per member. For a batch, the target must be a file name template
+    with an {index} field, formatted with each member's index. '''
+    @functools.wraps(write_func)
+    def write_func_batch(instance, target, *args, **kwargs):
+        if not isinstance(instance, InstanceBatch):
+            return write_func(instance, target, *args, **kwargs)
+        if not isinstance(target, str) or '{index}' not in target:
+            raise ValueError(
+                'Writing an InstanceBatch requires a file name template '
+                'with an {index} field, one file per instance')
+        for index, member in enumerate(instance):
+            write_func(member, target.format(index=index), *args, **kwargs)
+    return write_func_batch
+
+
+@_per_instance
 def write_mps(instance, file_name):
     ''' Write an LP instance to MPS format (using A, b, c). '''
-    writer = LPCy()
-    writer.construct_dense_canonical(
-        instance.variables, instance.constraints,
-        np.asarray(instance.lhs()),
-        np.asarray(instance.rhs()),
-        np.asarray(instance.objective()))
-    writer.write_mps(file_name)
+    with LPCy() as writer:
+        construct_canonical(writer, instance)
+        writer.write_mps(file_name)
 
 
+@_per_instance
 def write_mps_ip(instance, file_name):
-    ''' Write an LP instance to MPS format (using A, b, c). '''
-    writer = LPCy()
-    writer.construct_dense_canonical(
-        instance.variables, instance.constraints,
-        np.asarray(instance.lhs()),
-        np.asarray(instance.rhs()),
-        np.asarray(instance.objective()))
-    writer.write_mps_ip(file_name)
+    ''' Write an LP instance to MPS format (using A, b, c) with all
+    variables integer. '''
+    with LPCy() as writer:
+        construct_canonical(writer, instance)
+        writer.write_mps_ip(file_name)
+
+
+@_per_instance
+def write_mps_stream(instance, target, integer=False, compress=None, threads=1):
+    ''' Write an LP instance to free MPS format directly from the instance
+    arrays, without constructing a CLP model. :target is a file name or a
+    binary file object. Compression defaults to gzip for .gz file names;
+    :threads > 1 compresses blocks in parallel. '''
+    with open_output(target, compress=compress, threads=threads) as outfile:
+        dump_mps(instance, outfile, integer=integer)
+
+
+def write_mps_ip_stream(instance, target, compress=None, threads=1):
+    ''' Streaming MPS writer with all variables integer. '''
+    write_mps_stream(instance, target, integer=True, compress=compress, threads=threads)
+
+
+@_per_instance
+def write_lp_stream(instance, target, integer=False, compress=None, threads=1):
+    ''' Write an LP instance to CPLEX LP format directly from the instance
+    arrays. Arguments as for write_mps_stream. '''
+    with open_output(target, compress=compress, threads=threads) as outfile:
+        dump_lp(instance, outfile, integer=integer)
+
+
+# Instances with more lhs cells than this are read with sparse storage.
+SPARSE_THRESHOLD = 10 ** 6
+
+
+def read_mps(file_name, sparse=None):
+    ''' Read an MPS file (gzipped if the name ends with .gz) and convert it
+    to a canonical form instance. The file is parsed line by line and A is
+    only built as a sparse matrix. If :sparse is None, instances with more
+    than SPARSE_THRESHOLD lhs cells give a SparseUnsolvedInstance and
+    smaller ones a dense UnsolvedInstance (which neighbour operators
+    require). Conversion details (objective constant, original sizes and
+    integer variable count) are attached as instance.data. '''
+    if file_name.endswith('.gz'):
+        infile = gzip.open(file_name, 'rt', encoding='latin-1')
+    else:
+        infile = open(file_name, 'r', encoding='latin-1')
+    with infile:
+        model = parse_mps(infile)
+    lhs, rhs, objective, info = canonical_form(model)
+    if sparse is None:
+        sparse = lhs.shape[0] * lhs.shape[1] > SPARSE_THRESHOLD
+    if sparse:
+        instance = SparseUnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    else:
+        instance = UnsolvedInstance(lhs=lhs.toarray(), rhs=rhs, objective=objective)
+    instance.data = info
+    return instance
 
 
 def save_matrix_to_tar(tarstore, matrix, name):
@@ -52,35 +127,97 @@ def extract_matrix_from_tar(tarstore, name):
     return None
 
 
+def open_tar(target, mode):
+    ''' Open a tarball from a file name or an open binary file object. '''
+    if hasattr(target, 'read') or hasattr(target, 'write'):
+        return tarfile.TarFile(fileobj=target, mode=mode)
+    return tarfile.TarFile(target, mode=mode)
+
+
 def write_tar_encoded(instance, filename):
-    ''' Internal use format: write the encoded form matrices as a tarball. '''
-    with tarfile.TarFile(filename, mode='w') as store:
+    ''' Internal use format: write the encoded form matrices as a tarball.
+    An InstanceBatch is written as stacked matrices. '''
+    with open_tar(filename, mode='w') as store:
         save_matrix_to_tar(store, instance.lhs(), 'canonical_lhs.npy')
         save_matrix_to_tar(store, instance.alpha(), 'canonical_alpha.npy')
         save_matrix_to_tar(store, instance.beta(), 'canonical_beta.npy')
 
 
+def extract_encoded_from_tar(store):
+    ''' Helper builds an EncodedInstance from an open tarball, or an
+    InstanceBatch if stacked matrices were written. '''
+    lhs = extract_matrix_from_tar(store, 'canonical_lhs.npy')
+    alpha = extract_matrix_from_tar(store, 'canonical_alpha.npy')
+    beta = extract_matrix_from_tar(store, 'canonical_beta.npy')
+    if lhs.ndim == 3:
+        return InstanceBatch(lhs=lhs, alpha=alpha, beta=beta)
+    return EncodedInstance(lhs=lhs, alpha=alpha, beta=beta)
+
+
 def read_tar_encoded(filename):
     ''' Internal use format: read the encoded form matrices from a tarball. '''
-    with tarfile.TarFile(filename, mode='r') as store:
-        lhs = extract_matrix_from_tar(store, 'canonical_lhs.npy')
-        alpha = extract_matrix_from_tar(store, 'canonical_alpha.npy')
-        beta = extract_matrix_from_tar(store, 'canonical_beta.npy')
-    return EncodedInstance(lhs=lhs, alpha=alpha, beta=beta)
+    with open_tar(filename, mode='r') as store:
+        return extract_encoded_from_tar(store)
+
+
+SPARSE_LHS_PARTS = ['data', 'indices', 'indptr', 'shape']
+
+
+def save_lhs_to_tar(tarstore, lhs):
+    ''' Save a dense lhs matrix, or the CSR components of a sparse one
+    (keeping their compact dtypes). '''
+    if sparsemat.issparse(lhs):
+        lhs = sparsemat.csr_matrix(lhs)
+        parts = dict(data=lhs.data, indices=lhs.indices, indptr=lhs.indptr, shape=np.array(lhs.shape))
+        for part in SPARSE_LHS_PARTS:
+            save_matrix_to_tar(tarstore, parts[part], 'canonical_lhs_{}.npy'.format(part))
+    else:
+        save_matrix_to_tar(tarstore, lhs, 'canonical_lhs.npy')
+
+
+def extract_lhs_from_tar(tarstore):
+    ''' Read an lhs saved by save_lhs_to_tar: a dense array, or a CSR matrix
+    if components were stored. '''
+    lhs = extract_matrix_from_tar(tarstore, 'canonical_lhs.npy')
+    if lhs is not None:
+        return lhs
+    parts = {
+        part: extract_matrix_from_tar(tarstore, 'canonical_lhs_{}.npy'.format(part))
+        for part in SPARSE_LHS_PARTS}
+    return sparsemat.csr_matrix(
+        (parts['data'], parts['indices'], parts['indptr']), shape=tuple(parts['shape']))
 
 
 def write_tar_lp(instance, filename):
-    ''' Internal use format: write the encoded form matrices as a tarball. '''
-    with tarfile.TarFile(filename, mode='w') as store:
-        save_matrix_to_tar(store, instance.lhs(), 'canonical_lhs.npy')
+    ''' Internal use format: write the encoded form matrices as a tarball.
+    Sparse lhs matrices are written as CSR components. '''
+    with open_tar(filename, mode='w') as store:
+        save_lhs_to_tar(store, instance.lhs())
         save_matrix_to_tar(store, instance.rhs(), 'canonical_rhs.npy')
         save_matrix_to_tar(store, instance.objective(), 'canonical_objective.npy')
 
 
+def extract_lp_from_tar(store):
+    ''' Helper builds an UnsolvedInstance (SparseUnsolvedInstance if a
+    sparse lhs was written) from an open tarball. '''
+    lhs = extract_lhs_from_tar(store)
+    rhs = extract_matrix_from_tar(store, 'canonical_rhs.npy')
+    objective = extract_matrix_from_tar(store, 'canonical_objective.npy')
+    if sparsemat.issparse(lhs):
+        return SparseUnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    return UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+
+
 def read_tar_lp(filename):
     ''' Internal use format: read the encoded form matrices from a tarball. '''
-    with tarfile.TarFile(filename, mode='r') as store:
-        lhs = extract_matrix_from_tar(store, 'canonical_lhs.npy')
-        rhs = extract_matrix_from_tar(store, 'canonical_rhs.npy')
-        objective = extract_matrix_from_tar(store, 'canonical_objective.npy')
-    return UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    with open_tar(filename, mode='r') as store:
+        return extract_lp_from_tar(store)
+
+
+def read_tar(filename):
+    ''' Internal use format: read either tarball format, returning an
+    EncodedInstance or UnsolvedInstance depending on the stored matrices. '''
+    with open_tar(filename, mode='r') as store:
+        if 'canonical_alpha.npy' in store.getnames():
+            return extract_encoded_from_tar(store)
+        return extract_lp_from_tar(store)
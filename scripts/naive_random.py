@@ -1,17 +1,18 @@
 ''' Generate a set of instances using the naive method. '''
 
-import multiprocessing
 import json
 
-import numpy as np
 from tqdm import tqdm
 
 from lp_generators.lhs_generators import generate_lhs
 from lp_generators.instance import UnsolvedInstance
 from lp_generators.features import coeff_features, solution_features
-from lp_generators.performance import clp_simplex_performance
-from lp_generators.utils import calculate_data, write_instance
-from lp_generators.writers import write_tar_lp
+from lp_generators.evaluator import evaluate, clp_simplex_performance_async
+from lp_generators.utils import random_generator, calculate_data
+from lp_generators.timing import timing_enabled, summarise_timings, format_timings
+from lp_generators.metrics import tracked, observe_instance
+from lp_generators.store import ShardedStore
+from lp_generators.pipeline import stage, run_pipeline, attach_data, store_instances
 
 from seeds import cli_seeds
 
@@ -24,8 +25,10 @@ def generate_objective(variables, constraints, obj_mean, obj_std, random_state):
     return random_state.normal(loc=obj_mean, scale=obj_std, size=variables)
 
 
-@calculate_data(coeff_features, solution_features, clp_simplex_performance)
-@write_instance(write_tar_lp, 'data/naive_random/inst_{seed}.tar')
+STORE = ShardedStore('data/naive_random', kind='lp')
+
+
+@calculate_data()  # records generation time when timing is enabled
 def generate(seed):
     ''' Creates a distribution of fixed size instances using the
     'naive' strategy:
@@ -35,7 +38,7 @@ def generate(seed):
             using the chosen instance-level parameters
      '''
 
-    random_state = np.random.RandomState(seed)
+    random_state = random_generator(seed)
 
     size_params = dict(variables=50, constraints=50)
     rhs_params = dict(
@@ -52,26 +55,31 @@ def generate(seed):
         coeff_scale=random_state.uniform(low=0.1, high=1.0))
 
     instance = UnsolvedInstance(
-        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).todense(),
+        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).toarray(),
         rhs=generate_rhs(random_state=random_state, **size_params, **rhs_params),
         objective=generate_objective(random_state=random_state, **size_params, **objective_params))
     instance.data = dict(seed=seed)
     return instance
 
 
+STAGES = [
+    stage(generate, chunksize=8),
+    stage(attach_data(coeff_features, solution_features)),
+    stage(store_instances(STORE, '{seed}'), workers=0),
+    ]
+
+
 @cli_seeds
 def run(seed_values):
     ''' Generate the required number of instances and store feature results. '''
-    pool = multiprocessing.Pool()
-    mapper = pool.imap_unordered
     print('Generating fixed size naive random instances.')
     instances = tqdm(
-        mapper(generate, seed_values),
+        evaluate(run_pipeline(seed_values, STAGES), [clp_simplex_performance_async]),
         total=len(seed_values), smoothing=0)
-    features = [
-        instance.data
-        for instance in instances
-    ]
+    features = list(tracked((instance.data for instance in instances), observe_instance))
+    STORE.close()
+    if timing_enabled():
+        print(format_timings(summarise_timings(features)))
     with open('data/naive_random.json', 'w') as outfile:
         json.dump(features, outfile, indent=4, sort_keys=True)
 
@@ -4,41 +4,55 @@ import multiprocessing
 import json
 
 import click
-import numpy as np
 from tqdm import tqdm
 
 from lp_generators.writers import read_tar_encoded
 from lp_generators.features import coeff_features, solution_features
 from lp_generators.performance import clp_simplex_performance
+from lp_generators.utils import random_generator
+from lp_generators.metrics import tracked
+from lp_generators.surrogate import SurrogateScreen
+from lp_generators.timing import (
+    Timings, timing_enabled, timed, summarise_timings, format_timings)
 
 from search_operators import encoded_column_neighbour, encoded_row_neighbour
-from seeds import cli_seeds
-from performance_search_common import condition, objective, start_instance, calculate_features
+from seeds import cli_seeds, observe_search
+from performance_search_common import (
+    condition, objective, start_instance, calculate_features, best_candidate)
 
 
 def generate_by_search(arg):
-    seed, perf_field = arg
+    seed, perf_field, candidates, screen_fraction = arg
+    screen = SurrogateScreen(fraction=screen_fraction) if screen_fraction else None
     results = []
     pass_condition = 0
     step_change = 0
-    random_state = np.random.RandomState(seed)
+    random_state = random_generator(seed)
+    timings = Timings() if timing_enabled() else None
     current_instance = start_instance(random_state, perf_field)
     current_features = calculate_features(current_instance)
     for step in range(10001):
         if (step % 100) == 0:
+            with timed(timings, 'clp_simplex_performance'):
+                performance = clp_simplex_performance(current_instance)
             results.append(dict(
                 **coeff_features(current_instance),
                 **solution_features(current_instance),
-                **clp_simplex_performance(current_instance),
+                **performance,
                 pass_condition=pass_condition,
                 step_change=step_change,
                 step=step, seed=seed))
-        if (step % 2) == 0:
-            new_instance = encoded_row_neighbour(random_state, current_instance, 5)
-        else:
-            new_instance = encoded_column_neighbour(random_state, current_instance, 5)
-        new_features = calculate_features(new_instance)
-        if condition(new_features):
+            if timings is not None:
+                # each row holds the timings since the previous row
+                results[-1].update(timings.data())
+                timings = Timings()
+        neighbour = encoded_row_neighbour if (step % 2) == 0 else encoded_column_neighbour
+        with timed(timings, neighbour.__name__):
+            new_instances = [
+                neighbour(random_state, current_instance, 5) for _ in range(candidates)]
+        with timed(timings, 'calculate_features'):
+            new_instance, new_features = best_candidate(new_instances, perf_field, screen)
+        if new_instance is not None:
             pass_condition += 1
             if objective(new_features, perf_field) < objective(current_features, perf_field):
                 step_change += 1
@@ -49,16 +63,23 @@ def generate_by_search(arg):
 
 @cli_seeds
 @click.option('--perf-field', type=str)
-def run(seed_values, perf_field):
+@click.option('--candidates', default=1, type=int, help='Neighbours generated per step')
+@click.option('--screen-fraction', default=None, type=float,
+              help='Evaluate only the best fraction of candidates predicted by a surrogate model')
+def run(seed_values, perf_field, candidates, screen_fraction):
     assert perf_field is not None
     ''' Generate the required number of instances and store feature results. '''
-    pool = multiprocessing.Pool()
-    mapper = pool.imap_unordered
     print('Generating instances by parameterised search.')
-    features = list(tqdm(
-        mapper(generate_by_search, zip(seed_values, itertools.repeat(perf_field))),
-        total=len(seed_values), smoothing=0))
+    with multiprocessing.Pool() as pool:
+        features = list(tqdm(
+            tracked(pool.imap_unordered(generate_by_search, zip(
+                seed_values, itertools.repeat(perf_field),
+                itertools.repeat(candidates), itertools.repeat(screen_fraction))),
+                observe_search),
+            total=len(seed_values), smoothing=0))
     features = list(itertools.chain(*features))
+    if timing_enabled():
+        print(format_timings(summarise_timings(features)))
     with open('data/parameterised_performance_search_{}.json'.format(perf_field), 'w') as outfile:
         json.dump(features, outfile, indent=4, sort_keys=True)
 
@@ -1,33 +1,35 @@
 ''' Command line script which generates instances using the constructor
 method and varying expected feature values uniformly. '''
 
-import multiprocessing
 import json
 
-import numpy as np
 from tqdm import tqdm
 
 from lp_generators.lhs_generators import generate_lhs
 from lp_generators.solution_generators import generate_alpha, generate_beta
 from lp_generators.instance import EncodedInstance
 from lp_generators.features import coeff_features, solution_features
-from lp_generators.performance import clp_simplex_performance
-from lp_generators.utils import calculate_data, write_instance
-from lp_generators.writers import write_tar_encoded
+from lp_generators.evaluator import evaluate, clp_simplex_performance_async
+from lp_generators.utils import random_generator, calculate_data
+from lp_generators.timing import timing_enabled, summarise_timings, format_timings
+from lp_generators.metrics import tracked, observe_instance
+from lp_generators.store import ShardedStore
+from lp_generators.pipeline import stage, run_pipeline, attach_data, store_instances
 
 from seeds import cli_seeds
 
 
-@write_instance(write_tar_encoded, 'data/parameterised_random/inst_{seed}.tar')
-@calculate_data(coeff_features, solution_features, clp_simplex_performance)
+STORE = ShardedStore('data/parameterised_random', kind='encoded')
+
+
+@calculate_data()  # records generation time when timing is enabled
 def generate(seed):
     ''' Generator distributing uniformly across parameters with fixed size.
-    Feature values are attached to each instance by the calculate_data
-    decorator. Instances are written to compressed format using the
-    write_instance decorator so they can be loaded later as start points
-    for search algorithms. '''
+    Feature values are attached and instances are appended to a sharded
+    store by later pipeline stages, so they can be loaded later by seed as
+    start points for search algorithms. '''
 
-    random_state = np.random.RandomState(seed)
+    random_state = random_generator(seed)
 
     size_params = dict(variables=50, constraints=50)
     beta_params = dict(
@@ -47,7 +49,7 @@ def generate(seed):
         coeff_scale=random_state.uniform(low=0.1, high=1.0))
 
     instance = EncodedInstance(
-        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).todense(),
+        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).toarray(),
         alpha=generate_alpha(random_state=random_state, **size_params, **alpha_params),
         beta=generate_beta(random_state=random_state, **size_params, **beta_params))
     instance.data = dict(seed=seed, params=dict(
@@ -56,19 +58,24 @@ def generate(seed):
     return instance
 
 
+STAGES = [
+    stage(generate, chunksize=8),
+    stage(attach_data(coeff_features, solution_features)),
+    stage(store_instances(STORE, '{seed}'), workers=0),
+    ]
+
+
 @cli_seeds
 def run(seed_values):
     ''' Generate instances from the given seed values and store feature results. '''
-    pool = multiprocessing.Pool()
-    mapper = pool.imap_unordered
     print('Generating fixed size parameterised instances.')
     instances = tqdm(
-        mapper(generate, seed_values),
+        evaluate(run_pipeline(seed_values, STAGES), [clp_simplex_performance_async]),
         total=len(seed_values), smoothing=0)
-    features = [
-        instance.data
-        for instance in instances
-    ]
+    features = list(tracked((instance.data for instance in instances), observe_instance))
+    STORE.close()
+    if timing_enabled():
+        print(format_timings(summarise_timings(features)))
     with open('data/parameterised_random.json', 'w') as outfile:
         json.dump(features, outfile, indent=4, sort_keys=True)
 
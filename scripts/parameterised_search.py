@@ -3,21 +3,25 @@ import itertools
 import multiprocessing
 import json
 
-import numpy as np
 from tqdm import tqdm
 
 from lp_generators.writers import read_tar_encoded
 from lp_generators.features import coeff_features, solution_features
+from lp_generators.incremental import CoeffFeatureTracker
 from lp_generators.performance import clp_simplex_performance
+from lp_generators.utils import random_generator
+from lp_generators.metrics import tracked
+from lp_generators.timing import (
+    Timings, timing_enabled, timed, summarise_timings, format_timings)
 
 from search_operators import encoded_column_neighbour, encoded_row_neighbour
-from seeds import cli_seeds
+from seeds import cli_seeds, observe_search
 from search_common import condition, objective, start_instance
 
 
-def calculate_features(instance):
+def calculate_features(instance, tracker):
     return dict(
-        **coeff_features(instance),
+        **tracker.features(),
         **solution_features(instance))
 
 
@@ -25,42 +29,60 @@ def generate_by_search(seed):
     results = []
     pass_condition = 0
     step_change = 0
-    random_state = np.random.RandomState(seed)
+    random_state = random_generator(seed)
+    timings = Timings() if timing_enabled() else None
     current_instance = start_instance(random_state)
-    current_features = calculate_features(current_instance)
+    current_tracker = CoeffFeatureTracker.from_instance(current_instance)
+    current_features = calculate_features(current_instance, current_tracker)
     for step in range(10001):
         if (step % 100) == 0:
+            with timed(timings, 'clp_simplex_performance'):
+                performance = clp_simplex_performance(current_instance)
+            # logged rows use fresh coefficient features, and the tracker is
+            # rebuilt so running sums do not drift over the search
+            current_tracker = CoeffFeatureTracker.from_instance(current_instance)
             results.append(dict(
+                current_features,
                 **coeff_features(current_instance),
-                **solution_features(current_instance),
-                **clp_simplex_performance(current_instance),
+                **performance,
                 pass_condition=pass_condition,
                 step_change=step_change,
                 step=step, seed=seed))
+            if timings is not None:
+                # each row holds the timings since the previous row
+                results[-1].update(timings.data())
+                timings = Timings()
         if (step % 2) == 0:
-            new_instance = encoded_row_neighbour(random_state, current_instance, 1)
+            with timed(timings, 'encoded_row_neighbour'):
+                new_instance = encoded_row_neighbour(random_state, current_instance, 1)
         else:
-            new_instance = encoded_column_neighbour(random_state, current_instance, 1)
-        new_features = calculate_features(new_instance)
+            with timed(timings, 'encoded_column_neighbour'):
+                new_instance = encoded_column_neighbour(random_state, current_instance, 1)
+        with timed(timings, 'calculate_features'):
+            new_tracker = current_tracker.updated(
+                current_instance, new_instance, **new_instance.changed)
+            new_features = calculate_features(new_instance, new_tracker)
         if condition(new_features):
             pass_condition += 1
             if objective(new_features) < objective(current_features):
                 step_change += 1
                 current_instance = new_instance
                 current_features = new_features
+                current_tracker = new_tracker
     return results
 
 
 @cli_seeds
 def run(seed_values):
     ''' Generate the required number of instances and store feature results. '''
-    pool = multiprocessing.Pool()
-    mapper = pool.imap_unordered
     print('Generating instances by parameterised search.')
-    features = list(tqdm(
-        mapper(generate_by_search, seed_values),
-        total=len(seed_values), smoothing=0))
+    with multiprocessing.Pool() as pool:
+        features = list(tqdm(
+            tracked(pool.imap_unordered(generate_by_search, seed_values), observe_search),
+            total=len(seed_values), smoothing=0))
     features = list(itertools.chain(*features))
+    if timing_enabled():
+        print(format_timings(summarise_timings(features)))
     with open('data/parameterised_search.json', 'w') as outfile:
         json.dump(features, outfile, indent=4, sort_keys=True)
 
@@ -5,12 +5,14 @@ import numpy as np
 
 from lp_generators.features import coeff_features, solution_features
 from lp_generators.performance import clp_simplex_performance
-from lp_generators.writers import read_tar_encoded
+from lp_generators.store import ShardedStore
 
 
 with open('data/parameterised_random.json') as infile:
     naive_random_data = json.load(infile)
 
+STORE = ShardedStore('data/parameterised_random')
+
 
 def condition(data):
     return data['solvable'] is True
@@ -30,10 +32,28 @@ def _sample(rstate):
 
 def start_instance(rstate, perf_field):
     seed = min((_sample(rstate) for _ in range(200)), key=lambda d: objective(d, perf_field))['seed']
-    return read_tar_encoded('data/parameterised_random/inst_{seed}.tar'.format(seed=seed))
+    return STORE[seed]
 
 
 def calculate_features(instance):
     return dict(
         **solution_features(instance),
         **clp_simplex_performance(instance))
+
+
+def best_candidate(instances, perf_field, screen=None):
+    ''' Evaluate candidate :instances (only those selected by a surrogate
+    :screen, if given), returning the best (instance, features) pair which
+    passes the condition, or (None, None) if none do. '''
+    if screen is not None:
+        instances = [instances[i] for i in screen.select(instances, sense='min')]
+    best_instance, best_features = None, None
+    for instance in instances:
+        features = calculate_features(instance)
+        if not condition(features):
+            continue
+        if screen is not None:
+            screen.update(instance, objective(features, perf_field))
+        if best_features is None or objective(features, perf_field) < objective(best_features, perf_field):
+            best_instance, best_features = instance, features
+    return best_instance, best_features
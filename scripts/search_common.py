@@ -3,12 +3,14 @@ import json
 
 import numpy as np
 
-from lp_generators.writers import read_tar_lp
+from lp_generators.store import ShardedStore
 
 
 with open('data/naive_random.json') as infile:
     naive_random_data = json.load(infile)
 
+STORE = ShardedStore('data/naive_random', kind='lp')
+
 
 def condition(data):
     return data['solvable'] is True
@@ -27,4 +29,4 @@ def _sample(rstate):
 
 def start_instance(rstate):
     seed = min((_sample(rstate) for _ in range(20)), key=objective)['seed']
-    return read_tar_lp('data/naive_random/inst_{seed}.tar'.format(seed=seed))
+    return STORE[seed]
@@ -1,4 +1,7 @@
-''' Modificaion operators should pick from the same distribution as the generators. '''
+''' Modificaion operators should pick from the same distribution as the generators.
+
+Neighbours record the replaced lhs rows or columns in their :changed
+attribute, so incremental feature trackers only need to visit those. '''
 
 import itertools
 import numpy as np
@@ -26,7 +29,7 @@ def lhs_row(random_state, ncols):
         coeff_scale=random_state.uniform(low=0.1, high=1.0))
     lhs = generate_lhs(
         random_state=random_state, variables=ncols, constraints=2,
-        **lhs_params).todense()
+        **lhs_params).toarray()
     return lhs[0]
 
 
@@ -39,8 +42,8 @@ def lhs_col(random_state, nrows):
         coeff_scale=random_state.uniform(low=0.1, high=1.0))
     lhs = generate_lhs(
         random_state=random_state, variables=2, constraints=nrows,
-        **lhs_params).todense()
-    return lhs.transpose()[0].transpose()
+        **lhs_params).toarray()
+    return lhs[:, 0]
 
 
 def lp_random_row(random_state, ncols):
@@ -72,9 +75,11 @@ def lp_column_neighbour(rstate, instance, n_replace):
     inds = rstate.choice(instance.variables, n_replace, replace=False)
     for ind in inds:
         a_i, c_i = lp_random_col(rstate, instance.constraints)
-        a[:, ind] = np.array([a_i]).transpose()
+        a[:, ind] = a_i
         c[ind] = c_i
-    return UnsolvedInstance(lhs=a, rhs=b, objective=c)
+    neighbour = UnsolvedInstance(lhs=a, rhs=b, objective=c)
+    neighbour.changed = dict(columns=inds)
+    return neighbour
 
 
 def lp_row_neighbour(rstate, instance, n_replace):
@@ -84,9 +89,11 @@ def lp_row_neighbour(rstate, instance, n_replace):
     inds = rstate.choice(instance.constraints, n_replace, replace=False)
     for ind in inds:
         a_j, b_j = lp_random_row(rstate, instance.variables)
-        a[ind, :] = np.array([a_j])
+        a[ind, :] = a_j
         b[ind] = b_j
-    return UnsolvedInstance(lhs=a, rhs=b, objective=c)
+    neighbour = UnsolvedInstance(lhs=a, rhs=b, objective=c)
+    neighbour.changed = dict(rows=inds)
+    return neighbour
 
 
 def solution_element(random_state):
@@ -140,7 +147,9 @@ def encoded_column_neighbour(rstate, instance, n_replace):
         x[ind] = x_i
         r[ind] = r_i
     basis = np.zeros(instance.variables + instance.constraints)
-    return SolvedInstance(lhs=a, solution=Solution(x=x, y=y, r=r, s=s, basis=basis))
+    neighbour = SolvedInstance(lhs=a, solution=Solution(x=x, y=y, r=r, s=s, basis=basis))
+    neighbour.changed = dict(columns=inds)
+    return neighbour
 
 
 def encoded_row_neighbour(rstate, instance, n_replace):
@@ -154,8 +163,10 @@ def encoded_row_neighbour(rstate, instance, n_replace):
     inds = rstate.choice(instance.constraints, n_replace, replace=False)
     for ind in inds:
         a_j, y_j, s_j = sp_random_col(rstate, instance.variables)
-        a[ind, :] = a_j.transpose()
+        a[ind, :] = a_j
         y[ind] = y_j
         s[ind] = s_j
     basis = np.zeros(instance.variables + instance.constraints)
-    return SolvedInstance(lhs=a, solution=Solution(x=x, y=y, r=r, s=s, basis=basis))
+    neighbour = SolvedInstance(lhs=a, solution=Solution(x=x, y=y, r=r, s=s, basis=basis))
+    neighbour.changed = dict(rows=inds)
+    return neighbour
@@ -1,27 +1,76 @@
 
 import functools
-import json
+import os
 
 import click
 
-from lp_generators.utils import system_random_seeds
+from lp_generators.utils import (
+    system_random_seeds, spawn_seeds, read_seed_file, write_seed_file, LEGACY_RANDOM_ENV)
+from lp_generators.timing import TIMING_ENV
+from lp_generators.metrics import MetricsExporter, observe_instance, REGISTRY
 
 
 def cli_seeds(func):
     ''' Wrap a function taking a list of seed values with a cli command.
     Resulting cli command accepts either a JSON seed file or a count of
-    system random seeds to generate. '''
+    system random seeds to generate. With --legacy-random, workers use
+    RandomState instead of Generator streams, reproducing results for seeds
+    used before Generator support. Seed files record their stream type
+    (see utils.read_seed_file); older files of 32 bit seeds use legacy
+    streams. --save-seeds writes the seeds used, with their stream type,
+    to a new seed file. With --timing, per-stage timings are
+    recorded in the results and summarised per worker. With --metrics-prom
+    and/or --metrics-jsonl, metrics are exported periodically while the
+    command runs (timing is enabled to give stage latencies). '''
 
     @click.command()
     @click.option('--system-seeds', default=100, type=int, help='Number of system random seeds')
     @click.option('--seed-file', default=None, type=click.Path(exists=True), help='JSON seed file')
+    @click.option('--legacy-random', is_flag=True, help='Use legacy RandomState streams')
+    @click.option('--save-seeds', default=None, type=click.Path(), help='JSON seed file to write')
+    @click.option('--timing', is_flag=True, help='Record time spent per stage')
+    @click.option('--metrics-prom', default=None, help='Prometheus textfile to export metrics to')
+    @click.option('--metrics-jsonl', default=None, help='JSONL file to append metrics to')
+    @click.option('--metrics-interval', default=15.0, type=float, help='Seconds between exports')
     @functools.wraps(func)
-    def cli_seeds_fn(system_seeds, seed_file, **kwargs):
+    def cli_seeds_fn(system_seeds, seed_file, legacy_random, save_seeds, timing,
+                     metrics_prom, metrics_jsonl, metrics_interval, **kwargs):
+        export_metrics = metrics_prom is not None or metrics_jsonl is not None
         if seed_file:
-            with open(seed_file) as infile:
-                seed_values = json.load(infile)
-        else:
+            seed_values, file_legacy = read_seed_file(seed_file)
+            legacy_random = legacy_random or file_legacy
+        elif legacy_random:
             seed_values = list(system_random_seeds(n=system_seeds, bits=32))
-        func(seed_values, **kwargs)
+        else:
+            seed_values = spawn_seeds(system_seeds)
+        if save_seeds:
+            write_seed_file(save_seeds, seed_values, legacy_random)
+        # Set before pools are created so worker processes inherit them.
+        if legacy_random:
+            os.environ[LEGACY_RANDOM_ENV] = '1'
+        if timing or export_metrics:
+            os.environ[TIMING_ENV] = '1'
+        if not export_metrics:
+            func(seed_values, **kwargs)
+            return
+        exporter = MetricsExporter(
+            prometheus_path=metrics_prom, jsonl_path=metrics_jsonl, interval=metrics_interval)
+        with exporter:
+            func(seed_values, **kwargs)
 
     return cli_seeds_fn
+
+
+def observe_search(results, metrics=None):
+    ''' Record a completed search from the result rows returned by the
+    scripts' generate_by_search functions. Rows are recorded every 100
+    steps with cumulative counts of steps passing the condition and
+    improving steps, and timings since the previous row. '''
+    metrics = metrics or REGISTRY
+    last = results[-1]
+    metrics.inc('searches')
+    metrics.inc('search_steps', last['step_change'], update='improved')
+    metrics.inc('search_steps', last['pass_condition'] - last['step_change'], update='reject_poor')
+    metrics.inc('search_steps', last['step'] - last['pass_condition'], update='reject_condition')
+    for row in results:
+        observe_instance(row, metrics)
@@ -16,7 +16,7 @@ requirements = pkgconfig.parse('osi-clp')
 requirements['include_dirs'].append(np.get_include())
 
 package_requires = [
-    'numpy',
+    'numpy>=1.25',
     'scipy',
     ]
 
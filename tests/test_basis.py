@@ -0,0 +1,128 @@
+
+import numpy as np
+import scipy.sparse as sparsemat
+import pytest
+
+import functools
+
+from lp_generators.basis import BasisFactor, ParentBasis, reuse_basis_steps, reuse_solution_features
+from lp_generators.instance import UnsolvedInstance
+from lp_generators.features import solve_relaxation, solution_features
+from lp_generators.search import local_search
+from lp_generators.utils import random_generator
+import lp_generators.neighbours_unsolved as neighbours_unsolved
+from .testing import random_encoded, assert_approx_equal
+
+
+def unsolved(encoded, rhs=None, objective=None):
+    return UnsolvedInstance(
+        lhs=encoded.lhs(),
+        rhs=encoded.rhs() if rhs is None else rhs,
+        objective=encoded.objective() if objective is None else objective)
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_same_data_optimal(sparse):
+    np.random.seed(7)
+    encoded = random_encoded(8, 5)
+    lhs = sparsemat.csr_matrix(encoded.lhs()) if sparse else encoded.lhs()
+    factor = BasisFactor(lhs, encoded.beta())
+    status, solution = factor.check(encoded.rhs(), encoded.objective())
+    assert status == 'optimal'
+    expected = encoded.solution()
+    assert_approx_equal(solution.x, expected.x)
+    assert_approx_equal(solution.s, expected.s)
+    assert_approx_equal(solution.y, expected.y)
+    assert_approx_equal(solution.r, expected.r)
+    assert np.all(solution.basis == expected.basis)
+
+
+def test_matches_solver():
+    np.random.seed(8)
+    encoded = random_encoded(8, 5)
+    factor = BasisFactor(encoded.lhs(), encoded.beta())
+    random_state = np.random.RandomState(8)
+    statuses = set()
+    for _ in range(100):
+        rhs = encoded.rhs() * random_state.lognormal(sigma=0.5, size=5)
+        objective = encoded.objective() + random_state.normal(scale=0.3, size=8)
+        for instance in [unsolved(encoded, rhs=rhs), unsolved(encoded, objective=objective)]:
+            status, solution = factor.check_instance(instance)
+            statuses.add(status)
+            solved = solve_relaxation(instance)
+            if status == 'optimal':
+                assert np.isclose(
+                    solution.x @ instance.objective(), solved.x @ instance.objective())
+            elif status in ('infeasible', 'unbounded'):
+                assert solved is None
+    assert 'optimal' in statuses and 'unknown' in statuses
+
+
+def test_infeasible():
+    # max x1 + x2 st x1 + x2 <= b, with x1 basic
+    factor = BasisFactor(np.array([[1.0, 1.0]]), [1, 0, 0])
+    assert factor.check([2.0], [1.0, 1.0])[0] == 'optimal'
+    assert factor.check([-1.0], [1.0, 1.0]) == ('infeasible', None)
+
+
+def test_unbounded():
+    # max x1 + c2 x2 st x1 - x2 <= 1, with x1 basic
+    factor = BasisFactor(np.array([[1.0, -1.0]]), [1, 0, 0])
+    status, solution = factor.check([1.0], [1.0, -2.0])
+    assert status == 'optimal'
+    assert_approx_equal(solution.x, np.array([1.0, 0.0]))
+    assert_approx_equal(solution.r, np.array([0.0, 1.0]))
+    assert factor.check([1.0], [1.0, 2.0]) == ('unbounded', None)
+
+
+def test_reuse_solution_features():
+    np.random.seed(9)
+    encoded = random_encoded(8, 5)
+    parent = unsolved(encoded)
+    factor = BasisFactor.from_instance(parent, encoded.solution())
+    features = reuse_solution_features(parent, factor)
+    assert features['basis_check'] == 'optimal' and features['solvable'] is True
+    infeasible = unsolved(encoded, rhs=-np.abs(encoded.rhs()) - 1)
+    factor = BasisFactor(np.abs(encoded.lhs()), encoded.beta())
+    features = reuse_solution_features(
+        UnsolvedInstance(lhs=np.abs(encoded.lhs()), rhs=infeasible.rhs(), objective=encoded.objective()),
+        factor)
+    assert features['solvable'] is False
+    assert features['basis_check'] in ('infeasible', 'unknown')
+
+
+def test_parent_basis_search():
+    np.random.seed(10)
+    encoded = random_encoded(8, 5)
+    operators = [
+        functools.partial(neighbours_unsolved.scale_rhs_entry, count=1, mean=0, sigma=0.3),
+        functools.partial(neighbours_unsolved.scale_obj_entry, count=1, mean=0, sigma=0.3),
+        functools.partial(neighbours_unsolved.scale_lhs_entry, count=1, mean=0, sigma=0.3),
+        ]
+
+    def neighbour(instance, random_state):
+        return operators[random_state.integers(3)](instance, random_state)
+
+    parent_basis = ParentBasis()
+    checked = []
+
+    def objective(instance):
+        features = parent_basis.features(instance)
+        expected = solution_features(instance)
+        assert features['solvable'] == expected['solvable']
+        if expected['solvable']:
+            assert features['total_fractionality'] == pytest.approx(expected['total_fractionality'])
+        checked.append(features['basis_check'])
+        return instance.rhs().sum() + instance.objective().sum()
+
+    search = reuse_basis_steps(parent_basis)(local_search)
+    steps = list(search(
+        objective=objective, sense='max', neighbour=neighbour,
+        start_instance=unsolved(encoded), steps=60, random_state=random_generator(10)))
+    assert sum(step_info['search_update'] == 'improved' for step_info, _ in steps) > 2
+    # lhs neighbours and the start instance are solved, others are checked
+    assert checked[0] == 'unchecked' and 'optimal' in checked
+    assert parent_basis.reused == checked.count('optimal') > 0
+    assert parent_basis.checks == len(checked) - checked.count('unchecked')
+    assert np.all(parent_basis.factor.basis == solve_relaxation(steps[-1][1]).basis)
+    assert parent_basis._solved == {}
@@ -0,0 +1,92 @@
+
+import numpy as np
+import pytest
+
+from lp_generators.batch import InstanceBatch, EncodedView, save_batch, load_batch
+from lp_generators.features import coeff_features
+from lp_generators.writers import write_tar_encoded, read_tar_encoded
+from lp_generators.utils import temp_file_path
+from .testing import random_encoded, assert_approx_equal
+
+
+@pytest.fixture
+def instances():
+    return [random_encoded(6, 4) for _ in range(5)]
+
+
+@pytest.fixture
+def batch(instances):
+    return InstanceBatch.from_instances(instances)
+
+
+def test_shape(batch):
+    assert len(batch) == 5
+    assert batch.variables == 6
+    assert batch.constraints == 4
+    assert batch.lhs().shape == (5, 4, 6)
+    assert batch.alpha().shape == (5, 10)
+
+
+def test_views(batch, instances):
+    for view, instance in zip(batch, instances):
+        assert isinstance(view, EncodedView)
+        assert np.shares_memory(view.lhs(), batch.lhs())
+        assert_approx_equal(view.rhs(), instance.rhs())
+        assert_approx_equal(view.objective(), instance.objective())
+    assert_approx_equal(batch[-1].alpha(), instances[-1].alpha())
+    assert len(batch[1:3]) == 2
+
+
+def test_construct(batch, instances):
+    rhs, objective = batch.rhs(), batch.objective()
+    assert rhs.shape == (5, 4)
+    assert objective.shape == (5, 6)
+    for index, instance in enumerate(instances):
+        assert_approx_equal(rhs[index], instance.rhs())
+        assert_approx_equal(objective[index], instance.objective())
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load(batch, mmap):
+    with temp_file_path('.batch') as file_path:
+        save_batch(batch, file_path)
+        loaded = load_batch(file_path, mmap=mmap)
+        assert_approx_equal(loaded.lhs(), batch.lhs())
+        assert_approx_equal(loaded.alpha(), batch.alpha())
+        assert_approx_equal(loaded.beta(), batch.beta())
+        assert_approx_equal(loaded[2].rhs(), batch[2].rhs())
+        del loaded
+
+
+def test_tar(batch):
+    with temp_file_path() as file_path:
+        write_tar_encoded(batch, file_path)
+        loaded = read_tar_encoded(file_path)
+    assert isinstance(loaded, InstanceBatch)
+    assert_approx_equal(loaded.lhs(), batch.lhs())
+
+
+def test_coeff_features(batch, instances):
+    batch_features = coeff_features(batch)
+    for features, instance in zip(batch_features, instances):
+        expected = coeff_features(instance)
+        assert features.keys() == expected.keys()
+        for key in expected:
+            assert abs(features[key] - expected[key]) < 10 ** -10
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_compact(batch, mmap):
+    compact = batch.astype()
+    assert compact.lhs().dtype == np.float32
+    assert compact.beta().dtype == np.bool_
+    assert compact.nbytes < batch.nbytes / 2
+    assert np.allclose(compact.rhs(), batch.rhs(), atol=1e-5)
+    assert np.allclose(compact[1].objective(), batch[1].objective(), atol=1e-5)
+    with temp_file_path('.batch') as file_path:
+        save_batch(compact, file_path)
+        loaded = load_batch(file_path, mmap=mmap)
+        assert loaded.beta().dtype == np.bool_
+        assert np.all(loaded.beta() == compact.beta())
+        assert np.all(loaded.lhs() == compact.lhs())
+        del loaded
@@ -1,8 +1,10 @@
 
 import pytest
 import numpy as np
+import scipy.sparse as sparsemat
 
-from lp_generators.instance import EncodedInstance, Solution, SolvedInstance, UnsolvedInstance
+from lp_generators.instance import (
+    EncodedInstance, Solution, SolvedInstance, UnsolvedInstance, construct_batch)
 from .testing import assert_approx_equal
 
 
@@ -18,7 +20,7 @@ def constraints():
 
 @pytest.fixture
 def lhs_matrix():
-    return np.matrix([
+    return np.array([
         [ 0.42,  0.61,  0.06,  0.01,  0.49],
         [ 0.74,  0.12,  0.57,  0.23,  0.23],
         [ 0.78,  0.92,  0.67,  0.32,  0.64],
@@ -97,3 +99,41 @@ def test_rhs(instance, rhs_vector):
 
 def test_objective(instance, objective_vector):
     assert_approx_equal(instance.objective(), objective_vector)
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_construct_batch(lhs_matrix, alpha_vector, beta_vector, rhs_vector, objective_vector, sparse):
+    lhs = sparsemat.csr_matrix(lhs_matrix) if sparse else lhs_matrix
+    alpha = np.stack([alpha_vector, 2 * alpha_vector, np.zeros(9)])
+    beta = np.stack([beta_vector] * 3)
+    rhs, objective = construct_batch(lhs, alpha, beta)
+    assert type(rhs) is np.ndarray and rhs.shape == (3, 4)
+    assert type(objective) is np.ndarray and objective.shape == (3, 5)
+    assert_approx_equal(rhs[0], rhs_vector)
+    assert_approx_equal(objective[0], objective_vector)
+    assert_approx_equal(rhs[1], 2 * rhs_vector)
+    assert_approx_equal(objective[1], 2 * objective_vector)
+    assert_approx_equal(rhs[2], 0)
+    assert_approx_equal(objective[2], 0)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_lhs_storage(lhs_matrix, alpha_vector, beta_vector, dtype):
+    instance = EncodedInstance(lhs=lhs_matrix, alpha=alpha_vector, beta=beta_vector, dtype=dtype)
+    lhs = instance.lhs()
+    assert type(lhs) is np.ndarray
+    assert lhs.dtype == dtype and lhs.flags['C_CONTIGUOUS']
+    assert type(instance.lhs_matrix()) is np.matrix
+    assert instance.lhs_matrix().shape == (4, 5)
+
+
+def test_compact_instance(lhs_matrix, alpha_vector, beta_vector, solution, rhs_vector):
+    instance = EncodedInstance(lhs=lhs_matrix, alpha=alpha_vector, beta=beta_vector).astype()
+    assert instance.beta().dtype == np.bool_
+    assert instance.alpha().dtype == np.float32
+    result = instance.solution()
+    assert np.allclose(result.x, solution.x)
+    assert np.allclose(result.r, solution.r)
+    assert np.allclose(result.y, solution.y)
+    assert np.allclose(result.s, solution.s)
+    assert np.allclose(instance.rhs(), rhs_vector, atol=1e-6)
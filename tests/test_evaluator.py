@@ -0,0 +1,119 @@
+
+import sys
+import time
+import asyncio
+
+import pytest
+
+from lp_generators.evaluator import run_solver, evaluate_async, evaluate
+from lp_generators.performance import (
+    parse_clp_output, parse_scip_strongbranch_output, clp_command, scip_strongbranch_command,
+    clp_cutoff_limits, clp_cutoff_result)
+from .testing import random_encoded
+
+
+CLP_OUTPUT = '''
+Presolve 3 (0) rows, 5 (0) columns and 15 (0) elements
+Optimal objective 12.5 - 7 iterations time 0.012
+'''
+
+SCIP_OUTPUT = '''
+  strong branching :       0.05         12        340       0.00
+'''
+
+
+def test_parse_clp_output():
+    assert parse_clp_output(CLP_OUTPUT) == dict(objective=12.5, iterations=7, time=0.012)
+    assert parse_clp_output('Problem is infeasible')['iterations'] == -1
+
+
+def test_parse_scip_output():
+    result = parse_scip_strongbranch_output(SCIP_OUTPUT)
+    assert result == dict(time=0.05, calls=12, iterations=340, percall=0.0)
+    result = parse_scip_strongbranch_output(
+        'SCIP Status        : solving was interrupted [time limit reached]' + SCIP_OUTPUT)
+    assert result['stopped'] == 'time'
+
+
+def test_solver_limits():
+    assert clp_command('a.mps', 'dualsimplex') == ['clp', 'a.mps', '-dualsimplex']
+    assert clp_command('a.mps', 'dualsimplex', max_iterations=10.0, max_seconds=2) == [
+        'clp', 'a.mps', '-maxIterations', '10', '-seconds', '2.0', '-dualsimplex']
+    command = scip_strongbranch_command('a.mps', time_limit=5)
+    assert command[command.index('set limits time 5.0') - 1] == '-c'
+    assert command.index('set limits time 5.0') < command.index('opt')
+
+
+def test_cutoff_result():
+    assert clp_cutoff_limits('iterations', None) == dict()
+    assert clp_cutoff_limits('iterations', 10.5) == dict(max_iterations=11)
+    assert clp_cutoff_limits('time', 0.5) == dict(max_seconds=0.5)
+    stopped = parse_clp_output('Stopped on iterations - objective value 1.5')
+    assert stopped['stopped'] == 'iterations'
+    assert clp_cutoff_result(stopped, 'iterations') is None
+    assert clp_cutoff_result(parse_clp_output(CLP_OUTPUT), 'iterations') == 7
+    assert clp_cutoff_result(parse_clp_output(CLP_OUTPUT), 'time') == 0.012
+
+
+async def echo_size(instance, semaphore):
+    ''' Evaluator running a python subprocess which reports the size. '''
+    output = await run_solver([
+        sys.executable, '-c',
+        'print({})'.format(instance.variables * instance.constraints)], semaphore)
+    return dict(size=int(output))
+
+
+async def delayed_fail(instance, semaphore):
+    raise ValueError('evaluation failed')
+
+
+def instances(count):
+    for index in range(count):
+        instance = random_encoded(index + 1, 2)
+        instance.data = dict(index=index)
+        yield instance
+
+
+def test_evaluate_async():
+    async def collect():
+        return [
+            instance async for instance in evaluate_async(
+                instances(6), evaluators=[echo_size], concurrency=2)]
+    result = asyncio.run(collect())
+    assert sorted(instance.data['index'] for instance in result) == list(range(6))
+    assert all(instance.data['size'] == 2 * (instance.data['index'] + 1) for instance in result)
+
+
+def test_evaluate_async_yields_before_slow_input():
+    def slow_instances():
+        yield from instances(1)
+        time.sleep(2)
+        yield from instances(1)
+
+    async def first():
+        start = time.perf_counter()
+        generator = evaluate_async(slow_instances(), evaluators=[echo_size], concurrency=2)
+        instance = await generator.__anext__()
+        elapsed = time.perf_counter() - start
+        await generator.aclose()
+        return instance, elapsed
+
+    instance, elapsed = asyncio.run(first())
+    assert instance.data['size'] == 2
+    assert elapsed < 1.5
+
+
+def test_evaluate():
+    result = list(evaluate(instances(5), evaluators=[echo_size], concurrency=3, max_pending=2))
+    assert sorted(instance.data['size'] for instance in result) == [2, 4, 6, 8, 10]
+
+
+def test_evaluate_early_stop():
+    generator = evaluate(instances(20), evaluators=[echo_size], concurrency=2)
+    assert 'size' in next(generator).data
+    generator.close()
+
+
+def test_evaluate_error():
+    with pytest.raises(ValueError):
+        list(evaluate(instances(3), evaluators=[delayed_fail]))
@@ -1,16 +1,18 @@
 
 import pytest
 import numpy as np
+import scipy.sparse as sparsemat
 
 import lp_generators.features as features
-from lp_generators.instance import UnsolvedInstance
+from lp_generators.instance import UnsolvedInstance, SparseUnsolvedInstance, Solution
+from .testing import random_encoded
 
 #TODO test serialisable
 
 @pytest.fixture
 def unsolved_instance():
     return UnsolvedInstance(
-        lhs=np.matrix([
+        lhs=np.array([
             [ 0.42,  0.61,  0.06,  0.01,  0.49],
             [ 0.74,  0.12,  0.57,  0,     0.23],
             [ 0.78,  0.92,  0,     0.32,  0.64],
@@ -41,3 +43,136 @@ def test_degree_seq(unsolved_instance):
     var_degree, cons_degree = features.degree_seq(unsolved_instance.lhs())
     assert np.all(var_degree == [4, 4, 3, 3, 4])
     assert np.all(cons_degree == [5, 4, 4, 5])
+
+
+def test_coeff_feature_array(unsolved_instance):
+    instances = [unsolved_instance, random_encoded(5, 4), random_encoded(3, 6)]
+    result = features.coeff_feature_array(instances)
+    assert result.shape == (3, )
+    for record, instance in zip(result, instances):
+        assert record['variables'] == instance.variables
+        assert record['nonzeros'] == np.sum(np.asarray(instance.lhs()) != 0)
+        assert abs(record['lhs_std'] - np.asarray(instance.lhs())[np.asarray(instance.lhs()) != 0].std()) < 10 ** -10
+        assert abs(record['obj_mean'] - instance.objective().mean()) < 10 ** -10
+
+
+def test_sparse_coeff_features(unsolved_instance):
+    sparse_instance = SparseUnsolvedInstance(
+        lhs=sparsemat.csr_matrix(np.asarray(unsolved_instance.lhs())),
+        rhs=unsolved_instance.rhs(), objective=unsolved_instance.objective())
+    expected = features.coeff_features(unsolved_instance)
+    result = features.coeff_features(sparse_instance)
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert abs(result[key] - expected[key]) < 10 ** -10
+    var_degree, cons_degree = features.degree_seq(sparse_instance.lhs())
+    assert np.all(var_degree == [4, 4, 3, 3, 4])
+    assert np.all(cons_degree == [5, 4, 4, 5])
+
+
+def test_degree_seq_sparse_not_modified():
+    lhs = sparsemat.csr_matrix((np.array([1.0, 0.0]), np.array([0, 1]), np.array([0, 2])), shape=(1, 2))
+    var_degree, cons_degree = features.degree_seq(lhs)
+    assert lhs.nnz == 2
+    assert np.all(var_degree == [1, 0]) and np.all(cons_degree == [1])
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_lhs_std_offset(sparse):
+    random_state = np.random.RandomState(3)
+    lhs = 1e8 + random_state.random_sample((20, 30))
+    lhs[random_state.random_sample((20, 30)) < 0.3] = 0
+    expected = lhs[lhs != 0].std()
+    instance = UnsolvedInstance(lhs=lhs, rhs=np.ones(20), objective=np.ones(30))
+    if sparse:
+        instance = SparseUnsolvedInstance(
+            lhs=sparsemat.csr_matrix(lhs), rhs=np.ones(20), objective=np.ones(30))
+    result = features.coeff_features(instance)
+    assert abs(result['lhs_std'] - expected) < 1e-6 * expected
+
+
+@pytest.fixture
+def solved_data():
+    lhs = np.array([
+        [ 0.42,  0.61,  0.06,  0.01,  0.49],
+        [ 0.74,  0.12,  0.57,  0.23,  0.23],
+        [ 0.78,  0.92,  0.67,  0.32,  0.64],
+        [ 0.02,  0.67,  0.2 ,  0.45,  0.39]])
+    objective = np.array([-0.6982,  0.3623, -0.479 ,  0.0235,  0.1651])
+    solution = Solution(
+        x=np.array([   0,  0.99,     0,  0.54,     0]),
+        r=np.array([0.93,     0,  0.52,     0,  0.12]),
+        y=np.array([0.55,     0,     0,  0.04]),
+        s=np.array([   0,  0.44,  0.13,     0]),
+        basis=np.array([0, 1, 0, 1, 0, 0, 1, 1, 0]))
+    return lhs, objective, solution
+
+
+def test_solution_statistics(solved_data):
+    lhs, objective, solution = solved_data
+    result = features.solution_statistics(lhs, objective, solution)
+    assert result['binding_constraints'] == 2
+    assert result['fractional_primal'] == 2
+    assert abs(result['objective_value'] - (0.99 * 0.3623 + 0.54 * 0.0235)) < 10 ** -10
+    assert result['basis_primal_count'] == 2
+    assert result['basis_slack_count'] == 2
+    assert result['primal_degenerate'] == 0
+    assert result['dual_degenerate'] == 0
+    basis_matrix = np.column_stack([lhs[:, 1], lhs[:, 3], np.eye(4)[:, 1], np.eye(4)[:, 2]])
+    assert abs(result['basis_condition'] - np.linalg.cond(basis_matrix, 1)) < 10 ** -8
+    assert abs(result['dual_max'] - 0.55) < 10 ** -10
+    assert result['reduced_cost_nonzero'] == 3
+    assert len(result) >= 30
+
+
+def test_solution_statistics_stacked(solved_data):
+    lhs, objective, solution = solved_data
+    stacked = Solution(*(np.stack([value, value]) for value in solution))
+    result = features.solution_statistics(
+        np.stack([lhs, lhs]), np.stack([objective, objective]), stacked)
+    single = features.solution_statistics(lhs, objective, solution)
+    for key, value in single.items():
+        assert np.allclose(result[key], [value, value])
+
+
+def test_extended_solution_features(unsolved_instance):
+    result = features.extended_solution_features(unsolved_instance)
+    assert result['solvable'] is True
+    base = features.solution_features(unsolved_instance)
+    for key in base:
+        assert result[key] == base[key]
+
+
+@pytest.mark.parametrize('options', [
+    dict(algorithm='primal'),
+    dict(algorithm='barrier', presolve=True),
+    dict(scaling='off', primal_tolerance=1e-9, dual_tolerance=1e-9)])
+def test_solution_features_options(unsolved_instance, options):
+    base = features.solution_features(unsolved_instance)
+    result = features.solution_features(unsolved_instance, **options)
+    assert result.keys() == base.keys()
+    for key in base:
+        assert np.isclose(result[key], base[key])
+
+
+def test_extended_solution_features_options(unsolved_instance):
+    base = features.extended_solution_features(unsolved_instance)
+    result = features.extended_solution_features(
+        unsolved_instance, algorithm='primal', scaling='off')
+    assert result.keys() == base.keys()
+    for key in base:
+        assert np.isclose(result[key], base[key])
+    stopped = features.extended_solution_features(unsolved_instance, max_iterations=0)
+    assert stopped == dict(solvable=False)
+
+
+def test_extended_solution_features_sparse(unsolved_instance):
+    sparse = SparseUnsolvedInstance(
+        lhs=sparsemat.csr_matrix(unsolved_instance.lhs()),
+        rhs=unsolved_instance.rhs(), objective=unsolved_instance.objective())
+    result = features.extended_solution_features(sparse)
+    expected = features.extended_solution_features(unsolved_instance)
+    assert result['solvable'] is True
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert np.isclose(result[key], expected[key])
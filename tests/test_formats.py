@@ -0,0 +1,195 @@
+
+import io
+import gzip
+
+import numpy as np
+import scipy.sparse as sparsemat
+import pytest
+
+from lp_generators.instance import UnsolvedInstance, SparseUnsolvedInstance
+from lp_generators.formats import (
+    dump_mps, dump_lp, compressed_columns, parse_mps, canonical_form)
+from lp_generators.writers import write_mps_stream, read_mps
+from lp_generators.utils import ParallelGzipWriter, temp_file_path
+from .testing import assert_approx_equal
+
+
+@pytest.fixture
+def instance():
+    return UnsolvedInstance(
+        lhs=np.array([[1.0, 0.0, 2.5], [0.0, -1.0, 0.0]]),
+        rhs=np.array([4.0, 0.0]),
+        objective=np.array([1.0, -2.0, 0.0]))
+
+
+def test_compressed_columns_dense_sparse(instance):
+    dense = compressed_columns(np.asarray(instance.lhs()))
+    sparse = compressed_columns(sparsemat.csr_matrix(np.asarray(instance.lhs())))
+    for a, b in zip(dense, sparse):
+        assert np.all(np.asarray(a) == np.asarray(b))
+    indptr, rows, values = dense
+    assert list(indptr) == [0, 1, 2, 3]
+    assert list(rows) == [0, 1, 0]
+    assert list(values) == [1.0, -1.0, 2.5]
+
+
+def test_dump_mps(instance):
+    outfile = io.BytesIO()
+    dump_mps(instance, outfile)
+    lines = outfile.getvalue().decode('ascii').splitlines()
+    assert lines[0].startswith('NAME')
+    assert lines[1:4] == ['ROWS', ' N OBJ', ' L R0']
+    assert ' C0 OBJ -1.0' in lines
+    assert ' C1 OBJ 2.0' in lines
+    assert ' C0 R0 1.0' in lines
+    assert ' C2 R0 2.5' in lines
+    assert ' C1 R1 -1.0' in lines
+    assert ' RHS R0 4.0' in lines
+    assert ' RHS R1 0.0' not in lines
+    assert 'MARKER' not in outfile.getvalue().decode('ascii')
+    assert lines[-1] == 'ENDATA'
+
+
+def test_dump_mps_ip(instance):
+    outfile = io.BytesIO()
+    dump_mps(instance, outfile, integer=True)
+    text = outfile.getvalue().decode('ascii')
+    lines = text.splitlines()
+    # Readers (SCIP, CoinMpsIO) only recognise the quoted marker form.
+    markers = [line.split() for line in lines if 'MARKER' in line]
+    assert markers == [
+        ['MARKER', "'MARKER'", "'INTORG'"],
+        ['MARKER', "'MARKER'", "'INTEND'"]]
+    start, end = lines.index('COLUMNS'), lines.index('RHS')
+    assert lines[start + 1].split()[2] == "'INTORG'"
+    assert lines[end - 1].split()[2] == "'INTEND'"
+    assert ' PL BND C2' in lines
+    parsed = parse_mps(io.StringIO(text))
+    assert list(parsed.integer) == [1, 1, 1]
+    assert parsed.col_names == ['C0', 'C1', 'C2']
+
+
+class RecordingFile(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def write(self, data):
+        self.sizes.append(len(data))
+        return super().write(data)
+
+
+def test_dump_mps_chunked(monkeypatch):
+    # columns are formatted and written a chunk at a time
+    monkeypatch.setattr('lp_generators.formats.CHUNK_ENTRIES', 16)
+    lhs = sparsemat.random(20, 50, density=0.3, format='csr', random_state=3)
+    instance = SparseUnsolvedInstance(lhs=lhs, rhs=np.ones(20), objective=np.ones(50))
+    outfile = RecordingFile()
+    dump_mps(instance, outfile)
+    assert max(outfile.sizes) < 2000
+    model = parse_mps(io.StringIO(outfile.getvalue().decode('ascii')))
+    dense = np.zeros((20, 50))
+    dense[model.entry_rows, model.entry_cols] = model.entry_values
+    assert_approx_equal(dense, lhs.toarray())
+
+
+def test_dump_lp(instance):
+    outfile = io.BytesIO()
+    dump_lp(instance, outfile, integer=True)
+    lines = outfile.getvalue().decode('ascii').splitlines()
+    assert lines[:2] == ['Maximize', ' obj: + 1.0 C0 - 2.0 C1']
+    assert ' R0: + 1.0 C0 + 2.5 C2 <= 4.0' in lines
+    assert ' R1: - 1.0 C1 <= 0.0' in lines
+    assert lines[-3:] == ['General', ' C0 C1 C2', 'End']
+
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_parallel_gzip(threads):
+    data = np.random.bytes(10000) * 50
+    outfile = io.BytesIO()
+    with ParallelGzipWriter(outfile, threads=threads, block_size=4096) as writer:
+        for start in range(0, len(data), 1000):
+            writer.write(data[start:start + 1000])
+    assert gzip.decompress(outfile.getvalue()) == data
+
+
+def _parse(text):
+    return parse_mps(io.StringIO(text))
+
+
+def test_read_mps_roundtrip(instance):
+    with temp_file_path('.mps.gz') as file_path:
+        write_mps_stream(instance, file_path)
+        read_instance = read_mps(file_path)
+    assert isinstance(read_instance, UnsolvedInstance)
+    assert_approx_equal(read_instance.lhs(), instance.lhs())
+    assert_approx_equal(read_instance.rhs(), instance.rhs())
+    assert_approx_equal(read_instance.objective(), instance.objective())
+
+
+def test_read_mps_sparse(instance):
+    with temp_file_path('.mps') as file_path:
+        write_mps_stream(instance, file_path)
+        read_instance = read_mps(file_path, sparse=True)
+    assert isinstance(read_instance, SparseUnsolvedInstance)
+    assert sparsemat.issparse(read_instance.lhs())
+    assert_approx_equal(read_instance.lhs().toarray(), instance.lhs())
+
+
+GENERAL_MPS = '''NAME          TESTLP
+ROWS
+ N  COST
+ L  LIM1
+ G  LIM2
+ E  MYEQN
+ L  RNG
+COLUMNS
+    X1        COST         1.0   LIM1         1.0
+    X1        LIM2         1.0
+    X2        COST         2.0   LIM1         1.0
+    X2        MYEQN       -1.0
+    X3        COST        -1.0   MYEQN        1.0
+    X3        RNG          1.0
+RHS
+    RHS       COST        -3.0
+    RHS       LIM1         4.0   LIM2         1.0
+    RHS       MYEQN        7.0   RNG          9.0
+RANGES
+    RNG       RNG          2.0
+BOUNDS
+ UP BND       X1           4.0
+ LO BND       X2          -1.0
+ FR BND       X3
+ENDATA
+'''
+
+
+def test_parse_mps():
+    model = _parse(GENERAL_MPS)
+    assert model.name == 'TESTLP'
+    assert model.sense == 'min'
+    assert model.row_names == ['LIM1', 'LIM2', 'MYEQN', 'RNG']
+    assert list(model.objective) == [1.0, 2.0, -1.0]
+    assert model.objective_constant == 3.0
+    assert list(model.rhs) == [4.0, 1.0, 7.0, 9.0]
+    assert list(model.lower) == [0.0, -1.0, -np.inf]
+    assert list(model.upper) == [4.0, np.inf, np.inf]
+    assert len(model.entry_values) == 6
+
+
+def test_canonical_form():
+    ''' Canonical form must describe the same feasible set and objective
+    under the column substitution x1 = x1', x2 = x2' - 1, x3 = x3'+ - x3'-. '''
+    lhs, rhs, objective, info = canonical_form(_parse(GENERAL_MPS))
+    # LIM1, MYEQN, RNG upper; LIM2, MYEQN, RNG lower; X1 upper bound
+    assert lhs.shape == (7, 4)
+    assert info['objective_sense'] == 'min'
+    assert list(objective) == [-1.0, -2.0, 1.0, -1.0]
+    assert info['objective_constant'] == -1.0
+    # x1 = 1.5, x2 = 1, x3 = 8 is feasible with objective value -1.5
+    feasible = np.array([1.5, 2.0, 8.0, 0.0])
+    assert np.all(lhs @ feasible - rhs <= 10 ** -10)
+    assert objective @ feasible + info['objective_constant'] == 1.5
+    # x3 = 10 violates the range constraint
+    infeasible = np.array([1.5, 4.0, 10.0, 0.0])
+    assert not np.all(lhs @ infeasible - rhs <= 10 ** -10)
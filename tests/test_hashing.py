@@ -0,0 +1,89 @@
+
+import numpy as np
+import scipy.sparse as sparsemat
+
+from lp_generators.hashing import instance_hash, VisitedSet
+from lp_generators.instance import EncodedInstance, UnsolvedInstance, SparseUnsolvedInstance
+from lp_generators.search import local_search
+from .testing import random_encoded
+
+
+def test_encoded_hash():
+    np.random.seed(2)
+    instance = random_encoded(6, 4)
+    copy = EncodedInstance(
+        lhs=instance.lhs().copy(), alpha=instance.alpha().copy(), beta=instance.beta().copy())
+    assert instance_hash(instance) == instance_hash(copy)
+    assert len(instance_hash(instance)) == 16
+    beta = instance.beta().copy()
+    basic, nonbasic = np.flatnonzero(beta)[0], np.flatnonzero(beta == 0)[0]
+    beta[[basic, nonbasic]] = beta[[nonbasic, basic]]
+    changed = EncodedInstance(lhs=instance.lhs(), alpha=instance.alpha(), beta=beta)
+    assert instance_hash(changed) != instance_hash(instance)
+
+
+def test_unsolved_hash():
+    np.random.seed(2)
+    lhs = np.random.random((4, 6))
+    lhs[lhs < 0.5] = 0
+    rhs, objective = np.random.random(4), np.random.random(6)
+    first = UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    second = UnsolvedInstance(lhs=lhs.copy(), rhs=rhs.copy(), objective=objective.copy())
+    assert instance_hash(first) == instance_hash(second)
+    objective = objective.copy()
+    objective[2] += 1e-12
+    third = UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+    assert instance_hash(third) != instance_hash(first)
+
+
+def test_sparse_hash_canonical():
+    np.random.seed(2)
+    lhs = np.random.random((4, 6))
+    lhs[lhs < 0.5] = 0
+    rhs, objective = np.random.random(4), np.random.random(6)
+    csr = sparsemat.csr_matrix(lhs)
+    with_zero = sparsemat.coo_matrix(lhs)
+    with_zero = sparsemat.coo_matrix(
+        (np.append(with_zero.data, 0), (np.append(with_zero.row, 0), np.append(with_zero.col, 0))),
+        shape=lhs.shape)
+    first = SparseUnsolvedInstance(lhs=csr, rhs=rhs, objective=objective)
+    second = SparseUnsolvedInstance(lhs=with_zero.tocsc(), rhs=rhs, objective=objective)
+    assert instance_hash(first) == instance_hash(second)
+
+
+def test_visited_set_bounded():
+    visited = VisitedSet(capacity=2)
+    visited.add(b'a', 1.0)
+    visited.add(b'b', 2.0)
+    assert visited.get(b'a') == 1.0
+    visited.add(b'c', 3.0)
+    assert b'b' not in visited and b'a' in visited and len(visited) == 2
+    assert visited.get(b'b') is None
+    assert visited.hits == 1 and visited.lookups == 2
+    assert visited.hit_rate == 0.5
+
+
+def flip_first(instance, random_state):
+    ''' Neighbour which alternates between two instances. '''
+    beta = instance.beta().copy()
+    beta[0], beta[-1] = beta[-1], beta[0]
+    return EncodedInstance(lhs=instance.lhs(), alpha=instance.alpha(), beta=beta)
+
+
+def test_local_search_visited():
+    np.random.seed(5)
+    start = random_encoded(6, 4)
+    evaluations = []
+
+    def objective(instance):
+        evaluations.append(instance)
+        return instance.beta()[0]
+
+    visited = VisitedSet()
+    steps = list(local_search(
+        objective=objective, sense='max', neighbour=flip_first, start_instance=start,
+        steps=10, random_state=np.random.RandomState(0), visited=visited))
+    assert len(evaluations) == 2
+    assert [s['search_evaluated'] for s, _ in steps] == [1, 1] + [0] * 8
+    assert [s['search_visited_hits'] for s, _ in steps] == [0, 0] + [1] * 8
+    assert steps[-1][0]['search_visited_hit_rate'] == 0.8
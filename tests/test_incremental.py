@@ -0,0 +1,83 @@
+
+import numpy as np
+import pytest
+
+from lp_generators.instance import UnsolvedInstance
+from lp_generators.features import coeff_features
+from lp_generators.incremental import CoeffFeatureTracker
+
+
+def random_unsolved(variables, constraints):
+    lhs = np.random.random((constraints, variables))
+    lhs[lhs < 0.5] = 0
+    return UnsolvedInstance(
+        lhs=lhs,
+        rhs=np.random.random(constraints),
+        objective=np.random.random(variables))
+
+
+def assert_features_equal(result, expected):
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert abs(result[key] - expected[key]) < 10 ** -8, key
+
+
+def replace(instance, rows=(), columns=()):
+    lhs = np.array(instance.lhs())
+    rhs, objective = np.copy(instance.rhs()), np.copy(instance.objective())
+    for row in rows:
+        lhs[row, :] = np.random.random(lhs.shape[1]) * (np.random.random(lhs.shape[1]) > 0.7)
+        rhs[row] = np.random.random()
+    for column in columns:
+        lhs[:, column] = 0
+        objective[column] = np.random.random()
+    return UnsolvedInstance(lhs=lhs, rhs=rhs, objective=objective)
+
+
+def test_initial():
+    instance = random_unsolved(20, 15)
+    tracker = CoeffFeatureTracker.from_instance(instance)
+    assert_features_equal(tracker.features(), coeff_features(instance))
+
+
+@pytest.mark.parametrize('rows,columns', [
+    ([1, 4], None), (None, [0, 3, 7]), ([2], [2, 5]), (None, None)])
+def test_updated(rows, columns):
+    instance = random_unsolved(20, 15)
+    tracker = CoeffFeatureTracker.from_instance(instance)
+    new_instance = replace(instance, rows or (), columns or ())
+    new_tracker = tracker.updated(instance, new_instance, rows=rows, columns=columns)
+    assert_features_equal(new_tracker.features(), coeff_features(new_instance))
+    # original tracker is unchanged
+    assert_features_equal(tracker.features(), coeff_features(instance))
+
+
+def test_update_chain():
+    instance = random_unsolved(10, 10)
+    tracker = CoeffFeatureTracker.from_instance(instance)
+    for step in range(50):
+        rows = [step % 10]
+        new_instance = replace(instance, rows=rows, columns=[(3 * step) % 10])
+        tracker = tracker.updated(instance, new_instance, rows=rows, columns=[(3 * step) % 10])
+        instance = new_instance
+    assert_features_equal(tracker.features(), coeff_features(instance))
+
+
+def test_lhs_std_offset():
+    # large mean and small spread, where sumsq / count - mean ** 2 cancels
+    np.random.seed(5)
+    lhs = 1e8 + np.random.random((15, 20))
+    lhs[np.random.random(lhs.shape) < 0.3] = 0
+    instance = UnsolvedInstance(lhs=lhs, rhs=np.random.random(15), objective=np.random.random(20))
+    tracker = CoeffFeatureTracker.from_instance(instance)
+    for step in range(50):
+        rows = [step % 15]
+        new_lhs = np.array(instance.lhs())
+        new_lhs[rows[0], :] = (1e8 + np.random.random(20)) * (np.random.random(20) > 0.3)
+        new_instance = UnsolvedInstance(lhs=new_lhs, rhs=instance.rhs(), objective=instance.objective())
+        tracker = tracker.updated(instance, new_instance, rows=rows)
+        instance = new_instance
+    expected = coeff_features(instance)
+    assert expected['lhs_std'] == pytest.approx(np.std(lhs[lhs != 0]), rel=0.5)
+    assert tracker.features()['lhs_std'] == pytest.approx(expected['lhs_std'], rel=1e-6)
+    assert tracker.features()['lhs_mean'] == pytest.approx(expected['lhs_mean'], rel=1e-12)
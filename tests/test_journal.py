@@ -0,0 +1,138 @@
+
+import os
+import io
+import functools
+
+import numpy as np
+import scipy.sparse as sparsemat
+import pytest
+
+from lp_generators.journal import (
+    SearchJournal, journal_steps, read_journal, replay_journal, encode_diff, apply_diff, KIND_LP)
+from lp_generators.instance import UnsolvedInstance, SparseUnsolvedInstance
+from lp_generators.search import local_search
+from lp_generators.writers import write_tar_encoded
+from lp_generators.utils import temp_file_path, random_generator
+import lp_generators.neighbours_encoded as neighbours_encoded
+import lp_generators.neighbours_unsolved as neighbours_unsolved
+from .testing import random_encoded
+
+
+def neighbour(instance, random_state):
+    func = [
+        functools.partial(neighbours_encoded.exchange_basis, count=1),
+        functools.partial(neighbours_encoded.scale_optvalue, count=2, mean=0, sigma=1),
+        functools.partial(neighbours_encoded.scale_lhs_entry, count=2, mean=0, sigma=1),
+        ][random_state.integers(3)]
+    return func(instance, random_state)
+
+
+def run_search(file_name, start, neighbour, objective, random_state, steps=50):
+    search = journal_steps(file_name, random_state=random_state)(local_search)
+    return [
+        (step_info, instance) for step_info, instance in search(
+            objective=objective, sense='max', neighbour=neighbour,
+            start_instance=start, steps=steps, random_state=random_state)
+        if step_info['search_update'] == 'improved']
+
+
+def test_replay_encoded():
+    np.random.seed(6)
+    start = random_encoded(8, 5)
+    with temp_file_path('.journal') as file_name:
+        improved = run_search(
+            file_name, start, neighbour, lambda instance: instance.rhs().sum(),
+            random_generator(6))
+        records = list(read_journal(file_name))
+        assert len(improved) > 3 and len(records) == len(improved)
+        for (step_info, instance), (step, objective, replayed, state) in zip(improved, records):
+            assert step == step_info['search_step']
+            assert objective == step_info['search_objective']
+            assert np.all(replayed.lhs() == instance.lhs())
+            assert np.all(replayed.alpha() == instance.alpha())
+            assert np.all(replayed.beta() == instance.beta())
+        # diff records are much smaller than full instances
+        full = io.BytesIO()
+        write_tar_encoded(start, full)
+        assert os.path.getsize(file_name) < full.tell() + len(improved) * 1000
+        # a step before the next improvement replays the previous one
+        step, _, instance, _ = replay_journal(file_name, improved[3][0]['search_step'] - 1)
+        assert step == improved[2][0]['search_step']
+        assert np.all(instance.alpha() == improved[2][1].alpha())
+        assert replay_journal(file_name)[0] == improved[-1][0]['search_step']
+
+
+def test_random_state_resume():
+    np.random.seed(6)
+    random_state = random_generator(7)
+    with temp_file_path('.journal') as file_name:
+        with SearchJournal(file_name) as journal:
+            journal.write(0, 1.0, random_encoded(4, 3), random_state)
+            expected = random_state.random(5)
+        _, _, _, state = replay_journal(file_name, 0)
+        resumed = random_generator(0)
+        resumed.bit_generator.state = state
+        assert np.all(resumed.random(5) == expected)
+
+
+def test_replay_unsolved():
+    np.random.seed(6)
+    lhs = np.random.random((5, 8))
+    lhs[lhs < 0.5] = 0
+    start = UnsolvedInstance(lhs=lhs, rhs=np.random.random(5), objective=np.random.random(8))
+    operators = [
+        functools.partial(neighbours_unsolved.scale_rhs_entry, count=1, mean=0, sigma=1),
+        functools.partial(neighbours_unsolved.remove_lhs_entry, count=1),
+        functools.partial(neighbours_unsolved.add_lhs_entry, count=1, mean=0, sigma=1),
+        ]
+
+    def unsolved_neighbour(instance, random_state):
+        return operators[random_state.integers(3)](instance, random_state)
+
+    with temp_file_path('.journal') as file_name:
+        improved = run_search(
+            file_name, start, unsolved_neighbour, lambda instance: instance.rhs().sum(),
+            random_generator(8))
+        for (_, instance), (_, _, replayed, _) in zip(improved, read_journal(file_name)):
+            assert np.all(replayed.lhs() == instance.lhs())
+            assert np.all(replayed.rhs() == instance.rhs())
+            assert np.all(replayed.objective() == instance.objective())
+
+
+def test_sparse_diff():
+    np.random.seed(6)
+    lhs = sparsemat.random(6, 9, density=0.3, format='csr', random_state=6)
+    old = SparseUnsolvedInstance(lhs=lhs, rhs=np.ones(6), objective=np.ones(9))
+    changed = lhs.tolil()
+    changed[0, 0] = 5.0
+    changed[lhs.nonzero()[0][0], lhs.nonzero()[1][0]] = 0
+    new = SparseUnsolvedInstance(lhs=changed.tocsr(), rhs=np.ones(6), objective=np.ones(9))
+    payload = encode_diff(old, new, KIND_LP)
+    replayed = apply_diff(old, payload, KIND_LP)
+    assert sparsemat.issparse(replayed.lhs())
+    assert np.all(replayed.lhs().toarray() == new.lhs().toarray())
+
+
+def test_truncated_journal():
+    np.random.seed(6)
+    start = random_encoded(8, 5)
+    with temp_file_path('.journal') as file_name:
+        improved = run_search(
+            file_name, start, neighbour, lambda instance: instance.rhs().sum(),
+            random_generator(6))
+        with open(file_name, 'rb') as infile:
+            data = infile.read()
+        with open(file_name, 'wb') as outfile:
+            outfile.write(data[:-3])
+        assert len(list(read_journal(file_name))) == len(improved) - 1
+
+
+def test_journal_errors():
+    with temp_file_path('.journal') as file_name:
+        journal = SearchJournal(file_name)
+        journal.write(0, 1.0, random_encoded(4, 3))
+        journal.write(1, 2.0, random_encoded(5, 3))
+        with pytest.raises(ValueError):
+            journal.close()
+        with pytest.raises(ValueError):
+            journal.write(2, 3.0, random_encoded(4, 3))
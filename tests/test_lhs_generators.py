@@ -0,0 +1,68 @@
+
+import numpy as np
+import pytest
+
+from lp_generators.lhs_generators import (
+    expected_bipartite_degree, connect_remaining, generate_edges, generate_lhs)
+
+
+def test_expected_bipartite_degree():
+    random_state = np.random.RandomState(1)
+    degree1 = np.array([10, 0, 5, 5])
+    degree2 = np.array([4, 4, 4, 4, 4])
+    ind1, ind2 = expected_bipartite_degree(degree1, degree2, random_state)
+    assert not np.any(ind1 == 1)
+    # same draws as evaluating each pair in turn
+    random_state = np.random.RandomState(1)
+    expected = [
+        (i, j) for i, di in enumerate(degree1) for j, dj in enumerate(degree2)
+        if random_state.uniform(0, 1) < di * dj / 20]
+    assert list(zip(ind1.tolist(), ind2.tolist())) == expected
+
+
+@pytest.mark.parametrize('n1,n2', [(5, 8), (8, 5), (6, 6)])
+def test_connect_remaining(n1, n2):
+    random_state = np.random.RandomState(2)
+    ind1, ind2 = np.array([0, 1, 1]), np.array([0, 0, 2])
+    new1, new2 = connect_remaining(n1, n2, ind1, ind2, random_state)
+    all1, all2 = np.concatenate([ind1, new1]), np.concatenate([ind2, new2])
+    assert np.all(np.bincount(all1, minlength=n1) > 0)
+    assert np.all(np.bincount(all2, minlength=n2) > 0)
+    assert len(new1) == max(n1 - 2, n2 - 2)
+    assert len(set(zip(all1.tolist(), all2.tolist()))) == len(all1)
+
+
+@pytest.mark.parametrize('density', [0.05, 0.5, 1.0])
+def test_generate_edges(density):
+    random_state = np.random.RandomState(3)
+    ind1, ind2 = generate_edges(30, 20, density, 0.5, 0.5, random_state)
+    linear = ind1 * 20 + ind2
+    assert len(np.unique(linear)) == len(linear)
+    assert np.all(np.bincount(ind1, minlength=30) > 0)
+    assert np.all(np.bincount(ind2, minlength=20) > 0)
+
+
+def test_generate_lhs():
+    random_state = np.random.RandomState(4)
+    lhs = generate_lhs(
+        variables=30, constraints=20, density=0.01, pv=0.5, pc=0.5,
+        coeff_loc=0, coeff_scale=1, random_state=random_state)
+    assert lhs.shape == (20, 30)
+    dense = lhs.toarray()
+    assert np.all(np.any(dense != 0, axis=0))
+    assert np.all(np.any(dense != 0, axis=1))
+
+
+def test_generate_lhs_legacy():
+    # entries (in coo order) generated by earlier versions from this seed
+    random_state = np.random.RandomState(11)
+    lhs = generate_lhs(
+        variables=6, constraints=5, density=0.15, pv=0.5, pc=0.5,
+        coeff_loc=0, coeff_scale=1, random_state=random_state)
+    assert lhs.row.tolist() == [3, 0, 4, 3, 1, 2]
+    assert lhs.col.tolist() == [0, 2, 1, 3, 4, 5]
+    assert lhs.data == pytest.approx([
+        0.463668222521, -0.522202219856, 0.521460435788,
+        0.741486773267, 0.339985517518, 0.861797840799], abs=1e-12)
+    # the stream continues from the same state
+    assert random_state.uniform() == pytest.approx(0.6960661747706572)
@@ -17,9 +17,9 @@ def matrices():
             [1,0,2,0,1],
             [0,1,0,1,0],
             [1,-1,0,1,0],
-            [0,0,-1,1,0]], dtype=np.float),
-        np.array([1, 2, 3, 4], dtype=np.float),
-        np.array([1, 2, 3, 4, 5], dtype=np.float))
+            [0,0,-1,1,0]], dtype=np.float64),
+        np.array([1, 2, 3, 4], dtype=np.float64),
+        np.array([1, 2, 3, 4, 5], dtype=np.float64))
 
 
 @pytest.fixture
@@ -33,9 +33,9 @@ def model(matrices):
 def easy_model():
     model = LPCy()
     model.construct_dense_canonical(
-        2, 2, np.array([[1, 3], [3, 1]], dtype=np.float),
-        np.array([4, 4], dtype=np.float),
-        np.array([1, 1], dtype=np.float))
+        2, 2, np.array([[1, 3], [3, 1]], dtype=np.float64),
+        np.array([4, 4], dtype=np.float64),
+        np.array([1, 1], dtype=np.float64))
     return model
 
 
@@ -66,3 +66,64 @@ def test_write_ip(easy_model):
     with temp_file_path('.mps.gz') as file_path:
         easy_model.write_mps_ip(file_path)
         assert os.path.exists(file_path)
+
+
+def test_reuse(matrices, easy_model):
+    easy_model.solve()
+    n, m, A, b, c = matrices
+    easy_model.construct_dense_canonical(n, m, A, b, c)
+    with pytest.raises(ValueError):
+        easy_model.get_solution_primals()
+    assert np.all(easy_model.get_dense_lhs() == A)
+    easy_model.solve()
+    fresh = LPCy()
+    fresh.construct_dense_canonical(n, m, A, b, c)
+    fresh.solve()
+    assert easy_model.get_solution_status() == fresh.get_solution_status()
+    assert np.all(easy_model.get_solution_primals() == fresh.get_solution_primals())
+    assert np.all(easy_model.get_solution_basis() == fresh.get_solution_basis())
+    # same dimensions, new data
+    easy_model.construct_dense_canonical(n, m, A, b * 2, c)
+    assert np.all(easy_model.get_rhs() == b * 2)
+
+
+def test_reset(easy_model):
+    easy_model.solve()
+    easy_model.reset()
+    with pytest.raises(ValueError):
+        easy_model.get_solution_status()
+    with pytest.raises(ValueError):
+        easy_model.solve()
+
+
+def test_context_manager(matrices):
+    with LPCy() as model:
+        model.construct_dense_canonical(*matrices)
+        model.solve()
+        assert model.get_solution_status() == 0
+    with pytest.raises(ValueError):
+        model.get_rhs()
+
+
+@pytest.mark.parametrize('algorithm', ['dual', 'primal', 'barrier', 'automatic'])
+@pytest.mark.parametrize('presolve', [False, True])
+def test_solve_options(easy_model, algorithm, presolve):
+    easy_model.solve(algorithm=algorithm, presolve=presolve, scaling='geometric')
+    assert easy_model.get_solution_status() == 0
+    assert np.allclose(easy_model.get_solution_primals(), [1, 1])
+    assert np.allclose(easy_model.get_solution_duals(), [.25, .25])
+
+
+def test_solve_limits(model):
+    model.solve(max_iterations=0)
+    assert model.get_solution_status() == 3
+    # options are not retained by later solves
+    model.solve()
+    assert model.get_solution_status() == 0
+
+
+def test_solve_invalid_options(easy_model):
+    with pytest.raises(ValueError):
+        easy_model.solve(algorithm='interior')
+    with pytest.raises(ValueError):
+        easy_model.solve(scaling='none')
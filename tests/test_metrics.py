@@ -0,0 +1,101 @@
+
+import json
+
+import pytest
+
+from lp_generators.metrics import (
+    Metrics, Histogram, MetricsExporter, observe_instance, observe_step, tracked,
+    format_prometheus)
+from lp_generators.performance import (
+    parse_clp_output, clp_performance_data, strbr_performance_data)
+
+
+def test_histogram():
+    histogram = Histogram(buckets=[1, 10])
+    for value in [0.5, 1, 5, 50]:
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1, 2), (10, 3), (float('inf'), 4)]
+    assert histogram.sum == 56.5 and histogram.count == 4
+
+
+def test_observe_instance():
+    metrics = Metrics()
+    data = dict(
+        clp_primal_iterations=10, clp_primal_time=0.2,
+        clp_dual_iterations=-1, clp_dual_time=-1,
+        time_coeff_features_wall=0.01, time_coeff_features_calls=1)
+    observe_instance(data, metrics)
+    observe_instance(dict(data, clp_dual_iterations=3, clp_dual_time=0.1), metrics)
+    assert metrics.counter('instances') == 2
+    assert metrics.counter('solver_runs', solver='clp', method='dual') == 2
+    assert metrics.counter('solver_failures', solver='clp', method='dual') == 1
+    assert metrics.counter('solver_failures', solver='clp', method='primal') == 0
+    _, _, histograms = metrics.snapshot()
+    assert histograms[('stage_seconds', (('stage', 'coeff_features'), ))].count == 2
+    assert histograms[('solver_seconds', (('method', 'primal'), ('solver', 'clp')))].count == 2
+
+
+def test_observe_instance_stopped():
+    metrics = Metrics()
+    data = clp_performance_data(
+        parse_clp_output('Stopped on time - objective value 1.5'),
+        parse_clp_output('Stopped on iterations - objective value 1.5'),
+        parse_clp_output('Problem is infeasible'))
+    data.update(strbr_performance_data(dict(
+        time=5.0, calls=2, iterations=10, percall=2.5, stopped='time')))
+    observe_instance(data, metrics)
+    assert metrics.counter('solver_stopped', solver='clp', method='primal', limit='time') == 1
+    assert metrics.counter('solver_stopped', solver='clp', method='dual', limit='iterations') == 1
+    assert metrics.counter('solver_stopped', solver='scip', method='strbr', limit='time') == 1
+    assert metrics.counter('solver_failures', solver='clp', method='primal') == 0
+    assert metrics.counter('solver_failures', solver='clp', method='barrier') == 1
+    assert metrics.counter('solver_runs', solver='clp', method='primal') == 1
+    _, _, histograms = metrics.snapshot()
+    assert ('solver_seconds', (('method', 'strbr'), ('solver', 'scip'))) not in histograms
+    text = format_prometheus(*metrics.snapshot())
+    assert (
+        'lp_generators_solver_stopped_total{limit="time",method="primal",solver="clp"} 1'
+        in text.splitlines())
+
+
+def test_observe_steps():
+    metrics = Metrics()
+    updates = ['improved', 'reject_poor', 'reject_poor']
+    steps = list(tracked(
+        (dict(search_step=i, search_update=u) for i, u in enumerate(updates)),
+        observe_step, metrics))
+    assert len(steps) == 3
+    assert metrics.counter('search_steps', update='improved') == 1
+    assert metrics.counter('search_steps', update='reject_poor') == 2
+
+
+def test_format_prometheus():
+    metrics = Metrics(buckets=[1])
+    metrics.inc('instances', 3)
+    metrics.set('uptime_seconds', 2.5)
+    metrics.observe('stage_seconds', 0.5, stage='generate')
+    text = format_prometheus(*metrics.snapshot())
+    lines = text.splitlines()
+    assert '# TYPE lp_generators_instances_total counter' in lines
+    assert 'lp_generators_instances_total 3' in lines
+    assert 'lp_generators_uptime_seconds 2.5' in lines
+    assert 'lp_generators_stage_seconds_bucket{stage="generate",le="1"} 1' in lines
+    assert 'lp_generators_stage_seconds_bucket{stage="generate",le="+Inf"} 1' in lines
+    assert 'lp_generators_stage_seconds_count{stage="generate"} 1' in lines
+
+
+def test_exporter(tmpdir):
+    metrics = Metrics()
+    prom_path = str(tmpdir.join('metrics.prom'))
+    jsonl_path = str(tmpdir.join('metrics.jsonl'))
+    with MetricsExporter(metrics, prom_path, jsonl_path, interval=0.01):
+        metrics.inc('instances', 5)
+    metrics.inc('instances', 5)
+    exporter = MetricsExporter(metrics, prom_path, jsonl_path, interval=60)
+    exporter.export()
+    assert 'lp_generators_instances_total 10' in open(prom_path).read().splitlines()
+    records = [json.loads(line) for line in open(jsonl_path)]
+    assert len(records) >= 2
+    assert records[-1]['counters']['instances'] == 10
+    assert records[-1]['gauges']['instances_per_second'] > 0
+    assert tmpdir.listdir('*.tmp') == []
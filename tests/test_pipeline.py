@@ -0,0 +1,98 @@
+
+import time
+
+import numpy as np
+import pytest
+
+from lp_generators.pipeline import stage, run_pipeline, attach_data, store_instances
+from lp_generators.store import ShardedStore
+from lp_generators.features import coeff_features
+from .testing import random_encoded
+
+
+def square(x):
+    return x * x
+
+
+def add_one(x):
+    return x + 1
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError('three')
+    return x
+
+
+def slow_first(x):
+    if x == 0:
+        time.sleep(1)
+    return x
+
+
+def make_instance(seed):
+    np.random.seed(seed)
+    instance = random_encoded(4, 3)
+    instance.data = dict(seed=seed)
+    return instance
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+@pytest.mark.parametrize('chunksize', [1, 3])
+def test_ordered(workers, chunksize):
+    stages = [
+        stage(square, workers=workers, chunksize=chunksize),
+        stage(add_one, workers=0, chunksize=2)]
+    result = list(run_pipeline(range(20), stages, ordered=True))
+    assert result == [x * x + 1 for x in range(20)]
+
+
+def test_unordered():
+    stages = [
+        stage(square, workers=2, chunksize=4, max_pending=1),
+        stage(add_one, workers=2)]
+    result = list(run_pipeline(range(50), stages))
+    assert sorted(result) == [x * x + 1 for x in range(50)]
+
+
+@pytest.mark.parametrize('stages', [1, 2])
+def test_ordered_straggler_bounded(stages):
+    pulled = []
+
+    def items():
+        for x in range(200):
+            pulled.append(x)
+            yield x
+
+    pipeline = [stage(slow_first, workers=2, chunksize=1, max_pending=2)]
+    if stages == 2:
+        pipeline.append(stage(add_one, workers=2, chunksize=1, max_pending=2))
+    results = run_pipeline(items(), pipeline, ordered=True)
+    assert next(results) == (0 if stages == 1 else 1)
+    # results behind the straggler are buffered up to the last stage's
+    # max_pending, not for every input
+    assert len(pulled) < 20
+    assert list(results) == [x + stages - 1 for x in range(1, 200)]
+
+
+def test_empty():
+    assert list(run_pipeline([], [stage(square, workers=0)])) == []
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_error(workers):
+    with pytest.raises(ValueError):
+        list(run_pipeline(range(10), [stage(fail_on_three, workers=workers)]))
+
+
+def test_generation_pipeline(tmpdir):
+    store = ShardedStore(str(tmpdir), kind='encoded')
+    stages = [
+        stage(make_instance, workers=2, chunksize=2),
+        stage(attach_data(coeff_features), workers=2),
+        stage(store_instances(store, '{seed}'), workers=0)]
+    instances = list(run_pipeline(range(6), stages, ordered=True))
+    assert [instance.data['seed'] for instance in instances] == list(range(6))
+    assert all('nonzeros' in instance.data for instance in instances)
+    store.refresh()
+    assert sorted(store.keys()) == [str(seed) for seed in range(6)]
@@ -0,0 +1,125 @@
+
+import functools
+import json
+
+import numpy as np
+import pytest
+
+from lp_generators.utils import (
+    random_generator, spawn_generators, spawn_seeds, read_seed_file, write_seed_file,
+    temp_file_path, LEGACY_RANDOM_ENV)
+from lp_generators.lhs_generators import generate_lhs
+from lp_generators.solution_generators import (
+    generate_alpha, generate_beta, generate_alpha_batch, generate_beta_batch)
+from lp_generators.instance import EncodedInstance
+import lp_generators.neighbours_encoded as neighbours_encoded
+
+
+def test_random_generator():
+    assert isinstance(random_generator(1), np.random.Generator)
+    assert isinstance(random_generator(1, legacy=True), np.random.RandomState)
+    philox = random_generator(1, bit_generator=np.random.Philox)
+    assert isinstance(philox.bit_generator, np.random.Philox)
+    state = random_generator(1)
+    assert random_generator(state) is state
+
+
+def test_legacy_reproducible(monkeypatch):
+    monkeypatch.setenv(LEGACY_RANDOM_ENV, '1')
+    legacy = random_generator(12)
+    assert isinstance(legacy, np.random.RandomState)
+    assert legacy.uniform() == np.random.RandomState(12).uniform()
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_spawn_generators(legacy):
+    children = spawn_generators(random_generator(5, legacy=legacy), 4)
+    assert len(children) == 4
+    draws = [child.uniform(size=3) for child in children]
+    assert len({tuple(draw) for draw in draws}) == 4
+    again = spawn_generators(random_generator(5, legacy=legacy), 4)
+    assert np.all(again[2].uniform(size=3) == draws[2])
+
+
+def test_spawn_seeds():
+    seeds = spawn_seeds(100, entropy=42)
+    assert len(set(seeds)) == 100
+    assert seeds == spawn_seeds(100, entropy=42)
+
+
+def test_seed_file_legacy_list():
+    with temp_file_path('.json') as file_name:
+        with open(file_name, 'w') as outfile:
+            json.dump([1, 2 ** 32 - 1], outfile)
+        assert read_seed_file(file_name) == ([1, 2 ** 32 - 1], True)
+        with open(file_name, 'w') as outfile:
+            json.dump([1, 2 ** 40], outfile)
+        assert read_seed_file(file_name) == ([1, 2 ** 40], False)
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_seed_file_stream_type(legacy):
+    seeds = spawn_seeds(3, entropy=1)
+    with temp_file_path('.json') as file_name:
+        write_seed_file(file_name, seeds, legacy)
+        assert read_seed_file(file_name) == (seeds, legacy)
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_generate_and_search(legacy):
+    ''' Generators and neighbour operators accept either random state. '''
+    random_state = random_generator(7, legacy=legacy)
+    size_params = dict(variables=10, constraints=8)
+    lhs = generate_lhs(
+        random_state=random_state, density=0.5, pv=0.5, pc=0.5,
+        coeff_loc=0, coeff_scale=1, **size_params)
+    alpha_params = dict(
+        frac_violations=0.5, beta_param=1.0,
+        mean_primal=0, std_primal=1, mean_dual=0, std_dual=1)
+    instance = EncodedInstance(
+        lhs=lhs.toarray(),
+        alpha=generate_alpha(random_state=random_state, **size_params, **alpha_params),
+        beta=generate_beta(random_state=random_state, basis_split=0.5, **size_params))
+    generate_alpha_batch(random_state=random_state, **size_params, **alpha_params)
+    generate_beta_batch(random_state=random_state, basis_split=[0.2, 0.8], **size_params)
+    neighbours = [
+        functools.partial(neighbours_encoded.exchange_basis, count=2),
+        functools.partial(neighbours_encoded.scale_optvalue, mean=0, sigma=1, count=2),
+        functools.partial(neighbours_encoded.remove_lhs_entry, count=2),
+        functools.partial(neighbours_encoded.add_lhs_entry, mean=0, sigma=1, count=2),
+        functools.partial(neighbours_encoded.scale_lhs_entry, mean=0, sigma=1, count=2)]
+    for _ in range(10):
+        instance = random_state.choice(neighbours)(instance, random_state)
+
+
+def test_legacy_seed_file_instance():
+    ''' A seed from an old seed file generates the same instance as before
+    Generator support (values from the baseline generators). '''
+    with temp_file_path('.json') as file_name:
+        with open(file_name, 'w') as outfile:
+            json.dump([2018], outfile)
+        seeds, legacy = read_seed_file(file_name)
+    random_state = random_generator(seeds[0], legacy=legacy)
+    size_params = dict(variables=6, constraints=5)
+    beta_params = dict(basis_split=random_state.uniform(low=0.0, high=1.0))
+    alpha_params = dict(
+        frac_violations=random_state.uniform(low=0.0, high=1.0),
+        beta_param=random_state.lognormal(mean=-0.2, sigma=1.8),
+        mean_primal=0, std_primal=1, mean_dual=0, std_dual=1)
+    lhs_params = dict(
+        density=random_state.uniform(low=0.0, high=1.0),
+        pv=random_state.uniform(low=0.0, high=1.0),
+        pc=random_state.uniform(low=0.0, high=1.0),
+        coeff_loc=random_state.uniform(low=-2.0, high=2.0),
+        coeff_scale=random_state.uniform(low=0.1, high=1.0))
+    instance = EncodedInstance(
+        lhs=generate_lhs(random_state=random_state, **size_params, **lhs_params).toarray(),
+        alpha=generate_alpha(random_state=random_state, **size_params, **alpha_params),
+        beta=generate_beta(random_state=random_state, **size_params, **beta_params))
+    assert np.count_nonzero(instance.lhs()) == 11
+    assert instance.lhs().sum() == pytest.approx(2.9460295449, abs=1e-9)
+    assert np.flatnonzero(instance.beta()).tolist() == [0, 1, 2, 5, 8]
+    assert instance.rhs() == pytest.approx(
+        [-0.6042880232, 0.0, 1.67090239, 3.1270271378, -1.1594409549], abs=1e-9)
+    assert instance.objective() == pytest.approx(
+        [0.4955587682, -1.3526870178, 0.0, -0.5425495754, 4.6327899119, -2.9311847037], abs=1e-9)
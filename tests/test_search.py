@@ -0,0 +1,74 @@
+import math
+import functools
+
+import numpy as np
+import pytest
+
+from lp_generators.search import local_search
+from lp_generators.hashing import VisitedSet
+import lp_generators.neighbours_encoded as neighbours_encoded
+from .testing import random_encoded
+
+
+def run_search(objective, **kwargs):
+    np.random.seed(4)
+    return list(local_search(
+        objective=objective, sense='min',
+        neighbour=functools.partial(neighbours_encoded.scale_optvalue, count=2, mean=0, sigma=1),
+        start_instance=random_encoded(6, 4), steps=30,
+        random_state=np.random.RandomState(4), **kwargs))
+
+
+def value(instance):
+    return float(instance.alpha().sum())
+
+
+def test_cutoff_matches_full_evaluation():
+    cutoffs = []
+
+    def cutoff_objective(instance, cutoff=None):
+        cutoffs.append(cutoff)
+        result = value(instance)
+        if cutoff is not None and result >= cutoff:
+            return None
+        return result
+
+    full = run_search(value)
+    limited = run_search(cutoff_objective, cutoff=True)
+    assert cutoffs[0] is None and all(c is not None for c in cutoffs[1:])
+    assert [s['search_objective'] for s, _ in limited] == [s['search_objective'] for s, _ in full]
+    updates = [s['search_update'] for s, _ in limited]
+    assert 'reject_cutoff' in updates and 'reject_poor' not in updates
+    assert [u == 'improved' for u in updates] == [s['search_update'] == 'improved' for s, _ in full]
+
+
+def test_cutoff_candidates_visited():
+    def cutoff_objective(instance, cutoff=None):
+        result = value(instance)
+        return None if cutoff is not None and result >= cutoff else result
+
+    steps = run_search(cutoff_objective, cutoff=True, candidates=3, visited=VisitedSet())
+    objectives = [s['search_objective'] for s, _ in steps]
+    assert objectives == sorted(objectives, reverse=True)
+
+
+def test_cutoff_requires_min():
+    with pytest.raises(ValueError):
+        next(local_search(
+            objective=value, sense='max', neighbour=None, start_instance=None,
+            steps=1, random_state=None, cutoff=True))
+
+
+@pytest.mark.parametrize('sense', ['min', 'max'])
+def test_infinite_objective_without_cutoff(sense):
+    # infinite values not caused by a cutoff are ordinary rejections
+    def objective(instance):
+        return value(instance) if instance is start else math.inf * (1 if sense == 'min' else -1)
+
+    np.random.seed(4)
+    start = random_encoded(6, 4)
+    steps = list(local_search(
+        objective=objective, sense=sense,
+        neighbour=functools.partial(neighbours_encoded.scale_optvalue, count=2, mean=0, sigma=1),
+        start_instance=start, steps=5, random_state=np.random.RandomState(4)))
+    assert [s['search_update'] for s, _ in steps] == ['improved'] + ['reject_poor'] * 4
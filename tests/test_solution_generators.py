@@ -0,0 +1,60 @@
+
+import numpy as np
+import pytest
+
+from lp_generators.solution_generators import (
+    random_subset_mask, generate_alpha_batch, generate_beta_batch)
+from lp_generators.instance import EncodedInstance
+
+
+def test_random_subset_mask():
+    random_state = np.random.RandomState(3)
+    counts = np.array([0, 1, 5, 10, 3])
+    mask = random_subset_mask(counts, 10, random_state)
+    assert mask.shape == (5, 10)
+    assert np.all(mask.sum(axis=1) == counts)
+
+
+def test_random_subset_mask_uniform():
+    random_state = np.random.RandomState(4)
+    mask = random_subset_mask(np.full(20000, 2), 4, random_state)
+    assert np.all(np.abs(mask.mean(axis=0) - 0.5) < 0.02)
+
+
+@pytest.mark.parametrize('variables,constraints', [(20, 10), (10, 20)])
+def test_generate_beta_batch(variables, constraints):
+    random_state = np.random.RandomState(5)
+    basis_split = random_state.uniform(size=100)
+    beta = generate_beta_batch(variables, constraints, basis_split, random_state)
+    assert beta.shape == (100, variables + constraints)
+    assert np.all(beta.sum(axis=1) == constraints)
+    primal_count = beta[:, :variables].sum(axis=1)
+    expected = [round(split * min(variables, constraints)) for split in basis_split]
+    assert np.all(primal_count == expected)
+
+
+def test_generate_alpha_batch():
+    random_state = np.random.RandomState(6)
+    frac_violations = np.array([0.0, 0.5, 1.0])
+    alpha = generate_alpha_batch(
+        variables=20, constraints=10, frac_violations=frac_violations,
+        beta_param=1.0, mean_primal=0, std_primal=1, mean_dual=0, std_dual=1,
+        random_state=random_state)
+    assert alpha.shape == (3, 30)
+    assert np.all(alpha >= 0)
+    primal = alpha[:, :20]
+    fractional = np.sum(primal != np.round(primal), axis=1)
+    assert np.all(fractional == [0, 10, 20])
+
+
+def test_batch_instances():
+    random_state = np.random.RandomState(7)
+    size = 10
+    beta = generate_beta_batch(8, 6, random_state.uniform(size=size), random_state)
+    alpha = generate_alpha_batch(
+        8, 6, frac_violations=random_state.uniform(size=size),
+        beta_param=random_state.lognormal(mean=-0.2, sigma=1.8, size=size),
+        mean_primal=0, std_primal=1, mean_dual=0, std_dual=1,
+        random_state=random_state)
+    for alpha_row, beta_row in zip(alpha, beta):
+        EncodedInstance(lhs=random_state.random_sample((6, 8)), alpha=alpha_row, beta=beta_row)
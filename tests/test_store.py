@@ -0,0 +1,94 @@
+
+import os
+
+import numpy as np
+import pytest
+
+from lp_generators.instance import EncodedInstance, UnsolvedInstance
+from lp_generators.store import ShardedStore, store_instance
+from .testing import random_encoded, assert_approx_equal
+
+
+@pytest.fixture
+def instances():
+    return {seed: random_encoded(5, 3) for seed in range(10)}
+
+
+def test_append_get(tmpdir, instances):
+    with ShardedStore(str(tmpdir)) as store:
+        for seed, instance in instances.items():
+            store.append(seed, instance)
+        assert len(store) == 10
+        assert 3 in store
+        assert 11 not in store
+        read_instance = store[7]
+    assert isinstance(read_instance, EncodedInstance)
+    assert_approx_equal(read_instance.lhs(), instances[7].lhs())
+    assert_approx_equal(read_instance.alpha(), instances[7].alpha())
+    assert_approx_equal(read_instance.beta(), instances[7].beta())
+
+
+def test_reopen_multiple_writers(tmpdir, instances):
+    ''' Separate store objects (as in separate workers) write separate
+    shards, and a new reader sees all records. '''
+    writers = [ShardedStore(str(tmpdir)), ShardedStore(str(tmpdir))]
+    for seed, instance in instances.items():
+        writers[seed % 2].append(seed, instance)
+    for writer in writers:
+        writer.close()
+    with ShardedStore(str(tmpdir)) as store:
+        assert len(store.shard_names()) == 2
+        assert sorted(store.keys(), key=int) == [str(seed) for seed in range(10)]
+        for seed in [0, 5, 9]:
+            assert_approx_equal(store.get(seed).lhs(), instances[seed].lhs())
+
+
+def test_scan(tmpdir, instances):
+    with ShardedStore(str(tmpdir)) as store:
+        for seed, instance in instances.items():
+            store.append(seed, instance)
+        scanned = dict(store.scan())
+    assert sorted(scanned.keys(), key=int) == [str(seed) for seed in range(10)]
+    for seed, instance in instances.items():
+        assert_approx_equal(scanned[str(seed)].alpha(), instance.alpha())
+
+
+def test_scan_partial_record(tmpdir, instances):
+    ''' A truncated trailing record is skipped by scans and not indexed. '''
+    with ShardedStore(str(tmpdir)) as store:
+        store.append(0, instances[0])
+        store.append(1, instances[1])
+        name = store.shard_names()[0]
+    data_path = os.path.join(str(tmpdir), name + '.dat')
+    with open(data_path, 'rb+') as outfile:
+        outfile.truncate(os.path.getsize(data_path) - 10)
+    with ShardedStore(str(tmpdir)) as store:
+        assert [key for key, _ in store.scan()] == ['0']
+
+
+def test_lp_kind(tmpdir):
+    instance = UnsolvedInstance(
+        lhs=np.array([[1.0, 2.0], [3.0, 4.0]]),
+        rhs=np.array([1.0, 2.0]),
+        objective=np.array([1.0, 1.0]))
+    with ShardedStore(str(tmpdir), kind='lp') as store:
+        store.append('a', instance)
+        read_instance = store['a']
+    assert isinstance(read_instance, UnsolvedInstance)
+    assert_approx_equal(read_instance.rhs(), instance.rhs())
+    assert_approx_equal(read_instance.objective(), instance.objective())
+
+
+def test_store_instance(tmpdir):
+    store = ShardedStore(str(tmpdir))
+
+    @store_instance(store, 'inst_{seed}')
+    def generate(seed):
+        instance = random_encoded(3, 3)
+        instance.data = dict(seed=seed)
+        return instance
+
+    generate(1)
+    generate(2)
+    store.close()
+    assert sorted(ShardedStore(str(tmpdir)).keys()) == ['inst_1', 'inst_2']
@@ -0,0 +1,67 @@
+
+import functools
+
+import numpy as np
+import pytest
+
+from lp_generators.surrogate import RidgeSurrogate, SurrogateScreen
+from lp_generators.search import local_search
+import lp_generators.neighbours_encoded as neighbours_encoded
+from .testing import random_encoded
+
+
+def test_ridge_fits_linear():
+    random_state = np.random.RandomState(1)
+    x = random_state.normal(size=(200, 3)) * [1, 100, 0.01] + [0, 1000, 5]
+    y = x @ [2, -0.03, 50] + 7
+    model = RidgeSurrogate(3, alpha=1e-8)
+    for xi, yi in zip(x, y):
+        model.update(xi, yi)
+    assert np.allclose(model.predict(x), y, atol=1e-4)
+    assert np.allclose(model.coefficients(), [2, -0.03, 50, 7], atol=1e-4)
+
+
+def test_ridge_constant_feature():
+    model = RidgeSurrogate(2)
+    for value in range(10):
+        model.update([value, 1], 3 * value)
+    assert np.isfinite(model.predict([4, 1]))
+
+
+def first(features):
+    return dict(value=features[0], label='ignored')
+
+
+@pytest.mark.parametrize('sense', ['min', 'max'])
+def test_screen_select(sense):
+    screen = SurrogateScreen(features=first, fraction=0.25, min_samples=5)
+    candidates = [np.array([float(v)]) for v in [5, 1, 7, 3, 2, 8, 6, 4]]
+    assert screen.select(candidates, sense) == list(range(8))
+    for candidate in candidates:
+        screen.update(candidate, 2 * candidate[0])
+    assert screen.ready
+    assert screen.names == ['value']
+    selected = screen.select(candidates, sense)
+    assert selected == ([1, 4] if sense == 'min' else [5, 2])
+    assert screen.screened == 6
+
+
+def test_local_search_screened():
+    np.random.seed(3)
+    screen = SurrogateScreen(fraction=0.2, min_samples=10)
+    evaluations = []
+
+    def objective(instance):
+        evaluations.append(instance)
+        return instance.rhs().mean()
+
+    steps = list(local_search(
+        objective=objective, sense='max',
+        neighbour=functools.partial(neighbours_encoded.scale_optvalue, count=3, mean=0, sigma=1),
+        start_instance=random_encoded(6, 4), steps=20,
+        random_state=np.random.RandomState(3), candidates=5, screen=screen))
+    assert [s['search_evaluated'] for s, _ in steps[:3]] == [1, 5, 5]
+    assert all(s['search_evaluated'] == 1 for s, _ in steps[4:])
+    assert len(evaluations) == sum(s['search_evaluated'] for s, _ in steps)
+    objectives = [s['search_objective'] for s, _ in steps]
+    assert objectives == sorted(objectives)
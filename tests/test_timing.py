@@ -0,0 +1,132 @@
+
+import os
+import functools
+
+import numpy as np
+import pytest
+
+from lp_generators.timing import (
+    Timings, TIMING_ENV, timing_enabled, timing_name, add_timings, summarise_timings, format_timings)
+from lp_generators.utils import calculate_data, write_instance
+from lp_generators.search import local_search
+from lp_generators.pipeline import stage, run_pipeline, attach_data, store_instances
+from lp_generators.store import ShardedStore
+from lp_generators.features import coeff_features
+from lp_generators.writers import write_tar_encoded
+import lp_generators.neighbours_encoded as neighbours_encoded
+from .testing import random_encoded
+
+
+def make_instance(seed):
+    np.random.seed(seed)
+    instance = random_encoded(4, 3)
+    instance.data = dict(seed=seed)
+    return instance
+
+
+def test_timing_enabled(monkeypatch):
+    monkeypatch.delenv(TIMING_ENV, raising=False)
+    assert not timing_enabled()
+    assert timing_enabled(True)
+    monkeypatch.setenv(TIMING_ENV, '1')
+    assert timing_enabled()
+    assert not timing_enabled(False)
+
+
+def test_timing_name():
+    assert timing_name(coeff_features) == 'coeff_features'
+    assert timing_name(functools.partial(functools.partial(coeff_features))) == 'coeff_features'
+
+
+def test_timings_data_roundtrip():
+    timings = Timings()
+    with timings.timed('write') as extra:
+        extra['nbytes'] = 100
+    timings.call('square', lambda x: x * x, 3)
+    timings.call('square', lambda x: x * x, 4)
+    with timings.timed('solve', cpu=False):
+        pass
+    data = timings.data()
+    assert data['timing_pid'] == os.getpid()
+    assert data['time_square_calls'] == 2
+    assert data['time_square_wall'] >= 0 and data['time_square_cpu'] >= 0
+    assert data['bytes_write'] == 100
+    assert 'time_solve_wall' in data and 'time_solve_cpu' not in data
+    recovered = Timings.from_data(dict(data, seed=1, rhs_mean=0.5))
+    assert recovered.data() == data
+
+
+def test_add_timings_merges():
+    first, second = Timings(), Timings()
+    first.record('a', 1.0, 1.0)
+    second.record('a', 2.0, 0.5)
+    second.record('b', 1.0, nbytes=10)
+    data = dict(seed=1, timing_pid=-1)
+    add_timings(data, first)
+    add_timings(data, second)
+    add_timings(data, None)
+    assert data['time_a_calls'] == 2
+    assert data['time_a_wall'] == 3.0
+    assert data['time_a_cpu'] == 1.5
+    assert data['bytes_b'] == 10
+    assert data['timing_pid'] == -1
+
+
+def test_summarise_timings():
+    records = []
+    for pid in [1, 2, 1]:
+        timings = Timings()
+        timings.record('generate', 1.0, 0.5)
+        records.append(dict(timings.data(), timing_pid=pid))
+    records.append(dict(seed=4))
+    workers = summarise_timings(records)
+    assert set(workers) == {1, 2}
+    assert workers[1].calls['generate'] == 2
+    assert workers[1].wall['generate'] == 2.0
+    assert 'generate' in format_timings(workers)
+
+
+def test_calculate_data_timing(tmpdir):
+    name_format = str(tmpdir.join('inst_{seed}.tar'))
+    wrapped = write_instance(write_tar_encoded, name_format, timing=True)(
+        calculate_data(coeff_features, timing=True)(make_instance))
+    data = wrapped(3).data
+    assert data['seed'] == 3 and 'nonzeros' in data
+    assert data['time_make_instance_calls'] == 1
+    assert data['time_coeff_features_calls'] == 1
+    assert data['bytes_write_tar_encoded'] == os.path.getsize(name_format.format(seed=3))
+
+
+def test_calculate_data_no_timing(monkeypatch):
+    monkeypatch.delenv(TIMING_ENV, raising=False)
+    data = calculate_data(coeff_features)(make_instance)(3).data
+    assert not any(key.startswith('time') for key in data)
+
+
+def test_pipeline_timing(tmpdir):
+    store = ShardedStore(str(tmpdir.join('store')))
+    stages = [
+        stage(make_instance, workers=2),
+        stage(attach_data(coeff_features, timing=True), workers=2),
+        stage(store_instances(store, '{seed}', timing=True), workers=0)]
+    instances = list(run_pipeline(range(6), stages))
+    store.close()
+    for instance in instances:
+        assert instance.data['time_coeff_features_calls'] == 1
+        assert instance.data['bytes_store_append'] > 0
+    total = sum(
+        timings.bytes['store_append']
+        for timings in summarise_timings(i.data for i in instances).values())
+    assert total == sum(os.path.getsize(f) for f in tmpdir.join('store').listdir('*.dat'))
+
+
+def test_local_search_timing():
+    steps = list(local_search(
+        objective=lambda instance: instance.alpha().sum(), sense='min',
+        neighbour=functools.partial(neighbours_encoded.exchange_basis, count=1),
+        start_instance=make_instance(1), steps=5,
+        random_state=np.random.RandomState(1), timing=True))
+    assert len(steps) == 5
+    assert all(step_info['time_<lambda>_calls'] == 1 for step_info, _ in steps)
+    assert 'time_exchange_basis_calls' not in steps[0][0]
+    assert all(step_info['time_exchange_basis_calls'] == 1 for step_info, _ in steps[1:])
@@ -1,13 +1,20 @@
 
+import io
 import os
+import gzip
+import tempfile
 
+import numpy as np
+import scipy.sparse as sparsemat
 import pytest
 
-from lp_generators.instance import EncodedInstance, UnsolvedInstance
+from lp_generators.instance import EncodedInstance, UnsolvedInstance, SparseUnsolvedInstance
 from lp_generators.writers import (
     write_mps, write_mps_ip,
+    write_mps_stream, write_mps_ip_stream, write_lp_stream,
     write_tar_encoded, read_tar_encoded,
     write_tar_lp, read_tar_lp)
+from lp_generators.batch import InstanceBatch
 from lp_generators.utils import temp_file_path
 from .testing import random_encoded, assert_approx_equal
 
@@ -30,6 +37,39 @@ def test_write_mps_ip(instance):
         assert os.path.exists(file_path)
 
 
+@pytest.mark.parametrize('writer', [
+    write_mps_stream, write_mps_ip_stream, write_lp_stream])
+@pytest.mark.parametrize('threads', [1, 2])
+def test_write_stream_gzip(writer, threads):
+    instance = random_encoded(5, 3)
+    with temp_file_path('.gz') as file_path:
+        writer(instance, file_path, threads=threads)
+        with gzip.open(file_path) as infile:
+            assert len(infile.read()) > 0
+
+
+@pytest.mark.parametrize('writer', [
+    write_mps, write_mps_ip, write_mps_stream, write_mps_ip_stream, write_lp_stream])
+def test_write_batch_per_member(writer):
+    members = [random_encoded(4, 3) for _ in range(3)]
+    batch = InstanceBatch.from_instances(members)
+    with tempfile.TemporaryDirectory() as directory:
+        writer(batch, os.path.join(directory, 'inst_{index}.txt'))
+        assert sorted(os.listdir(directory)) == ['inst_0.txt', 'inst_1.txt', 'inst_2.txt']
+        if writer is write_mps_stream:
+            single = io.BytesIO()
+            writer(members[1], single)
+            with open(os.path.join(directory, 'inst_1.txt'), 'rb') as infile:
+                assert infile.read() == single.getvalue()
+
+
+@pytest.mark.parametrize('target', ['batch.mps', io.BytesIO()])
+def test_write_batch_requires_template(target):
+    batch = InstanceBatch.from_instances([random_encoded(4, 3) for _ in range(2)])
+    with pytest.raises(ValueError):
+        write_mps_stream(batch, target)
+
+
 @pytest.mark.parametrize('instance', [
     random_encoded(3, 5),
     random_encoded(5, 3)])
@@ -56,3 +96,29 @@ def test_read_write_tar_lp(instance):
     assert_approx_equal(instance.lhs(), read_instance.lhs())
     assert_approx_equal(instance.rhs(), read_instance.rhs())
     assert_approx_equal(instance.objective(), read_instance.objective())
+
+
+def test_read_write_tar_compact():
+    instance = random_encoded(5, 3).astype()
+    with temp_file_path() as file_path:
+        write_tar_encoded(instance, file_path)
+        read_instance = read_tar_encoded(file_path)
+    assert read_instance.lhs().dtype == np.float32
+    assert read_instance.alpha().dtype == np.float32
+    assert read_instance.beta().dtype == np.bool_
+    assert np.all(read_instance.beta() == instance.beta())
+    assert np.allclose(read_instance.rhs(), instance.rhs())
+
+
+def test_read_write_tar_sparse_lp():
+    lhs = sparsemat.random(20, 30, density=0.1, format='csr', random_state=1)
+    instance = SparseUnsolvedInstance(
+        lhs=lhs, rhs=np.ones(20), objective=np.ones(30), dtype=np.float32)
+    assert instance.lhs().indices.dtype == np.int32
+    with temp_file_path() as file_path:
+        write_tar_lp(instance, file_path)
+        read_instance = read_tar_lp(file_path)
+    assert isinstance(read_instance, SparseUnsolvedInstance)
+    assert read_instance.lhs().dtype == np.float32
+    assert read_instance.lhs().indices.dtype == np.int32
+    assert (read_instance.lhs() != instance.lhs()).nnz == 0